@@ -0,0 +1,116 @@
+import math
+import os
+
+from PIL import Image
+
+# --- Importação e decodificação do fundo ---
+# O fundo nunca é decodificado inteiro só para ser reduzido depois: o JPEG é decodificado já em escala
+# (modo draft do libjpeg: 1/2, 1/4 ou 1/8) e os outros formatos passam por Image.reduce (média de blocos
+# inteiros, barata) antes do redimensionamento final. O ajuste à tela recorta o excesso mantendo a proporção.
+
+# Teto padrão de memória para decodificar um fundo ('limite_memoria_fundo_mb' no progress.json)
+LIMITE_MEMORIA_FUNDO_MB = 256
+# O Image.reduce para quando a imagem ainda tem pelo menos este múltiplo do tamanho final, para o
+# redimensionamento final (filtrado) manter a qualidade
+FOLGA_REDUCAO = 2.0
+# Formato da cópia normalizada gravada na pasta do projeto (sem perdas, codificação rápida)
+EXTENSAO_IMPORTADO = ".png"
+OPCOES_IMPORTADO = {'compress_level': 1}
+
+
+def ler_dimensoes(caminho):
+    """(largura, altura) lidas só do cabeçalho: o Image.open não decodifica os pixels."""
+    with Image.open(caminho) as img:
+        return img.size
+
+
+def bytes_por_pixel(modo):
+    """Memória por pixel de uma imagem do Pillow (RGB ocupa 4 bytes por pixel, como RGBA)."""
+    if modo in ('1', 'L', 'P'):
+        return 1
+    if modo.startswith('I;16'):
+        return 2
+    return 4
+
+
+def limite_memoria_fundo(dados):
+    """Teto de memória (em bytes) configurado no progress.json."""
+    return int(float(dados.get('limite_memoria_fundo_mb') or LIMITE_MEMORIA_FUNDO_MB) * 1024 * 1024)
+
+
+def caixa_cobrir(largura_origem, altura_origem, largura, altura):
+    """Recorte central da origem com a proporção do destino (o excesso de um dos lados é descartado)."""
+    escala = max(largura / largura_origem, altura / altura_origem)
+    largura_recorte = largura / escala
+    altura_recorte = altura / escala
+    x0 = (largura_origem - largura_recorte) / 2
+    y0 = (altura_origem - altura_recorte) / 2
+    return (x0, y0, x0 + largura_recorte, y0 + altura_recorte)
+
+
+def decodificar_ajustado(caminho, largura, altura, limite_bytes=None):
+    """
+    Decodifica a imagem já reduzida e ajustada a (largura, altura), em RGB, recortando o excesso para não
+    distorcer. Levanta MemoryError, antes de decodificar, se a decodificação passar de limite_bytes.
+    """
+    if limite_bytes is None:
+        limite_bytes = LIMITE_MEMORIA_FUNDO_MB * 1024 * 1024
+
+    with Image.open(caminho) as img:
+        largura_origem, altura_origem = img.size
+        # Menor imagem inteira que ainda cobre o destino depois do recorte
+        fator_cobrir = max(largura / largura_origem, altura / altura_origem)
+        if img.format == 'JPEG':
+            img.draft('RGB', (math.ceil(largura_origem * fator_cobrir), math.ceil(altura_origem * fator_cobrir)))
+
+        # Pico: a imagem decodificada + a conversão para RGB (se houver) + a cópia reduzida
+        decodificada = img.size[0] * img.size[1] * bytes_por_pixel(img.mode)
+        conversao = img.size[0] * img.size[1] * 4 if img.mode not in ('RGB', 'L') else 0
+        pico = decodificada + conversao + largura * altura * 4
+        if pico > limite_bytes:
+            raise MemoryError(
+                f"decodificar {os.path.basename(caminho)} ({largura_origem}x{altura_origem}) exigiria "
+                f"{pico / 1024 / 1024:.0f} MB, acima do limite de {limite_bytes / 1024 / 1024:.0f} MB "
+                f"('limite_memoria_fundo_mb')")
+
+        img.load()
+        if img.mode not in ('RGB', 'L'):
+            # O wallpaper não usa transparência; RGB mantém o cache simples e compacto
+            img = img.convert('RGB')
+
+        caixa = caixa_cobrir(img.size[0], img.size[1], largura, altura)
+        fator = int(min((caixa[2] - caixa[0]) / largura, (caixa[3] - caixa[1]) / altura) / FOLGA_REDUCAO)
+        if fator >= 2:
+            img = img.reduce(fator)
+            caixa = tuple(c / fator for c in caixa)
+
+        ajustada = img.resize((largura, altura), Image.BICUBIC, box=caixa)
+    return ajustada.convert('RGB') if ajustada.mode != 'RGB' else ajustada
+
+
+def tamanho_importacao(dados):
+    """Maior resolução configurada (a principal ou a de algum item de 'alvos'): a cópia serve a todas as saídas."""
+    resolucoes = [dados['resolucao']] + [a.get('resolucao', dados['resolucao']) for a in dados.get('alvos') or []]
+    tamanhos = [tuple(int(v) for v in r.split('x')) for r in resolucoes]
+    return max(tamanhos, key=lambda t: t[0] * t[1])
+
+
+def importar_fundo(caminho_origem, pasta_destino, largura, altura, limite_bytes=None):
+    """
+    Grava na pasta do projeto uma cópia da imagem já ajustada a (largura, altura), em vez do original
+    (que pode ter dezenas de MB). Retorna o nome do arquivo gravado, para 'caminho_fundo'.
+    """
+    img = decodificar_ajustado(caminho_origem, largura, altura, limite_bytes)
+    nome_base = os.path.splitext(os.path.basename(caminho_origem))[0]
+    nome = f"{nome_base}_{largura}x{altura}{EXTENSAO_IMPORTADO}"
+    destino = os.path.join(pasta_destino, nome)
+
+    temporario = f"{destino}.{os.getpid()}.tmp"
+    try:
+        img.save(temporario, format='PNG', **OPCOES_IMPORTADO)
+        os.replace(temporario, destino)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+    return nome
@@ -0,0 +1,145 @@
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import wallpaper_generator as wg
+
+# Nome do relatório gravado na pasta de saída (se --relatorio não for informado)
+RELATORIO_PADRAO = "relatorio_lote.json"
+
+STATUS_OK = "ok"
+STATUS_ERRO = "erro"
+
+
+def listar_roadmaps(entradas, ignorar=()):
+    """
+    Expande as entradas (pastas, globs ou arquivos) na lista ordenada de JSONs de roadmap.
+    Pula o que o próprio lote grava, para a pasta de saída poder ser também a de entrada: os registros e
+    listas de exibição das saídas (*.evometric.json e *.evometric.layout.json), o relatório padrão
+    (RELATORIO_PADRAO) e os caminhos em `ignorar` (ex.: o --relatorio).
+    """
+    ignorar = {os.path.abspath(caminho) for caminho in ignorar}
+    arquivos = set()
+    for entrada in entradas:
+        if os.path.isdir(entrada):
+            candidatos = glob.glob(os.path.join(entrada, "*.json"))
+        else:
+            candidatos = glob.glob(entrada)
+        for caminho in candidatos:
+            if not os.path.isfile(caminho) or os.path.basename(caminho) == RELATORIO_PADRAO \
+                    or caminho.endswith((".evometric.json", ".evometric.layout.json")):
+                continue
+            caminho = os.path.abspath(caminho)
+            if caminho not in ignorar:
+                arquivos.add(caminho)
+    return sorted(arquivos)
+
+
+def _inicializar_trabalhador():
+    """
+    Roda uma vez em cada processo do pool. As fontes ficam carregadas no processo e servem a todos os
+    roadmaps que ele renderizar; os fundos redimensionados são compartilhados entre os processos pelo
+    cache em disco (.evometric_cache), então cada fundo só é decodificado uma vez por resolução.
+    """
+    wg._carregar_fontes()
+
+
+def renderizar_arquivo(caminho_json, diretorio_saida, forcar=False):
+    """Renderiza um roadmap sem aplicar o wallpaper. Retorna a linha do relatório (nunca propaga erros)."""
+    saida = io.StringIO()
+    inicio = time.perf_counter()
+    resultado, erro = None, None
+    try:
+        with contextlib.redirect_stdout(saida):
+            resultado = wg.gerar_wallpaper(forcar=forcar, caminho_json=caminho_json, aplicar=False,
+                                           diretorio_saida=diretorio_saida, incremental=False)
+        if resultado is None:
+            erro = "Não foi possível carregar o roadmap."
+    except Exception as e:
+        erro = f"{type(e).__name__}: {e}"
+
+    return {
+        'arquivo': caminho_json,
+        'status': STATUS_ERRO if erro else STATUS_OK,
+        'resultado': resultado,
+        'segundos': round(time.perf_counter() - inicio, 4),
+        'erro': erro,
+        'mensagens': saida.getvalue().splitlines(),
+    }
+
+
+def renderizar_lote(arquivos, diretorio_saida, trabalhadores=None, forcar=False):
+    """Renderiza todos os arquivos num ProcessPoolExecutor. Retorna as linhas do relatório na ordem dos arquivos."""
+    os.makedirs(diretorio_saida, exist_ok=True)
+    with ProcessPoolExecutor(max_workers=trabalhadores, initializer=_inicializar_trabalhador) as executor:
+        futuros = [executor.submit(renderizar_arquivo, caminho, diretorio_saida, forcar) for caminho in arquivos]
+        linhas = []
+        for caminho, futuro in zip(arquivos, futuros):
+            try:
+                linha = futuro.result()
+            except Exception as e:
+                # O processo trabalhador morreu (ex.: falta de memória): o arquivo conta como falha
+                linha = {'arquivo': caminho, 'status': STATUS_ERRO, 'resultado': None, 'segundos': None,
+                         'erro': f"{type(e).__name__}: {e}", 'mensagens': []}
+            print(f"[{linha['status']:<4}] {os.path.basename(caminho)}"
+                  + (f" ({linha['segundos']:.2f} s)" if linha['segundos'] is not None else "")
+                  + (f" - {linha['erro']}" if linha['erro'] else ""))
+            linhas.append(linha)
+    return linhas
+
+
+def gravar_relatorio(caminho, linhas, trabalhadores, segundos_total):
+    """Grava o relatório do lote (escrita atômica)."""
+    relatorio = {
+        'total': len(linhas),
+        'ok': sum(1 for l in linhas if l['status'] == STATUS_OK),
+        'erros': sum(1 for l in linhas if l['status'] == STATUS_ERRO),
+        'trabalhadores': trabalhadores,
+        'segundos_total': round(segundos_total, 4),
+        'arquivos': linhas,
+    }
+    temporario = caminho + ".tmp"
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(relatorio, f, indent=4, ensure_ascii=False)
+    os.replace(temporario, caminho)
+    return relatorio
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Renderiza os wallpapers de vários roadmaps em paralelo, sem aplicar nenhum deles.")
+    parser.add_argument("entradas", nargs="+", help="Pastas, globs (ex.: 'equipe/*.json') ou arquivos de roadmap.")
+    parser.add_argument("--saida", required=True, help="Pasta onde as imagens são gravadas (uma por roadmap).")
+    parser.add_argument("--trabalhadores", type=int, default=None,
+                        help="Número de processos (padrão: um por núcleo).")
+    parser.add_argument("--relatorio", default=None,
+                        help=f"Caminho do relatório JSON (padrão: {RELATORIO_PADRAO} na pasta de saída).")
+    parser.add_argument("--forcar", action="store_true", help="Renderiza mesmo que nada tenha mudado.")
+    args = parser.parse_args(argv)
+
+    caminho_relatorio = args.relatorio or os.path.join(args.saida, RELATORIO_PADRAO)
+    arquivos = listar_roadmaps(args.entradas, ignorar=[caminho_relatorio])
+    if not arquivos:
+        print("Erro: Nenhum roadmap encontrado nas entradas informadas.")
+        return 2
+
+    trabalhadores = args.trabalhadores or os.cpu_count() or 1
+    print(f"Renderizando {len(arquivos)} roadmap(s) com {trabalhadores} processo(s)...")
+    inicio = time.perf_counter()
+    linhas = renderizar_lote(arquivos, args.saida, trabalhadores, args.forcar)
+    segundos_total = time.perf_counter() - inicio
+
+    relatorio = gravar_relatorio(caminho_relatorio, linhas, trabalhadores, segundos_total)
+    print(f"\n{relatorio['ok']} ok, {relatorio['erros']} com erro em {segundos_total:.2f} s. "
+          f"Relatório: {caminho_relatorio}")
+    return 1 if relatorio['erros'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,583 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import PIL
+from PIL import Image, ImageDraw, ImageFont
+
+import background_import
+import completion_history
+import render_metrics as metricas
+import wallpaper_generator as wg
+from progress_store import ArmazenamentoProgresso
+from roadmap_model import Roadmap, obter_roadmap
+
+# Imagem de fundo usada no nosso roadmap (3840x2160)
+FUNDO_PADRAO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "java-logo-3840x2160-15990.png")
+
+# Casos da suíte: cada eixo varia sozinho a partir do caso base (100 práticas, contorno 2, 1920x1080)
+BASE_SUITE = {'praticas': 100, 'contorno': 2, 'resolucao': "1920x1080"}
+EIXOS_SUITE = {
+    'praticas': [10, 100, 1000, 10000],
+    'contorno': [0, 2, 5],
+    'resolucao': ["1280x720", "1920x1080", "3840x2160"],
+}
+# No modo --rapido, a árvore para em 1000 práticas
+MAX_PRATICAS_RAPIDO = 1000
+
+# Codificações comparadas pelo subcomando "codificacao" (mesmo formato de 'formato_saida' no progress.json)
+CODIFICACOES_BENCH = [
+    {'formato': 'png', 'compress_level': 0},
+    {'formato': 'png', 'compress_level': 1},
+    {'formato': 'png', 'compress_level': 6},
+    {'formato': 'png', 'compress_level': 9},
+    {'formato': 'bmp'},
+    {'formato': 'jpeg', 'qualidade': 85},
+    {'formato': 'jpeg', 'qualidade': 95},
+    {'formato': 'webp', 'qualidade': 80},
+    {'formato': 'webp', 'qualidade': 90},
+]
+
+# Modos de legibilidade comparados pelo subcomando "legibilidade": (nome, contorno_largura, 'legibilidade')
+MODOS_LEGIBILIDADE_BENCH = [
+    ("contorno 2", 2, "contorno"),
+    ("contorno 5", 5, "contorno"),
+    ("painel", 2, "painel"),
+]
+
+# Uma fase só é regressão se ficar mais lenta que a tolerância E pelo menos isto mais lenta (ruído)
+MIN_DIFERENCA_MS = 1.0
+MIN_DIFERENCA_KB = 64
+
+
+def cronometrar(funcao, repeticoes):
+    """Executa a função N vezes e retorna a lista de tempos em milissegundos."""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return tempos
+
+
+def imprimir_resultado(nome, tempos):
+    print(f"{nome:<32} média {statistics.mean(tempos):9.2f} ms | mín {min(tempos):9.2f} ms | n={len(tempos)}")
+
+
+def bench_fundo(args):
+    """Compara o caminho frio (decode + resize) com os caminhos quentes (cache em disco e em memória)."""
+    largura, altura = (int(v) for v in args.resolucao.split('x'))
+    print(f"Fundo: {args.imagem} -> {largura}x{altura}\n")
+
+    cache_original = wg.DIRETORIO_CACHE
+    with tempfile.TemporaryDirectory(prefix="evometric_bench_") as pasta:
+        # Cache de fundos próprio: o caso frio esvazia o cache em disco e não deve mexer no do usuário
+        wg.DIRETORIO_CACHE = os.path.join(pasta, "cache")
+        try:
+            def frio():
+                wg.limpar_cache_fundos(disco=True)
+                wg.carregar_fundo(args.imagem, largura, altura)
+
+            def disco():
+                wg.limpar_cache_fundos()
+                wg.carregar_fundo(args.imagem, largura, altura)
+
+            def memoria():
+                wg.carregar_fundo(args.imagem, largura, altura)
+
+            imprimir_resultado("Frio (decode reduzido + ajuste)", cronometrar(frio, args.repeticoes))
+            imprimir_resultado("Morno (cache em disco)", cronometrar(disco, args.repeticoes))
+            wg.carregar_fundo(args.imagem, largura, altura)
+            imprimir_resultado("Quente (cache em memória)", cronometrar(memoria, args.repeticoes))
+
+            # Cópia já ajustada, como a gravada pelo botão Fundo: o render frio decodifica só o tamanho da tela
+            importado = os.path.join(pasta, background_import.importar_fundo(args.imagem, pasta, largura, altura))
+
+            def frio_importado():
+                wg.limpar_cache_fundos(disco=True)
+                wg.carregar_fundo(importado, largura, altura)
+
+            imprimir_resultado("Importação (cópia ajustada)",
+                               cronometrar(lambda: background_import.importar_fundo(args.imagem, pasta, largura, altura),
+                                           args.repeticoes))
+            imprimir_resultado("Frio (cópia importada)", cronometrar(frio_importado, args.repeticoes))
+        finally:
+            wg.DIRETORIO_CACHE = cache_original
+
+
+def _contorno_legado(draw, pos, text, font, cor_principal, cor_contorno, largura_contorno):
+    """Implementação antiga (força bruta): (2w+1)² - 1 rasterizações do texto só para o contorno."""
+    x, y = pos
+    for dx in range(-largura_contorno, largura_contorno + 1):
+        for dy in range(-largura_contorno, largura_contorno + 1):
+            if dx != 0 or dy != 0:
+                draw.text((x + dx, y + dy), text, font=font, fill=cor_contorno)
+    draw.text(pos, text, font=font, fill=cor_principal)
+
+
+def _carregar_fonte_bench(tamanho):
+    try:
+        return ImageFont.truetype("arial.ttf", tamanho)
+    except IOError:
+        return ImageFont.load_default(tamanho)
+
+
+def bench_contorno(args):
+    """Tempo por linha do contorno antigo x novo, para larguras de contorno de 0 a 5."""
+    fonte = _carregar_fonte_bench(args.tamanho_fonte)
+    texto = "    ☐ Modelar hierarquias de domínio com Sealed Classes"
+    img = Image.new('RGB', (1920, 200), (30, 30, 30))
+    draw = ImageDraw.Draw(img)
+    print(f"Texto de {len(texto)} caracteres, fonte {args.tamanho_fonte}px, {args.linhas} linhas por medição\n")
+    print(f"{'largura':>7} | {'antigo (ms/linha)':>17} | {'novo (ms/linha)':>15} | {'ganho':>7}")
+
+    for largura in range(0, 6):
+        def antigo():
+            for _ in range(args.linhas):
+                _contorno_legado(draw, (40, 60), texto, fonte, (255, 255, 255), (0, 0, 0), largura)
+
+        def novo():
+            for _ in range(args.linhas):
+                wg.desenhar_texto_com_contorno(draw, (40, 60), texto, fonte, (255, 255, 255), (0, 0, 0), largura)
+
+        t_antigo = min(cronometrar(antigo, args.repeticoes)) / args.linhas
+        t_novo = min(cronometrar(novo, args.repeticoes)) / args.linhas
+        print(f"{largura:>7} | {t_antigo:>17.3f} | {t_novo:>15.3f} | {t_antigo / t_novo:>6.1f}x")
+
+
+# --- Suíte com roadmaps sintéticos ---
+
+def gerar_roadmap_sintetico(num_praticas, contorno=2, resolucao="1920x1080", caminho_fundo=None, caminho_saida="saida.png"):
+    """
+    Roadmap no formato do progress.json: um separador FASE a cada 6 módulos, 2 subtópicos por módulo e
+    2 práticas por subtópico (como o roadmap real), com uma a cada três práticas concluída.
+    """
+    modulos = []
+    criadas = 0
+    indice_modulo = 0
+    while criadas < num_praticas:
+        if indice_modulo % 6 == 0:
+            fase = indice_modulo // 6 + 1
+            modulos.append({"nome": f"FASE {fase}: Fase sintética {fase}", "tipo": "FASE", "concluido": False})
+        subtopicos = []
+        for j in range(2):
+            praticas = []
+            for _ in range(2):
+                if criadas == num_praticas:
+                    break
+                praticas.append({"nome": f"Prática sintética {criadas} com um nome de tamanho realista",
+                                 "concluido": criadas % 3 == 0})
+                criadas += 1
+            if praticas:
+                subtopicos.append({"nome": f"Subtópico {indice_modulo}.{j}", "concluido": False, "praticas": praticas})
+        modulos.append({"nome": f"S{indice_modulo + 1}: Módulo sintético {indice_modulo + 1}",
+                        "concluido": False, "subtopicos": subtopicos})
+        indice_modulo += 1
+
+    return {
+        "resolucao": resolucao,
+        "titulo": f"EvoMetric | Roadmap sintético ({num_praticas} práticas)",
+        "caminho_fundo": caminho_fundo,
+        "fundo_cor": [30, 30, 30],
+        "texto_cor_principal": [255, 255, 255],
+        "texto_cor_concluido": [0, 255, 100],
+        "contorno_cor": [0, 0, 0],
+        "contorno_largura": contorno,
+        "caminho_saida": caminho_saida,
+        "modulos": modulos,
+    }
+
+
+def gerar_fundo_sintetico(caminho, resolucao):
+    """Imagem de fundo com gradiente e ruído suave (não comprime trivialmente, como uma foto)."""
+    largura, altura = (int(v) for v in resolucao.split('x'))
+    gradiente = Image.linear_gradient('L').resize((largura, altura))
+    ruido = Image.effect_noise((largura // 8, altura // 8), 40).resize((largura, altura), Image.Resampling.BICUBIC)
+    Image.merge('RGB', (gradiente, ruido, gradiente.transpose(Image.Transpose.FLIP_LEFT_RIGHT))).save(caminho)
+    return caminho
+
+
+def medir_fase(funcao, repeticoes, preparar=None):
+    """
+    Tempo de parede (sem tracemalloc, que distorce os tempos) e, numa execução extra, o pico de memória
+    alocada durante a fase segundo o tracemalloc. preparar() roda antes de cada execução, fora da medição.
+    """
+    tempos = []
+    for _ in range(repeticoes):
+        if preparar:
+            preparar()
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+
+    if preparar:
+        preparar()
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        funcao()
+        pico = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {'ms': round(min(tempos), 3), 'media_ms': round(statistics.mean(tempos), 3),
+            'pico_kb': round(pico / 1024, 1)}
+
+
+def executar_caso(pasta, praticas, contorno, resolucao, caminho_fundo, repeticoes):
+    """Mede as fases de um roadmap sintético: salvar, carregar, layout, contorno e os renders."""
+    caminho_json = os.path.join(pasta, f"roadmap_{praticas}_{contorno}_{resolucao}.json")
+    dados = gerar_roadmap_sintetico(praticas, contorno, resolucao, caminho_fundo,
+                                    os.path.join(pasta, f"saida_{praticas}_{contorno}_{resolucao}.png"))
+    armazenamento = ArmazenamentoProgresso(caminho_json)
+    largura, altura = (int(v) for v in resolucao.split('x'))
+    fontes = wg._carregar_fontes()
+    fases = {}
+
+    fases['salvar'] = medir_fase(lambda: armazenamento.salvar_snapshot(dados), repeticoes)
+    fases['carregar'] = medir_fase(lambda: Roadmap(armazenamento, armazenamento.carregar()), repeticoes)
+    fases['layout'] = medir_fase(lambda: wg._montar_layout(dados, largura, altura, fontes), repeticoes)
+
+    img = Image.new('RGB', (largura, 200), (30, 30, 30))
+    draw = ImageDraw.Draw(img)
+    texto = "    ☐ " + dados['modulos'][1]['subtopicos'][0]['praticas'][0]['nome']
+    fases['contorno_20_linhas'] = medir_fase(
+        lambda: [wg.desenhar_texto_com_contorno(draw, (40, 60), texto, fontes['pratica'], (255, 255, 255),
+                                                (0, 0, 0), contorno) for _ in range(20)], repeticoes)
+
+    # Renders: aplicar=False é o caminho sem aplicação do wallpaper (roda em qualquer sistema)
+    def render(forcar=True, incremental=False):
+        with contextlib.redirect_stdout(io.StringIO()):
+            resultado = wg.gerar_wallpaper(forcar=forcar, caminho_json=caminho_json, aplicar=False,
+                                           incremental=incremental)
+        if resultado is None:
+            raise RuntimeError(f"Falha ao renderizar {caminho_json}")
+
+    def esfriar():
+        wg.limpar_cache_fundos(disco=True)
+        wg._cache_sprites.limpar()
+
+    fases['render_frio'] = medir_fase(render, repeticoes, preparar=esfriar)
+    fases['render_quente'] = medir_fase(render, repeticoes)
+
+    # Depois de uma mudança: conclui uma prática pendente antes de cada render (pelo journal, como a interface
+    # faz) e compara o render completo com a repintura incremental do mesmo tipo de mudança. O render_quente
+    # acima não serve de comparação: ele redesenha um estado que não mudou, com todos os sprites em cache.
+    roadmap = obter_roadmap(caminho_json)
+
+    def concluir_proxima():
+        pendentes = roadmap.praticas_pendentes()
+        if pendentes:
+            roadmap.concluir_pratica(pendentes[0])
+
+    fases['render_completo_apos_mudanca'] = medir_fase(render, repeticoes, preparar=concluir_proxima)
+    render(incremental=True)
+    fases['render_incremental'] = medir_fase(lambda: render(forcar=False, incremental=True), repeticoes,
+                                             preparar=concluir_proxima)
+    fases['render_sem_mudancas'] = medir_fase(lambda: render(forcar=False, incremental=True), repeticoes)
+
+    # Aplicação, à parte do render: o backend "arquivo" copia a imagem para outro lugar (roda em qualquer sistema)
+    config_aplicacao = {'backend': 'arquivo', 'destino': os.path.join(pasta, "aplicado" + os.path.splitext(dados['caminho_saida'])[1])}
+    fases['aplicacao_arquivo'] = medir_fase(lambda: wg.aplicar_wallpaper(dados['caminho_saida'], config_aplicacao),
+                                            repeticoes)
+
+    return {'caso': f"praticas={praticas} contorno={contorno} resolucao={resolucao}",
+            'praticas': praticas, 'contorno': contorno, 'resolucao': resolucao, 'fases': fases}
+
+
+def casos_suite(rapido=False):
+    """Lista (praticas, contorno, resolucao) sem repetir o caso base entre os eixos."""
+    casos = []
+    for eixo, valores in EIXOS_SUITE.items():
+        for valor in valores:
+            caso = dict(BASE_SUITE, **{eixo: valor})
+            if rapido and caso['praticas'] > MAX_PRATICAS_RAPIDO:
+                continue
+            chave = (caso['praticas'], caso['contorno'], caso['resolucao'])
+            if chave not in casos:
+                casos.append(chave)
+    return casos
+
+
+def bench_suite(args):
+    """Roda todos os casos da suíte, imprime uma tabela e grava os resultados em JSON."""
+    resultados = []
+    cache_original = wg.DIRETORIO_CACHE
+    with tempfile.TemporaryDirectory(prefix="evometric_bench_") as pasta:
+        # Cache de fundos próprio: a suíte esvazia o cache em disco e não deve mexer no do usuário
+        wg.DIRETORIO_CACHE = os.path.join(pasta, "cache")
+        fundos = {}
+        try:
+            for praticas, contorno, resolucao in casos_suite(args.rapido):
+                if resolucao not in fundos:
+                    fundos[resolucao] = gerar_fundo_sintetico(os.path.join(pasta, f"fundo_{resolucao}.png"), resolucao)
+                print(f"Caso: {praticas} práticas, contorno {contorno}, {resolucao}")
+                resultado = executar_caso(pasta, praticas, contorno, resolucao, fundos[resolucao], args.repeticoes)
+                for fase, medida in resultado['fases'].items():
+                    print(f"    {fase:<28} {medida['ms']:10.2f} ms (média {medida['media_ms']:10.2f}) "
+                          f"| pico {medida['pico_kb']:10.1f} KB")
+                resultados.append(resultado)
+        finally:
+            wg.DIRETORIO_CACHE = cache_original
+
+    relatorio = {
+        'ambiente': {'python': platform.python_version(), 'pillow': PIL.__version__,
+                     'plataforma': platform.platform(), 'repeticoes': args.repeticoes},
+        'casos': resultados,
+    }
+    with open(args.saida, 'w', encoding='utf-8') as f:
+        json.dump(relatorio, f, indent=4, ensure_ascii=False)
+    print(f"\nResultados gravados em {args.saida}")
+
+    if args.base:
+        return comparar_arquivos(args.saida, args.base, args.tolerancia)
+    return 0
+
+
+def comparar_resultados(atual, base, tolerancia):
+    """
+    Compara duas execuções da suíte, caso a caso e fase a fase. Retorna a lista de regressões
+    (tempo mínimo ou pico de memória acima de base * (1 + tolerancia), descontado o ruído).
+    """
+    casos_base = {c['caso']: c for c in base['casos']}
+    regressoes = []
+    for caso in atual['casos']:
+        anterior = casos_base.get(caso['caso'])
+        if anterior is None:
+            continue
+        for fase, medida in caso['fases'].items():
+            medida_base = anterior['fases'].get(fase)
+            if medida_base is None:
+                continue
+            for campo, minimo in (('ms', MIN_DIFERENCA_MS), ('pico_kb', MIN_DIFERENCA_KB)):
+                valor, valor_base = medida[campo], medida_base[campo]
+                if valor > valor_base * (1 + tolerancia) and valor - valor_base >= minimo:
+                    regressoes.append({'caso': caso['caso'], 'fase': fase, 'medida': campo,
+                                       'base': valor_base, 'atual': valor})
+    return regressoes
+
+
+def comparar_arquivos(caminho_atual, caminho_base, tolerancia):
+    """Imprime as regressões entre dois JSONs da suíte. Retorna 1 se houver alguma (para uso em CI)."""
+    with open(caminho_atual, 'r', encoding='utf-8') as f:
+        atual = json.load(f)
+    with open(caminho_base, 'r', encoding='utf-8') as f:
+        base = json.load(f)
+
+    regressoes = comparar_resultados(atual, base, tolerancia)
+    if not regressoes:
+        print(f"Nenhuma regressão acima de {tolerancia:.0%} em relação a {caminho_base}.")
+        return 0
+
+    print(f"{len(regressoes)} regressão(ões) acima de {tolerancia:.0%} em relação a {caminho_base}:")
+    for r in regressoes:
+        unidade = "ms" if r['medida'] == 'ms' else "KB"
+        print(f"    {r['caso']} | {r['fase']}: {r['base']:.2f} -> {r['atual']:.2f} {unidade} "
+              f"(+{(r['atual'] / r['base'] - 1) if r['base'] else float('inf'):.0%})")
+    return 1
+
+
+def bench_comparar(args):
+    return comparar_arquivos(args.atual, args.base, args.tolerancia)
+
+
+def bench_codificacao(args):
+    """Tempo de codificação + gravação atômica e tamanho do arquivo de cada codificador, por resolução."""
+    resultados = []
+    with tempfile.TemporaryDirectory(prefix="evometric_bench_") as pasta:
+        for resolucao in args.resolucoes:
+            largura, altura = (int(v) for v in resolucao.split('x'))
+            # Um wallpaper de verdade: fundo fotográfico + texto com contorno
+            dados = gerar_roadmap_sintetico(100, 2, resolucao)
+            fontes = wg._carregar_fontes()
+            img = Image.open(gerar_fundo_sintetico(os.path.join(pasta, f"fundo_{resolucao}.png"), resolucao))
+            img = img.convert('RGB')
+            estilo = {'cor_contorno': (0, 0, 0), 'cor_concluido': (0, 255, 100), 'largura_contorno': 2,
+                      'painel': None}
+            wg._desenhar_itens(img, wg._montar_layout(dados, largura, altura, fontes), fontes, estilo)
+
+            print(f"\n{resolucao}")
+            print(f"{'codificador':<30} | {'ms (mín)':>9} | {'tamanho (KB)':>12}")
+            for config in CODIFICACOES_BENCH:
+                codificacao = wg.ler_codificacao(config, "")
+                nome = " ".join(f"{k}={v}" for k, v in config.items())
+                caminho = os.path.join(pasta, "saida" + wg.CODIFICADORES[codificacao['formato']]['extensao'])
+                tempos = cronometrar(lambda: wg.salvar_imagem(img, caminho, codificacao), args.repeticoes)
+                tamanho_kb = os.path.getsize(caminho) / 1024
+                print(f"{nome:<30} | {min(tempos):>9.1f} | {tamanho_kb:>12.1f}")
+                resultados.append({'resolucao': resolucao, 'codificacao': codificacao,
+                                   'ms': round(min(tempos), 3), 'media_ms': round(statistics.mean(tempos), 3),
+                                   'tamanho_kb': round(tamanho_kb, 1)})
+
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            json.dump({'repeticoes': args.repeticoes, 'resultados': resultados}, f, indent=4, ensure_ascii=False)
+        print(f"\nResultados gravados em {args.saida}")
+
+
+def bench_historico(args):
+    """Histórico de conclusões com anos de eventos: leitura, acréscimo e as consultas do cooldown e do gráfico."""
+    with tempfile.TemporaryDirectory(prefix="evometric_bench_") as pasta:
+        caminho = os.path.join(pasta, "progress.json.historico")
+        # Uma conclusão a cada 4-8 horas (o ritmo máximo com o cooldown), terminando agora
+        instante = time.time() - args.anos * 365 * 86400
+        with open(caminho, 'wb') as f:
+            f.write(completion_history.CABECALHO)
+            passo = 0
+            while instante < time.time():
+                f.write(completion_history.REGISTRO.pack(instante, passo % 24, passo % 3, passo % 5))
+                instante += 4 * 3600 + (passo * 7919 % 4) * 3600
+                passo += 1
+        print(f"{passo} conclusões em {args.anos} anos ({os.path.getsize(caminho) / 1024:.0f} KB)\n")
+
+        imprimir_resultado("Leitura completa", cronometrar(lambda: len(completion_history.HistoricoConclusoes(caminho)),
+                                                          args.repeticoes))
+        historico = completion_history.HistoricoConclusoes(caminho)
+        len(historico)
+        imprimir_resultado("Acréscimo", cronometrar(lambda: historico.registrar("m1.s0.p0"), args.repeticoes))
+        imprimir_resultado("Cooldown", cronometrar(lambda: historico.cooldown_restante(4 * 3600), args.repeticoes))
+        imprimir_resultado("Contagens de 28 dias", cronometrar(lambda: historico.contagens_por_dia(28), args.repeticoes))
+        imprimir_resultado("Contagens de 52 semanas",
+                           cronometrar(lambda: historico.contagens_por_semana(52), args.repeticoes))
+        imprimir_resultado("Sequência atual", cronometrar(historico.sequencia_atual, args.repeticoes))
+        imprimir_resultado("Resumo do gráfico (cache)", cronometrar(lambda: historico.resumo(28), args.repeticoes))
+
+
+def medir_desenho(funcao, repeticoes, preparar=None):
+    """Tempo total e da fase 'desenhar' (fundo de legibilidade + texto) de cada render, pelo render_metrics."""
+    coletor = metricas.ColetorMemoria()
+    metricas.adicionar_gancho(coletor)
+    tempos = []
+    try:
+        for _ in range(repeticoes):
+            if preparar:
+                preparar()
+            inicio = time.perf_counter()
+            funcao()
+            tempos.append((time.perf_counter() - inicio) * 1000)
+    finally:
+        metricas.remover_gancho(coletor)
+    desenhar = [r['fases'].get('desenhar', 0.0) for r in coletor.renders]
+    return {'ms': round(min(tempos), 3), 'desenhar_ms': round(min(desenhar), 3)}
+
+
+def bench_legibilidade(args):
+    """
+    Contorno x painel sobre um fundo fotográfico: render completo com os sprites frios (a linha ainda não
+    foi rasterizada) e quentes, e a repintura incremental depois de concluir uma prática. A tabela mostra a
+    fase 'desenhar', onde os modos diferem; o total inclui a gravação da imagem, igual nos dois.
+    """
+    resultados = []
+    cache_original = wg.DIRETORIO_CACHE
+    with tempfile.TemporaryDirectory(prefix="evometric_bench_") as pasta:
+        wg.DIRETORIO_CACHE = os.path.join(pasta, "cache")
+        try:
+            for resolucao in args.resolucoes:
+                caminho_fundo = gerar_fundo_sintetico(os.path.join(pasta, f"fundo_{resolucao}.png"), resolucao)
+                print(f"\n{resolucao} ({args.praticas} práticas)")
+                print(f"{'modo':<12} | {'desenhar frio':>13} | {'desenhar quente':>15} | "
+                      f"{'desenhar incremental':>20} | {'total quente':>12}")
+                for nome, contorno, modo in MODOS_LEGIBILIDADE_BENCH:
+                    caminho_json = os.path.join(pasta, f"roadmap_{resolucao}_{modo}_{contorno}.json")
+                    dados = gerar_roadmap_sintetico(args.praticas, contorno, resolucao, caminho_fundo,
+                                                    os.path.join(pasta, f"saida_{resolucao}_{modo}_{contorno}.png"))
+                    dados['legibilidade'] = modo
+                    ArmazenamentoProgresso(caminho_json).salvar_snapshot(dados)
+
+                    def render(forcar=True, incremental=False):
+                        with contextlib.redirect_stdout(io.StringIO()):
+                            if wg.gerar_wallpaper(forcar=forcar, caminho_json=caminho_json, aplicar=False,
+                                                  incremental=incremental) is None:
+                                raise RuntimeError(f"Falha ao renderizar {caminho_json}")
+
+                    # O fundo fica em cache nos três casos: só o custo da legibilidade muda entre os modos
+                    render()
+                    frio = medir_desenho(render, args.repeticoes, preparar=wg._cache_sprites.limpar)
+                    quente = medir_desenho(render, args.repeticoes)
+
+                    roadmap = obter_roadmap(caminho_json)
+                    render(incremental=True)
+
+                    def concluir_proxima():
+                        pendentes = roadmap.praticas_pendentes()
+                        if pendentes:
+                            roadmap.concluir_pratica(pendentes[0])
+
+                    incremental = medir_desenho(lambda: render(forcar=False, incremental=True), args.repeticoes,
+                                                preparar=concluir_proxima)
+                    print(f"{nome:<12} | {frio['desenhar_ms']:>13.1f} | {quente['desenhar_ms']:>15.1f} | "
+                          f"{incremental['desenhar_ms']:>20.1f} | {quente['ms']:>12.1f}")
+                    resultados.append({'resolucao': resolucao, 'modo': nome, 'render_frio': frio,
+                                       'render_quente': quente, 'render_incremental': incremental})
+        finally:
+            wg.DIRETORIO_CACHE = cache_original
+
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            json.dump({'praticas': args.praticas, 'repeticoes': args.repeticoes, 'resultados': resultados},
+                      f, indent=4, ensure_ascii=False)
+        print(f"\nResultados gravados em {args.saida}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de desempenho do EvoMetric.")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p_fundo = sub.add_parser("fundo", help="Tempo de carga da camada de fundo (frio x quente).")
+    p_fundo.add_argument("--imagem", default=FUNDO_PADRAO)
+    p_fundo.add_argument("--resolucao", default="1920x1080")
+    p_fundo.add_argument("--repeticoes", type=int, default=5)
+    p_fundo.set_defaults(funcao=bench_fundo)
+
+    p_contorno = sub.add_parser("contorno", help="Contorno antigo (força bruta) x novo, larguras 0-5.")
+    p_contorno.add_argument("--tamanho-fonte", type=int, default=24)
+    p_contorno.add_argument("--linhas", type=int, default=20)
+    p_contorno.add_argument("--repeticoes", type=int, default=3)
+    p_contorno.set_defaults(funcao=bench_contorno)
+
+    p_codificacao = sub.add_parser("codificacao", help="Tempo de gravação e tamanho do arquivo por codificador.")
+    p_codificacao.add_argument("--resolucoes", nargs="+", default=["1920x1080", "3840x2160"])
+    p_codificacao.add_argument("--repeticoes", type=int, default=3)
+    p_codificacao.add_argument("--saida", default=None, help="JSON com os resultados (opcional).")
+    p_codificacao.set_defaults(funcao=bench_codificacao)
+
+    p_legibilidade = sub.add_parser("legibilidade", help="Texto com contorno x painel desfocado, em 1080p e 4K.")
+    p_legibilidade.add_argument("--resolucoes", nargs="+", default=["1920x1080", "3840x2160"])
+    p_legibilidade.add_argument("--praticas", type=int, default=100)
+    p_legibilidade.add_argument("--repeticoes", type=int, default=3)
+    p_legibilidade.add_argument("--saida", default=None, help="JSON com os resultados (opcional).")
+    p_legibilidade.set_defaults(funcao=bench_legibilidade)
+
+    p_historico = sub.add_parser("historico", help="Consultas do histórico de conclusões com anos de eventos.")
+    p_historico.add_argument("--anos", type=int, default=10)
+    p_historico.add_argument("--repeticoes", type=int, default=20)
+    p_historico.set_defaults(funcao=bench_historico)
+
+    p_suite = sub.add_parser("suite", help="Roadmaps sintéticos de 10 a 10.000 práticas: tempo e memória por fase.")
+    p_suite.add_argument("--saida", default="benchmark_resultados.json", help="JSON com os resultados.")
+    p_suite.add_argument("--repeticoes", type=int, default=3)
+    p_suite.add_argument("--rapido", action="store_true", help=f"Só árvores de até {MAX_PRATICAS_RAPIDO} práticas.")
+    p_suite.add_argument("--base", default=None, help="JSON de uma execução anterior para comparar ao final.")
+    p_suite.add_argument("--tolerancia", type=float, default=0.2, help="Piora aceita antes de acusar regressão (0.2 = 20%%).")
+    p_suite.set_defaults(funcao=bench_suite)
+
+    p_comparar = sub.add_parser("comparar", help="Compara dois resultados da suíte e acusa regressões.")
+    p_comparar.add_argument("atual")
+    p_comparar.add_argument("base")
+    p_comparar.add_argument("--tolerancia", type=float, default=0.2)
+    p_comparar.set_defaults(funcao=bench_comparar)
+
+    args = parser.parse_args()
+    return args.funcao(args) or 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,297 @@
+import datetime
+import os
+import re
+import struct
+import threading
+import time
+import zlib
+
+# --- Histórico de conclusões ---
+# Arquivo binário só de acréscimos ao lado do progress.json ("progress.json.historico"): um cabeçalho de
+# 16 bytes e um registro de 16 bytes por prática concluída (instante + ID da prática). Com registros de
+# tamanho fixo e em ordem de instante, acrescentar é O(1) e achar um intervalo de datas é uma busca
+# binária direto nos bytes, sem parsear o histórico inteiro.
+#
+# O ID "m3.s1.p2" é posicional: se o progress.json for editado por fora (uma prática inserida no meio,
+# módulos reordenados), os registros antigos passam a apontar para outra prática. Por isso cada registro
+# guarda também a identidade da prática (hash dos nomes do módulo, do subtópico e da prática), e quem
+# conhece a estrutura atual (o roadmap_model) remapeia o ID na leitura. A identidade tem 16 bits: com
+# nomes repetidos ou uma colisão, vale o ID posicional. Registros anteriores a ela têm identidade 0
+# (eram bytes de preenchimento) e ficam com o ID posicional.
+
+CABECALHO = b"EVOHIST\x01" + bytes(8)
+# instante (float64, segundos desde a época) + módulo, subtópico e prática do ID "m3.s1.p2" + identidade
+# da prática (uint16 cada)
+REGISTRO = struct.Struct('<dHHHH')
+_INSTANTE = struct.Struct('<d')
+# ID desconhecido (ex.: a conclusão migrada do last_completion.txt, que não guardava a prática)
+SEM_ID = 0xFFFF
+# Identidade desconhecida (registros antigos, conclusão migrada)
+SEM_IDENTIDADE = 0
+_ID_PRATICA = re.compile(r"m(\d+)\.s(\d+)\.p(\d+)$")
+
+
+def caminho_historico(caminho_json):
+    return caminho_json + ".historico"
+
+
+def _codificar_id(id_pratica):
+    if id_pratica is None:
+        return (SEM_ID, SEM_ID, SEM_ID)
+    partes = _ID_PRATICA.match(id_pratica)
+    if partes is None:
+        raise ValueError(f"ID de prática inválido: {id_pratica!r}")
+    return tuple(int(p) for p in partes.groups())
+
+
+def identidade_pratica(nome_modulo, nome_subtopico, nome_pratica):
+    """Hash de 16 bits dos nomes (nunca SEM_IDENTIDADE), estável entre execuções e máquinas."""
+    nomes = "\x1f".join((nome_modulo, nome_subtopico, nome_pratica)).encode('utf-8')
+    return zlib.crc32(nomes) % 0xFFFF + 1
+
+
+def _decodificar_id(modulo, subtopico, pratica):
+    if modulo == SEM_ID:
+        return None
+    return f"m{modulo}.s{subtopico}.p{pratica}"
+
+
+def _dia(instante):
+    """Data local do instante."""
+    return datetime.date.fromtimestamp(instante)
+
+
+def _inicio_dia(dia):
+    """Instante da meia-noite local do dia."""
+    return datetime.datetime.combine(dia, datetime.time.min).timestamp()
+
+
+class HistoricoConclusoes:
+    """
+    Histórico de conclusões de um roadmap. O arquivo é lido uma vez e, depois, só os registros acrescentados
+    (por este ou por outro processo) são lidos. A maior sequência de dias com conclusões é mantida conforme
+    os registros chegam; as outras consultas usam busca binária pelo instante.
+
+    `resolver(id_pratica, identidade)`, se dado, devolve o ID atual da prática gravada num registro (ou None se
+    ela não existir mais); sem ele, os IDs saem como foram gravados.
+    """
+
+    def __init__(self, caminho, resolver=None):
+        self.caminho = caminho
+        self.resolver = resolver
+        self._trava = threading.Lock()
+        self._bytes = bytearray()
+        self._tamanho_lido = None
+        self._cache_resumo = None
+        # Sequências de dias consecutivos, atualizadas a cada registro lido
+        self._ultimo_dia = None
+        self._sequencia = 0
+        self._maior_sequencia = 0
+
+    # --- Leitura ---
+
+    def _atualizar(self):
+        """Lê os registros acrescentados desde a última leitura (ou tudo, se o arquivo foi trocado)."""
+        try:
+            tamanho = os.path.getsize(self.caminho)
+        except OSError:
+            tamanho = 0
+        if tamanho == self._tamanho_lido:
+            return
+
+        completos = len(CABECALHO) + (max(tamanho - len(CABECALHO), 0) // REGISTRO.size) * REGISTRO.size
+        if self._tamanho_lido is None or completos < len(CABECALHO) + len(self._bytes):
+            self._reiniciar()
+        inicio = len(CABECALHO) + len(self._bytes)
+        if completos > inicio:
+            with open(self.caminho, 'rb') as f:
+                if f.read(len(CABECALHO)) != CABECALHO:
+                    print(f"Aviso: Histórico de conclusões com formato desconhecido ignorado ({self.caminho}).")
+                    self._tamanho_lido = tamanho
+                    return
+                f.seek(inicio)
+                novos = f.read(completos - inicio)
+            novos = novos[:len(novos) - len(novos) % REGISTRO.size]
+            self._bytes += novos
+            for posicao in range(0, len(novos), REGISTRO.size):
+                self._contar_dia(_INSTANTE.unpack_from(novos, posicao)[0])
+        self._tamanho_lido = tamanho
+
+    def _reiniciar(self):
+        self._bytes = bytearray()
+        self._ultimo_dia = None
+        self._sequencia = 0
+        self._maior_sequencia = 0
+        self._cache_resumo = None
+
+    def _contar_dia(self, instante):
+        dia = _dia(instante)
+        if dia == self._ultimo_dia:
+            return
+        if self._ultimo_dia is not None and (dia - self._ultimo_dia).days == 1:
+            self._sequencia += 1
+        else:
+            self._sequencia = 1
+        self._ultimo_dia = dia
+        self._maior_sequencia = max(self._maior_sequencia, self._sequencia)
+
+    def __len__(self):
+        with self._trava:
+            self._atualizar()
+            return len(self._bytes) // REGISTRO.size
+
+    def _instante(self, indice):
+        return _INSTANTE.unpack_from(self._bytes, indice * REGISTRO.size)[0]
+
+    def _registro(self, indice):
+        instante, modulo, subtopico, pratica, identidade = REGISTRO.unpack_from(self._bytes, indice * REGISTRO.size)
+        id_pratica = _decodificar_id(modulo, subtopico, pratica)
+        if self.resolver is not None and id_pratica is not None and identidade != SEM_IDENTIDADE:
+            id_pratica = self.resolver(id_pratica, identidade)
+        return instante, id_pratica
+
+    def _posicao(self, instante):
+        """Primeiro registro com instante >= instante (busca binária nos bytes)."""
+        baixo, alto = 0, len(self._bytes) // REGISTRO.size
+        while baixo < alto:
+            meio = (baixo + alto) // 2
+            if self._instante(meio) < instante:
+                baixo = meio + 1
+            else:
+                alto = meio
+        return baixo
+
+    # --- Escrita ---
+
+    def registrar(self, id_pratica, instante=None, identidade=SEM_IDENTIDADE):
+        """
+        Acrescenta uma conclusão (O(1)). `identidade` é a identidade_pratica() dos nomes da prática, para
+        remapear o ID se a estrutura mudar. Retorna o instante gravado.
+        """
+        if instante is None:
+            instante = time.time()
+        id_codificado = _codificar_id(id_pratica)
+        with self._trava:
+            self._atualizar()
+            if self._bytes:
+                # Mantém o arquivo em ordem mesmo se o relógio voltar (ajuste de horário, outra máquina)
+                instante = max(instante, self._instante(len(self._bytes) // REGISTRO.size - 1))
+            registro = REGISTRO.pack(instante, *id_codificado, identidade)
+
+            pasta = os.path.dirname(self.caminho)
+            if pasta:
+                os.makedirs(pasta, exist_ok=True)
+            with open(self.caminho, 'ab') as f:
+                if f.tell() == 0:
+                    f.write(CABECALHO)
+                f.write(registro)
+            self._atualizar()
+        return instante
+
+    def migrar_texto(self, caminho_texto):
+        """
+        Importa o instante do antigo last_completion.txt (que só guardava a última conclusão) se o histórico
+        ainda estiver vazio. Retorna True se importou algo.
+        """
+        if len(self) or not os.path.exists(caminho_texto):
+            return False
+        try:
+            with open(caminho_texto, 'r') as f:
+                instante = float(f.read())
+        except (OSError, ValueError) as e:
+            print(f"Aviso: Não foi possível migrar {caminho_texto}. Erro: {e}")
+            return False
+        self.registrar(None, instante)
+        return True
+
+    # --- Consultas ---
+
+    def ultima(self):
+        """(instante, id da prática) da última conclusão, ou None."""
+        with self._trava:
+            self._atualizar()
+            if not self._bytes:
+                return None
+            return self._registro(len(self._bytes) // REGISTRO.size - 1)
+
+    def eventos(self, inicio=None, fim=None):
+        """Conclusões (instante, id) com inicio <= instante < fim."""
+        with self._trava:
+            self._atualizar()
+            i = self._posicao(inicio) if inicio is not None else 0
+            j = self._posicao(fim) if fim is not None else len(self._bytes) // REGISTRO.size
+            return [self._registro(k) for k in range(i, j)]
+
+    def contar(self, inicio, fim):
+        """Número de conclusões com inicio <= instante < fim, em O(log n)."""
+        with self._trava:
+            self._atualizar()
+            return max(self._posicao(fim) - self._posicao(inicio), 0)
+
+    def cooldown_restante(self, segundos, agora=None):
+        """Segundos até o fim do cooldown contado da última conclusão (0 se já acabou)."""
+        ultima = self.ultima()
+        if ultima is None:
+            return 0
+        agora = time.time() if agora is None else agora
+        return max(ultima[0] + segundos - agora, 0)
+
+    def contagens_por_dia(self, dias, agora=None):
+        """Conclusões em cada um dos últimos dias (o último é hoje), em O(dias * log n)."""
+        hoje = _dia(time.time() if agora is None else agora)
+        limites = [_inicio_dia(hoje - datetime.timedelta(days=d)) for d in range(dias - 1, -2, -1)]
+        with self._trava:
+            self._atualizar()
+            posicoes = [self._posicao(limite) for limite in limites]
+        return [fim - inicio for inicio, fim in zip(posicoes, posicoes[1:])]
+
+    def contagens_por_semana(self, semanas, agora=None):
+        """Conclusões em cada uma das últimas semanas (segunda a domingo; a última é a atual)."""
+        hoje = _dia(time.time() if agora is None else agora)
+        segunda = hoje - datetime.timedelta(days=hoje.weekday())
+        limites = [_inicio_dia(segunda - datetime.timedelta(weeks=s)) for s in range(semanas - 1, -2, -1)]
+        with self._trava:
+            self._atualizar()
+            posicoes = [self._posicao(limite) for limite in limites]
+        return [fim - inicio for inicio, fim in zip(posicoes, posicoes[1:])]
+
+    def velocidade(self, dias, agora=None):
+        """Média de conclusões por dia nos últimos dias (incluindo hoje)."""
+        return sum(self.contagens_por_dia(dias, agora)) / dias if dias else 0.0
+
+    def sequencia_atual(self, agora=None):
+        """
+        Dias consecutivos com alguma conclusão, terminando hoje (ou ontem, se ainda não houve conclusão
+        hoje). O(1): a sequência é mantida enquanto os registros são lidos.
+        """
+        dia = _dia(time.time() if agora is None else agora)
+        with self._trava:
+            self._atualizar()
+            if self._ultimo_dia is None or (dia - self._ultimo_dia).days > 1:
+                return 0
+            # A sequência mantida na leitura termina no dia da última conclusão
+            return self._sequencia
+
+    def maior_sequencia(self):
+        with self._trava:
+            self._atualizar()
+            return self._maior_sequencia
+
+    def resumo(self, dias, agora=None):
+        """
+        Contagens diárias dos últimos dias, total e sequência atual, para o gráfico do wallpaper. Guardado
+        até chegar um registro novo ou o dia virar; None se o histórico estiver vazio.
+        """
+        agora = time.time() if agora is None else agora
+        with self._trava:
+            self._atualizar()
+            chave = (len(self._bytes), _dia(agora), dias)
+            if self._cache_resumo is not None and self._cache_resumo[0] == chave:
+                return self._cache_resumo[1]
+        if not chave[0]:
+            return None
+        contagens = self.contagens_por_dia(dias, agora)
+        resumo = {'dias': contagens, 'total': sum(contagens), 'sequencia': self.sequencia_atual(agora)}
+        with self._trava:
+            self._cache_resumo = (chave, resumo)
+        return resumo
@@ -0,0 +1,170 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+# --- Constantes do inotify (Linux) ---
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+MASCARA_INOTIFY = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+_EVENTO_INOTIFY = struct.Struct('iIII')
+
+
+def assinatura_arquivos(caminhos):
+    """(caminho, mtime, tamanho) de cada arquivo: só os.stat, nada é aberto nem parseado."""
+    assinatura = []
+    for caminho in caminhos:
+        try:
+            info = os.stat(caminho)
+            assinatura.append((caminho, info.st_mtime_ns, info.st_size))
+        except OSError:
+            assinatura.append((caminho, None, None))
+    return tuple(assinatura)
+
+
+class _Inotify:
+    """Acesso mínimo ao inotify via ctypes. Observa as pastas (salvamentos atômicos trocam o arquivo)."""
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._libc = libc
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 falhou")
+        self._pastas = {}
+
+    def observar_pastas(self, pastas):
+        for pasta in pastas:
+            if pasta in self._pastas:
+                continue
+            wd = self._libc.inotify_add_watch(self.fd, os.fsencode(pasta), MASCARA_INOTIFY)
+            if wd >= 0:
+                self._pastas[pasta] = wd
+
+    def aguardar(self, timeout):
+        """Espera eventos por até timeout segundos. Retorna os nomes de arquivo que mudaram."""
+        prontos, _, _ = select.select([self.fd], [], [], timeout)
+        if not prontos:
+            return set()
+
+        nomes = set()
+        try:
+            bruto = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return nomes
+
+        posicao = 0
+        while posicao + _EVENTO_INOTIFY.size <= len(bruto):
+            _, _, _, tamanho_nome = _EVENTO_INOTIFY.unpack_from(bruto, posicao)
+            posicao += _EVENTO_INOTIFY.size
+            nome = bruto[posicao:posicao + tamanho_nome].rstrip(b'\0')
+            posicao += tamanho_nome
+            nomes.add(os.fsdecode(nome))
+        return nomes
+
+    def fechar(self):
+        os.close(self.fd)
+
+
+class ObservadorArquivos:
+    """
+    Observa arquivos de entrada e chama ao_mudar() quando eles mudam, numa thread em segundo plano.
+
+    - No Linux usa inotify (a thread fica bloqueada no select enquanto nada muda); nos outros sistemas,
+      ou se o inotify falhar, verifica mtime/tamanho a cada intervalo segundos.
+    - Rajadas de escritas são agrupadas: ao_mudar() só é chamado depois de debounce segundos sem mudanças.
+    - A decisão é sempre tomada pela assinatura (mtime/tamanho): eventos que não mudam os arquivos
+      observados (ex.: o próprio PNG de saída na mesma pasta) não disparam nada.
+
+    obter_caminhos() é chamada a cada disparo, para acompanhar mudanças na lista (ex.: novo fundo).
+    """
+
+    def __init__(self, obter_caminhos, ao_mudar, debounce=0.5, intervalo=1.0, usar_inotify=None):
+        self.obter_caminhos = obter_caminhos
+        self.ao_mudar = ao_mudar
+        self.debounce = debounce
+        self.intervalo = intervalo
+        self.disparos = 0
+        self._parar = threading.Event()
+        self._inotify = None
+
+        if usar_inotify is None:
+            usar_inotify = sys.platform.startswith('linux')
+        if usar_inotify:
+            try:
+                self._inotify = _Inotify()
+            except (OSError, AttributeError) as e:
+                print(f"Aviso: inotify indisponível, usando verificação periódica. Erro: {e}")
+
+        self._caminhos = list(obter_caminhos())
+        self._assinatura = assinatura_arquivos(self._caminhos)
+        self._thread = threading.Thread(target=self._executar, name="EvoMetricObservador", daemon=True)
+
+    @property
+    def modo(self):
+        return "inotify" if self._inotify else "polling"
+
+    def iniciar(self):
+        self._thread.start()
+        return self
+
+    def parar(self, timeout=None):
+        self._parar.set()
+        self._thread.join(timeout)
+
+    def _aguardar(self, pendente):
+        """Bloqueia até um evento relevante, o fim do debounce ou o tempo de verificação."""
+        timeout = self.debounce if pendente else self.intervalo
+        if self._inotify is None:
+            self._parar.wait(timeout)
+            return True
+
+        self._inotify.observar_pastas({os.path.dirname(os.path.abspath(c)) for c in self._caminhos})
+        nomes = self._inotify.aguardar(timeout)
+        return pendente or bool(nomes & {os.path.basename(c) for c in self._caminhos})
+
+    def _atualizar_caminhos(self):
+        """Relê a lista de arquivos; a assinatura só é refeita se a lista mudou (para não perder mudanças)."""
+        try:
+            caminhos = list(self.obter_caminhos())
+        except Exception as e:
+            print(f"Aviso: Não foi possível atualizar os arquivos observados. Erro: {e}")
+            return
+        if caminhos != self._caminhos:
+            self._caminhos = caminhos
+            self._assinatura = assinatura_arquivos(caminhos)
+
+    def _executar(self):
+        ultima_mudanca = None
+        try:
+            while not self._parar.is_set():
+                if not self._aguardar(ultima_mudanca is not None):
+                    continue
+
+                assinatura = assinatura_arquivos(self._caminhos)
+                agora = time.monotonic()
+                if assinatura != self._assinatura:
+                    self._assinatura = assinatura
+                    ultima_mudanca = agora
+                    continue
+
+                if ultima_mudanca is not None and agora - ultima_mudanca >= self.debounce:
+                    ultima_mudanca = None
+                    self.disparos += 1
+                    try:
+                        self.ao_mudar()
+                    except Exception as e:
+                        print(f"Erro ao tratar mudança nos arquivos observados: {e}")
+                    self._atualizar_caminhos()
+        finally:
+            if self._inotify is not None:
+                self._inotify.fechar()
@@ -0,0 +1,237 @@
+import json
+import os
+
+# Tamanho do journal a partir do qual ele é consolidado num novo progress.json
+LIMITE_JOURNAL_BYTES = 64 * 1024
+
+# Tipos de mutação gravados no journal
+OP_ADICIONAR_PRATICA = "adicionar_pratica"
+OP_CONCLUIR_PRATICA = "concluir_pratica"
+OP_CONFIGURAR = "configurar"
+
+
+def localizar_subtopico(dados, mutacao):
+    """
+    (índice do módulo, índice do subtópico) a que a mutação se refere. As posições gravadas valem se os
+    nomes gravados junto delas (a guarda de identidade) ainda baterem; se o progress.json foi editado por
+    fora (ex.: um módulo inserido no meio), o subtópico é procurado pelos nomes. None se ele não existir mais.
+    Mutações antigas, sem os nomes, usam só as posições.
+    """
+    i, j = mutacao['modulo'], mutacao['subtopico']
+    if 'nome_modulo' not in mutacao:
+        return i, j
+
+    modulos = dados['modulos']
+    if i < len(modulos) and modulos[i].get('nome') == mutacao['nome_modulo']:
+        subtopicos = modulos[i].get('subtopicos', [])
+        if j < len(subtopicos) and subtopicos[j].get('nome') == mutacao['nome_subtopico']:
+            return i, j
+    for i, modulo in enumerate(modulos):
+        if modulo.get('nome') != mutacao['nome_modulo']:
+            continue
+        for j, subtopico in enumerate(modulo.get('subtopicos', [])):
+            if subtopico.get('nome') == mutacao['nome_subtopico']:
+                return i, j
+    return None
+
+
+def localizar_pratica(dados, mutacao):
+    """(módulo, subtópico, prática) a que a mutação se refere, com a mesma guarda de localizar_subtopico()."""
+    posicao = localizar_subtopico(dados, mutacao)
+    if posicao is None:
+        return None
+    i, j = posicao
+    k = mutacao['pratica']
+    if 'nome_pratica' not in mutacao:
+        return i, j, k
+
+    praticas = dados['modulos'][i]['subtopicos'][j].get('praticas', [])
+    if k < len(praticas) and praticas[k].get('nome') == mutacao['nome_pratica']:
+        return i, j, k
+    for k, pratica in enumerate(praticas):
+        if pratica.get('nome') == mutacao['nome_pratica']:
+            return i, j, k
+    return None
+
+
+def pratica_ja_adicionada(praticas, mutacao):
+    """Se a prática da mutação adicionar_pratica já está na lista (a mutação já foi aplicada)."""
+    k = mutacao['pratica']
+    if len(praticas) == k:
+        return False
+    if 'nome_modulo' not in mutacao:
+        return True
+    if k < len(praticas) and praticas[k].get('nome') == mutacao['nome']:
+        return True
+    # O subtópico mudou por fora desde a gravação: vale o nome
+    return any(p.get('nome') == mutacao['nome'] for p in praticas)
+
+
+def avisar_mutacao_ignorada(mutacao, caminho_journal=None):
+    origem = f" ({caminho_journal})" if caminho_journal else ""
+    print(f"Aviso: Mutação do journal não corresponde mais ao progress.json e foi ignorada{origem}: "
+          f"{json.dumps(mutacao, ensure_ascii=False)}")
+
+
+def aplicar_mutacao(dados, mutacao):
+    """
+    Aplica uma mutação do journal sobre os dados do roadmap (em memória).
+    Todas as mutações são idempotentes: reaplicar uma mutação que já está no snapshot não muda nada.
+    Isso torna segura a janela entre gravar o snapshot e esvaziar o journal na compactação.
+
+    Retorna a posição efetiva do item (ver localizar_subtopico), que difere da gravada se o progress.json
+    foi editado por fora, ou None se o item não existir mais (a mutação é ignorada). 'configurar' retorna ().
+    """
+    op = mutacao['op']
+
+    if op == OP_ADICIONAR_PRATICA:
+        posicao = localizar_subtopico(dados, mutacao)
+        if posicao is None:
+            return None
+        subtopico = dados['modulos'][posicao[0]]['subtopicos'][posicao[1]]
+        praticas = subtopico.setdefault('praticas', [])
+        if not pratica_ja_adicionada(praticas, mutacao):
+            praticas.append({"nome": mutacao['nome'], "concluido": False})
+        return posicao
+
+    elif op == OP_CONCLUIR_PRATICA:
+        posicao = localizar_pratica(dados, mutacao)
+        if posicao is None:
+            return None
+        i, j, k = posicao
+        dados['modulos'][i]['subtopicos'][j]['praticas'][k]['concluido'] = True
+        return posicao
+
+    elif op == OP_CONFIGURAR:
+        dados.update(mutacao['campos'])
+        return ()
+
+    else:
+        raise ValueError(f"Mutação desconhecida no journal: {op}")
+
+
+def _posicao_gravada(mutacao):
+    if mutacao['op'] == OP_ADICIONAR_PRATICA:
+        return (mutacao['modulo'], mutacao['subtopico'])
+    if mutacao['op'] == OP_CONCLUIR_PRATICA:
+        return (mutacao['modulo'], mutacao['subtopico'], mutacao['pratica'])
+    return ()
+
+
+class ArmazenamentoProgresso:
+    """
+    Armazenamento do progress.json com journal de mutações (append-only).
+
+    O progress.json continua sendo o snapshot, no mesmo formato de sempre. Cada alteração feita pela
+    interface vira uma linha JSON pequena em "progress.json.journal"; a leitura carrega o snapshot e
+    reaplica o journal. Quando o journal passa de limite_journal_bytes, ele é consolidado num snapshot
+    novo, gravado de forma atômica (arquivo temporário + os.replace).
+
+    Cada mutação guarda, além das posições, os nomes do módulo, do subtópico e da prática: se o progress.json
+    for editado por fora com o journal ainda cheio, a reaplicação acha o item pelo nome (ou ignora a mutação)
+    em vez de alterar outro item que passou a ocupar a mesma posição.
+    """
+
+    def __init__(self, caminho_json, limite_journal_bytes=LIMITE_JOURNAL_BYTES):
+        self.caminho_json = caminho_json
+        self.caminho_journal = caminho_json + ".journal"
+        self.limite_journal_bytes = limite_journal_bytes
+        # Até onde o journal foi lido no último carregar() (ver ler_journal)
+        self.posicao_journal = 0
+        # Se o último carregar() achou mutações fora da posição gravada (ou ignorou alguma): o journal não
+        # bate mais com o snapshot e deve ser consolidado
+        self.journal_divergente = False
+
+    def carregar(self):
+        """
+        Carrega o snapshot e reaplica o journal. Propaga FileNotFoundError e json.JSONDecodeError do snapshot.
+        Linhas incompletas no journal (queda no meio da escrita) são ignoradas.
+        """
+        with open(self.caminho_json, 'r', encoding='utf-8') as f:
+            dados = json.load(f)
+
+        mutacoes, self.posicao_journal = self.ler_journal()
+        self.journal_divergente = False
+        for mutacao in mutacoes:
+            posicao = aplicar_mutacao(dados, mutacao)
+            if posicao is None:
+                avisar_mutacao_ignorada(mutacao, self.caminho_journal)
+                self.journal_divergente = True
+            elif posicao != _posicao_gravada(mutacao):
+                self.journal_divergente = True
+        return dados
+
+    def registrar(self, mutacao):
+        """
+        Grava a mutação no fim do journal (custo proporcional à mudança, não ao roadmap), com fsync.
+        Propaga OSError (ex.: disco cheio): quem chama só aplica a mutação em memória depois do retorno.
+        Retorna True se o journal passou de limite_journal_bytes e deve ser consolidado (ver compactar).
+        """
+        linha = json.dumps(mutacao, ensure_ascii=False) + "\n"
+        if self._termina_incompleto():
+            # Fecha a linha deixada pela metade numa queda, para não colar a mutação nova nela
+            linha = "\n" + linha
+        with open(self.caminho_journal, 'a', encoding='utf-8') as f:
+            f.write(linha)
+            f.flush()
+            os.fsync(f.fileno())
+
+        return os.path.getsize(self.caminho_journal) >= self.limite_journal_bytes
+
+    def compactar(self, dados=None):
+        """
+        Consolida snapshot + journal num novo progress.json (escrita atômica) e esvazia o journal.
+        dados, se informado, deve ser o roadmap em memória com todas as mutações do journal aplicadas.
+        """
+        if dados is None:
+            dados = self.carregar()
+        self.salvar_snapshot(dados)
+
+    def salvar_snapshot(self, dados):
+        """Grava o roadmap inteiro como snapshot, de forma atômica, e descarta o journal já incorporado."""
+        temporario = self.caminho_json + ".tmp"
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(dados, f, indent=4, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporario, self.caminho_json)
+
+        # Se cair aqui, o journal antigo é reaplicado sobre o snapshot novo sem efeito (mutações idempotentes)
+        if os.path.exists(self.caminho_journal):
+            os.remove(self.caminho_journal)
+
+    def _termina_incompleto(self):
+        try:
+            with open(self.caminho_journal, 'rb') as f:
+                f.seek(0, os.SEEK_END)
+                if f.tell() == 0:
+                    return False
+                f.seek(-1, os.SEEK_END)
+                return f.read(1) != b"\n"
+        except FileNotFoundError:
+            return False
+
+    def ler_journal(self, posicao=0):
+        """
+        Mutações do journal a partir do byte posicao. Retorna (mutacoes, nova_posicao), onde nova_posicao
+        fica logo após a última linha completa: uma linha ainda sem o "\n" final (outro processo no meio
+        da escrita, ou uma queda) não é consumida e volta a ser lida na próxima chamada.
+        """
+        try:
+            with open(self.caminho_journal, 'rb') as f:
+                f.seek(posicao)
+                bruto = f.read()
+        except FileNotFoundError:
+            return [], 0
+
+        fim = bruto.rfind(b"\n") + 1
+        mutacoes = []
+        for linha in bruto[:fim].decode('utf-8', errors='replace').splitlines():
+            if not linha.strip():
+                continue
+            try:
+                mutacoes.append(json.loads(linha))
+            except json.JSONDecodeError:
+                # Só uma escrita interrompida por queda deixa uma linha assim (ver registrar())
+                print(f"Aviso: Linha incompleta do journal foi ignorada ({self.caminho_journal}).")
+        return mutacoes, posicao + fim
@@ -0,0 +1,523 @@
+import argparse
+import glob
+import hashlib
+import json
+import os
+import secrets
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from multiprocessing.connection import Client, Listener
+
+# --- Serviço de render residente ---
+# Um processo de longa duração por roadmap mantém as fontes, o fundo decodificado e o roadmap parseado em
+# memória e atende pedidos de render e de mutação por IPC local (pipe nomeado no Windows, socket Unix nos
+# outros sistemas). A interface (task_adder.py) grava as mutações no journal, pede os renders ao serviço e
+# não importa o Pillow. Este módulo só importa o wallpaper_generator (e o Pillow) do lado do servidor.
+
+# Mesma pasta de cache do wallpaper_generator (definida aqui para o cliente não importar o Pillow)
+DIRETORIO_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".evometric_cache")
+# Quanto o cliente espera o serviço recém-iniciado aceitar conexões
+TEMPO_INICIO_SEGUNDOS = 15.0
+# Quanto o cliente espera a resposta de um pedido (um render completo em 4K leva alguns segundos)
+TEMPO_LIMITE_PEDIDO_SEGUNDOS = 120.0
+# Sem nenhum cliente conectado por este tempo, o serviço se encerra (0 = nunca)
+TEMPO_OCIOSO_SEGUNDOS = 30 * 60
+
+
+class ServicoIndisponivel(Exception):
+    """O serviço não está rodando e não pôde ser iniciado (o chamador renderiza no próprio processo)."""
+
+
+def versao_codigo():
+    """
+    Hash do código do EvoMetric (os .py desta pasta). O serviço guarda o do código que carregou; o cliente
+    compara com o dos arquivos atuais e reinicia um serviço que ficou de uma versão anterior.
+    """
+    resumo = hashlib.sha1()
+    for caminho in sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), "*.py"))):
+        with open(caminho, 'rb') as f:
+            resumo.update(os.path.basename(caminho).encode('utf-8'))
+            resumo.update(f.read())
+    return resumo.hexdigest()[:16]
+
+
+def _chave_roadmap(caminho_json):
+    return hashlib.sha1(os.path.normcase(os.path.abspath(caminho_json)).encode('utf-8')).hexdigest()[:12]
+
+
+def caminho_estado(caminho_json):
+    """Arquivo com o endereço, a chave de autenticação e o pid do serviço daquele roadmap."""
+    return os.path.join(DIRETORIO_CACHE, f"daemon-{_chave_roadmap(caminho_json)}.json")
+
+
+def _novo_endereco(caminho_json):
+    """Endereço de escuta: pipe nomeado no Windows, socket Unix se houver, senão TCP só em localhost."""
+    chave = _chave_roadmap(caminho_json)
+    if sys.platform == 'win32':
+        return 'AF_PIPE', rf"\\.\pipe\evometric-{chave}"
+    if hasattr(socket, 'AF_UNIX'):
+        usuario = os.getuid() if hasattr(os, 'getuid') else 0
+        return 'AF_UNIX', os.path.join(tempfile.gettempdir(), f"evometric-{usuario}-{chave}.sock")
+    return 'AF_INET', ('127.0.0.1', 0)
+
+
+def ler_estado(caminho_json):
+    try:
+        with open(caminho_estado(caminho_json), 'r', encoding='utf-8') as f:
+            estado = json.load(f)
+        if estado['familia'] == 'AF_INET':
+            estado['endereco'] = tuple(estado['endereco'])
+        return estado
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def _gravar_estado(caminho_json, estado):
+    """Grava o estado só legível pelo usuário (a chave autentica os pedidos) e troca o arquivo atomicamente."""
+    os.makedirs(DIRETORIO_CACHE, exist_ok=True)
+    caminho = caminho_estado(caminho_json)
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    descritor = os.open(temporario, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(descritor, 'w', encoding='utf-8') as f:
+        json.dump(estado, f)
+    os.replace(temporario, caminho)
+
+
+def _remover_estado(caminho_json):
+    estado = ler_estado(caminho_json)
+    if estado is not None and estado.get('pid') == os.getpid():
+        try:
+            os.remove(caminho_estado(caminho_json))
+        except OSError:
+            pass
+
+
+def _conectar(estado):
+    return Client(estado['endereco'], family=estado['familia'], authkey=bytes.fromhex(estado['chave']))
+
+
+# --- Servidor ---
+
+class ServicoRender:
+    """
+    Atende os pedidos de um roadmap. Os renders são serializados (um gerar_wallpaper por vez, seja pedido
+    por um cliente ou pelo observador de arquivos); cada conexão é tratada numa thread.
+
+    Pedidos: {'op': ..., argumentos}. Respostas: {'ok': True, 'resultado': ..., 'ms': ...} ou
+    {'ok': False, 'erro': mensagem}.
+
+    - ping: pid, roadmap, desde quando o serviço está no ar e a versão do código (ver versao_codigo).
+    - renderizar(forcar=False): resultado do gerar_wallpaper().
+    - concluir_pratica(id), adicionar_pratica(subtopico, nome), configurar(campos): mutações pelo journal,
+      seguidas de um render (renderizar=False só grava). adicionar_pratica responde com o ID da prática.
+    - estatisticas: pedidos atendidos, renders, tempo médio e caches do wallpaper_generator.
+    - encerrar: para o serviço depois de responder.
+
+    Sem clientes conectados por tempo_ocioso segundos, o serviço se encerra sozinho.
+    """
+
+    def __init__(self, caminho_json, aplicar=True, observar=True, tempo_ocioso=TEMPO_OCIOSO_SEGUNDOS):
+        # Antes dos imports: a versão tem de ser a do código que este processo carrega
+        self.versao = versao_codigo()
+        import wallpaper_generator as wg
+        from render_queue import FilaRenderizacao
+
+        self.wg = wg
+        self.caminho_json = os.path.abspath(caminho_json)
+        self.aplicar = aplicar
+        self.observar = observar
+        self.iniciado = time.time()
+        self.pedidos = 0
+        self.renders = 0
+        self.ms_renders = 0.0
+        self.encerrando = False
+        self.tempo_ocioso = tempo_ocioso
+        self.conexoes = 0
+        self.ultima_atividade = time.monotonic()
+        self._trava_render = threading.Lock()
+        self._trava_contadores = threading.Lock()
+        self.listener = None
+
+        # Renders pedidos pelo observador (arquivos alterados por fora) passam pela mesma trava dos clientes
+        self.fila = FilaRenderizacao(lambda: self.renderizar(False))
+        self.observador = None
+
+    def aquecer(self):
+        """Deixa o roadmap, as fontes e o fundo em memória com um primeiro render e começa a observar os arquivos."""
+        self.wg._carregar_fontes()
+        self.fila.solicitar()
+        if self.observar:
+            self.observador = self.wg.iniciar_observador(self.fila, self.caminho_json)
+
+    def renderizar(self, forcar=False):
+        with self._trava_render:
+            inicio = time.perf_counter()
+            resultado = self.wg.gerar_wallpaper(forcar=forcar, caminho_json=self.caminho_json, aplicar=self.aplicar)
+            ms = (time.perf_counter() - inicio) * 1000
+        with self._trava_contadores:
+            self.renders += 1
+            self.ms_renders += ms
+        return resultado
+
+    def _roadmap(self):
+        from roadmap_model import obter_roadmap
+        return obter_roadmap(self.caminho_json)
+
+    def _item(self, roadmap, id_item):
+        item = roadmap.obter(id_item)
+        if item is None:
+            raise KeyError(f"ID não encontrado no roadmap: {id_item}")
+        return item
+
+    def atender(self, pedido):
+        op = pedido.get('op')
+        renderizar = pedido.get('renderizar', True)
+
+        if op == 'ping':
+            return {'pid': os.getpid(), 'caminho_json': self.caminho_json, 'iniciado': self.iniciado,
+                    'versao': self.versao}
+
+        if op == 'renderizar':
+            return self.renderizar(pedido.get('forcar', False))
+
+        if op == 'concluir_pratica':
+            roadmap = self._roadmap()
+            roadmap.concluir_pratica(self._item(roadmap, pedido['id']))
+            return self.renderizar() if renderizar else None
+
+        if op == 'adicionar_pratica':
+            roadmap = self._roadmap()
+            pratica = roadmap.adicionar_pratica(self._item(roadmap, pedido['subtopico']), pedido['nome'])
+            if renderizar:
+                self.renderizar()
+            return pratica.id
+
+        if op == 'configurar':
+            self._roadmap().configurar(pedido['campos'])
+            return self.renderizar() if renderizar else None
+
+        if op == 'estatisticas':
+            with self._trava_contadores:
+                return {
+                    'pedidos': self.pedidos,
+                    'renders': self.renders,
+                    'ms_medio_render': round(self.ms_renders / self.renders, 3) if self.renders else None,
+                    'caches': self.wg.estatisticas_cache(),
+                }
+
+        if op == 'encerrar':
+            self.encerrando = True
+            return None
+
+        raise ValueError(f"Operação desconhecida: {op!r}")
+
+    def _tratar_conexao(self, conexao):
+        with self._trava_contadores:
+            self.conexoes += 1
+        try:
+            self._atender_conexao(conexao)
+        finally:
+            with self._trava_contadores:
+                self.conexoes -= 1
+                self.ultima_atividade = time.monotonic()
+
+    def _atender_conexao(self, conexao):
+        with conexao:
+            while not self.encerrando:
+                try:
+                    pedido = conexao.recv()
+                except (EOFError, OSError):
+                    return
+
+                inicio = time.perf_counter()
+                try:
+                    resposta = {'ok': True, 'resultado': self.atender(pedido)}
+                except Exception as e:
+                    resposta = {'ok': False, 'erro': f"{type(e).__name__}: {e}"}
+                resposta['ms'] = round((time.perf_counter() - inicio) * 1000, 3)
+                with self._trava_contadores:
+                    self.pedidos += 1
+
+                try:
+                    conexao.send(resposta)
+                except OSError:
+                    return
+            self._acordar_listener()
+
+    def _vigiar_ociosidade(self):
+        """Encerra o serviço quando ele passa tempo_ocioso segundos sem nenhum cliente conectado."""
+        while not self.encerrando:
+            time.sleep(min(60.0, self.tempo_ocioso / 4))
+            with self._trava_contadores:
+                ocioso = self.conexoes == 0 and time.monotonic() - self.ultima_atividade >= self.tempo_ocioso
+            if ocioso and not self.encerrando:
+                print(f"Serviço ocioso por {self.tempo_ocioso:.0f} s; encerrando.")
+                self.encerrando = True
+                self._acordar_listener()
+                return
+
+    def _acordar_listener(self):
+        """O accept() bloqueado não percebe o encerramento sozinho: uma conexão vazia o libera."""
+        try:
+            _conectar(ler_estado(self.caminho_json)).close()
+        except Exception:
+            pass
+
+    def servir(self):
+        """Escuta até receber 'encerrar' (ou Ctrl+C). Retorna o código de saída do processo."""
+        estado = ler_estado(self.caminho_json)
+        if estado is not None and _responde(estado):
+            print(f"O serviço de render deste roadmap já está rodando (pid {estado.get('pid')}).")
+            self.fila.encerrar()
+            return 1
+
+        familia, endereco = _novo_endereco(self.caminho_json)
+        if familia == 'AF_UNIX' and os.path.exists(endereco):
+            # Socket órfão de um serviço que não encerrou direito (o ping acima não teve resposta)
+            os.remove(endereco)
+        chave = secrets.token_bytes(32)
+        self.listener = Listener(endereco, family=familia, authkey=chave)
+        if familia == 'AF_UNIX':
+            os.chmod(endereco, 0o600)
+
+        endereco = self.listener.address
+        _gravar_estado(self.caminho_json, {
+            'pid': os.getpid(), 'familia': familia, 'endereco': endereco, 'chave': chave.hex(),
+            'caminho_json': self.caminho_json, 'iniciado': self.iniciado, 'versao': self.versao,
+        })
+        print(f"Serviço de render de {self.caminho_json} ouvindo em {endereco} (pid {os.getpid()}).")
+        self.aquecer()
+        if self.tempo_ocioso:
+            threading.Thread(target=self._vigiar_ociosidade, name="EvoMetricOciosidade", daemon=True).start()
+
+        try:
+            while not self.encerrando:
+                try:
+                    conexao = self.listener.accept()
+                except Exception as e:
+                    # Cliente com a chave errada ou que desistiu no meio da autenticação
+                    if not self.encerrando:
+                        print(f"Aviso: Conexão recusada. Erro: {e}")
+                    continue
+                threading.Thread(target=self._tratar_conexao, args=(conexao,), name="EvoMetricCliente",
+                                 daemon=True).start()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.encerrar()
+        return 0
+
+    def encerrar(self):
+        self.encerrando = True
+        # O listener fecha antes de o estado sumir: fechar um socket Unix apaga o arquivo dele, que um serviço
+        # novo (iniciado quando o estado some) já pode estar usando no mesmo endereço
+        if self.listener is not None:
+            self.listener.close()
+        if self.observador is not None:
+            self.observador.parar()
+        # Não interrompe um render no meio da gravação da imagem nem a aplicação dele
+        self.fila.encerrar()
+        self.wg.obter_aplicador().aguardar()
+        _remover_estado(self.caminho_json)
+
+
+def _responde(estado):
+    try:
+        with _conectar(estado) as conexao:
+            conexao.send({'op': 'ping'})
+            return conexao.poll(TEMPO_INICIO_SEGUNDOS) and conexao.recv().get('ok', False)
+    except Exception:
+        return False
+
+
+# --- Cliente ---
+
+def iniciar_servico(caminho_json, aplicar=True):
+    """Inicia o serviço num processo separado, desligado do terminal/da janela de quem chamou."""
+    os.makedirs(DIRETORIO_CACHE, exist_ok=True)
+    comando = [sys.executable, os.path.abspath(__file__), "--json", os.path.abspath(caminho_json)]
+    if not aplicar:
+        comando.append("--sem-aplicar")
+    opcoes = {}
+    if sys.platform == 'win32':
+        opcoes['creationflags'] = subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        opcoes['start_new_session'] = True
+    log = open(os.path.join(DIRETORIO_CACHE, f"daemon-{_chave_roadmap(caminho_json)}.log"), 'a', encoding='utf-8')
+    with log:
+        return subprocess.Popen(comando, stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), **opcoes)
+
+
+def _aguardar_encerramento(caminho_json, estado):
+    """Espera o serviço do estado remover o arquivo de estado (ou outro serviço tomar o lugar dele)."""
+    limite = time.monotonic() + TEMPO_INICIO_SEGUNDOS
+    while time.monotonic() < limite:
+        atual = ler_estado(caminho_json)
+        if atual is None or atual.get('pid') != estado.get('pid'):
+            return
+        time.sleep(0.05)
+
+
+class ClienteRender:
+    """
+    Cliente do serviço de render de um roadmap. A conexão é aberta no primeiro pedido e reaproveitada;
+    com iniciar=True, o serviço é iniciado se não estiver rodando, e um serviço que roda outra versão do
+    código (ver versao_codigo) é encerrado e iniciado de novo. Pedidos de threads diferentes são
+    enviados um por vez.
+    """
+
+    def __init__(self, caminho_json, iniciar=True, aplicar=True):
+        self.caminho_json = caminho_json
+        self.iniciar = iniciar
+        self.aplicar = aplicar
+        self._conexao = None
+        self._trava = threading.Lock()
+
+    def conectar(self):
+        """Conexão aberta com o serviço (iniciando-o se preciso), ou None se ele não estiver disponível."""
+        with self._trava:
+            return self._conectar()
+
+    def _conectar(self):
+        if self._conexao is not None:
+            return self._conexao
+
+        estado = ler_estado(self.caminho_json)
+        if estado is not None:
+            try:
+                self._conexao = self._conectar_versao_atual(estado)
+                if self._conexao is not None:
+                    return self._conexao
+            except Exception:
+                pass
+        if not self.iniciar:
+            return None
+
+        processo = iniciar_servico(self.caminho_json, self.aplicar)
+        limite = time.monotonic() + TEMPO_INICIO_SEGUNDOS
+        while time.monotonic() < limite and processo.poll() is None:
+            time.sleep(0.05)
+            novo = ler_estado(self.caminho_json)
+            if novo is not None and novo != estado:
+                try:
+                    self._conexao = self._conectar_versao_atual(novo)
+                    if self._conexao is not None:
+                        return self._conexao
+                except Exception:
+                    pass
+        # Outro cliente pode ter iniciado o serviço antes (este processo então sai logo com código 1)
+        novo = ler_estado(self.caminho_json)
+        if novo is not None:
+            try:
+                self._conexao = _conectar(novo)
+                return self._conexao
+            except Exception:
+                pass
+        return None
+
+    def _conectar_versao_atual(self, estado):
+        """
+        Conexão com o serviço do estado. Com iniciar=True, confere a versão dele pelo ping: um serviço de
+        outra versão é encerrado (o chamador inicia um novo) e o retorno é None.
+        """
+        conexao = _conectar(estado)
+        if not self.iniciar:
+            return conexao
+        try:
+            conexao.send({'op': 'ping'})
+            if conexao.poll(TEMPO_INICIO_SEGUNDOS):
+                resposta = conexao.recv()
+                if resposta.get('ok') and resposta['resultado'].get('versao') == versao_codigo():
+                    return conexao
+            print(f"Aviso: O serviço de render (pid {estado.get('pid')}) roda outra versão do código; reiniciando.")
+            conexao.send({'op': 'encerrar'})
+            conexao.poll(TEMPO_INICIO_SEGUNDOS)
+        except (EOFError, OSError):
+            pass
+        conexao.close()
+        _aguardar_encerramento(self.caminho_json, estado)
+        return None
+
+    def pedir(self, op, **argumentos):
+        """
+        Envia um pedido e devolve o 'resultado'. Levanta ServicoIndisponivel se não conseguir falar com o
+        serviço e RuntimeError com a mensagem do serviço se o pedido falhar lá.
+        """
+        with self._trava:
+            for tentativa in range(2):
+                conexao = self._conectar()
+                if conexao is None:
+                    raise ServicoIndisponivel("o serviço de render não pôde ser iniciado")
+                try:
+                    conexao.send({'op': op, **argumentos})
+                    respondeu = conexao.poll(TEMPO_LIMITE_PEDIDO_SEGUNDOS)
+                    if respondeu:
+                        resposta = conexao.recv()
+                        break
+                except (EOFError, OSError) as e:
+                    # Serviço reiniciado ou encerrado: reconecta uma vez (a conexão antiga não serve mais)
+                    self._fechar()
+                    if tentativa:
+                        raise ServicoIndisponivel(str(e) or type(e).__name__)
+                    continue
+                # Serviço travado: não reenvia (o pedido pode estar sendo executado) e descarta a conexão,
+                # onde a resposta atrasada chegaria fora de ordem
+                self._fechar()
+                raise ServicoIndisponivel(f"sem resposta em {TEMPO_LIMITE_PEDIDO_SEGUNDOS:.0f} s")
+
+        if not resposta['ok']:
+            raise RuntimeError(resposta['erro'])
+        return resposta['resultado']
+
+    def renderizar(self, forcar=False):
+        return self.pedir('renderizar', forcar=forcar)
+
+    def _fechar(self):
+        if self._conexao is not None:
+            try:
+                self._conexao.close()
+            except OSError:
+                pass
+            self._conexao = None
+
+    def fechar(self):
+        with self._trava:
+            self._fechar()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Serviço de render residente: mantém fontes, fundo e roadmap em memória e atende a interface.")
+    parser.add_argument("--json", default="progress.json", help="Caminho do progress.json.")
+    parser.add_argument("--sem-aplicar", action="store_true", help="Só gera as imagens, sem aplicar o wallpaper.")
+    parser.add_argument("--sem-observar", action="store_true",
+                        help="Não regenera o wallpaper quando os arquivos mudam por fora.")
+    parser.add_argument("--ocioso", type=float, default=TEMPO_OCIOSO_SEGUNDOS,
+                        help="Segundos sem clientes conectados até o serviço se encerrar (0 = nunca).")
+    parser.add_argument("--pedido", default=None,
+                        help="Em vez de servir, envia este pedido a um serviço já rodando (ex.: ping, estatisticas, encerrar).")
+    args = parser.parse_args(argv)
+
+    if args.pedido:
+        cliente = ClienteRender(args.json, iniciar=False)
+        try:
+            print(json.dumps(cliente.pedir(args.pedido), indent=4, ensure_ascii=False))
+        except (ServicoIndisponivel, RuntimeError) as e:
+            print(f"Erro: {e}")
+            return 1
+        finally:
+            cliente.fechar()
+        return 0
+
+    servico = ServicoRender(args.json, aplicar=not args.sem_aplicar, observar=not args.sem_observar,
+                            tempo_ocioso=args.ocioso)
+    return servico.servir()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,190 @@
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+# --- Métricas de renderização ---
+# O wallpaper_generator marca as fases do render (fase()) e conta eventos (contar()). Nada é medido
+# enquanto não houver gancho registrado: sem ganchos, fase() e contar() só verificam uma lista vazia.
+
+
+class GanchoMetricas:
+    """
+    Interface dos ganchos de métricas. Subclasses sobrescrevem só o que usam.
+
+    - ao_terminar_fase(nome, ms, contexto): ao fim de cada fase (ex.: 'salvar' de uma saída).
+    - ao_terminar_render(resumo): ao fim de cada gerar_wallpaper(), com o tempo total, o tempo
+      acumulado por fase e os contadores daquele render.
+    - ao_terminar_aplicacao(resumo): ao fim de cada aplicação do wallpaper, que roda depois e fora do
+      render (ver wallpaper_apply): backend, sucesso, tempo do backend e tempo de espera na fila.
+    """
+
+    def ao_terminar_fase(self, nome, ms, contexto):
+        pass
+
+    def ao_terminar_render(self, resumo):
+        pass
+
+    def ao_terminar_aplicacao(self, resumo):
+        pass
+
+
+class GanchoLog(GanchoMetricas):
+    """Escreve as métricas no logging (logger "evometric.metricas"): fases em DEBUG, resumo em INFO."""
+
+    def __init__(self, logger=None):
+        self.logger = logger or logging.getLogger("evometric.metricas")
+
+    def ao_terminar_fase(self, nome, ms, contexto):
+        self.logger.debug("fase %s: %.2f ms %s", nome, ms, contexto or "")
+
+    def ao_terminar_render(self, resumo):
+        fases = ", ".join(f"{nome}={ms:.1f}ms" for nome, ms in resumo['fases'].items())
+        contadores = ", ".join(f"{nome}={valor}" for nome, valor in resumo['contadores'].items())
+        self.logger.info("render %.1f ms (%s) [%s] [%s]", resumo['ms'], resumo.get('resultado'), fases, contadores)
+
+    def ao_terminar_aplicacao(self, resumo):
+        self.logger.info("aplicação %.1f ms (%s, %s, espera %.1f ms)%s", resumo['ms'], resumo['backend'],
+                         "ok" if resumo['sucesso'] else "falhou", resumo['espera_ms'],
+                         " [repetida, ignorada]" if resumo['repetido'] else "")
+
+
+class GanchoJsonLinhas(GanchoMetricas):
+    """Acrescenta cada evento como uma linha JSON em caminho (um arquivo de métricas fácil de processar)."""
+
+    def __init__(self, caminho, incluir_fases=True):
+        self.caminho = caminho
+        self.incluir_fases = incluir_fases
+        self._trava = threading.Lock()
+
+    def _gravar(self, evento):
+        linha = json.dumps(evento, ensure_ascii=False, default=str) + "\n"
+        with self._trava:
+            with open(self.caminho, 'a', encoding='utf-8') as f:
+                f.write(linha)
+
+    def ao_terminar_fase(self, nome, ms, contexto):
+        if self.incluir_fases:
+            self._gravar({'evento': 'fase', 'instante': time.time(), 'fase': nome, 'ms': round(ms, 3), **contexto})
+
+    def ao_terminar_render(self, resumo):
+        self._gravar({'evento': 'render', 'instante': time.time(), **resumo})
+
+    def ao_terminar_aplicacao(self, resumo):
+        self._gravar({'evento': 'aplicacao', 'instante': time.time(), **resumo})
+
+
+class ColetorMemoria(GanchoMetricas):
+    """Guarda os eventos em listas, para testes e para o benchmark inspecionarem."""
+
+    def __init__(self):
+        self.fases = []
+        self.renders = []
+        self.aplicacoes = []
+        self._trava = threading.Lock()
+
+    def ao_terminar_fase(self, nome, ms, contexto):
+        with self._trava:
+            self.fases.append((nome, ms, dict(contexto)))
+
+    def ao_terminar_render(self, resumo):
+        with self._trava:
+            self.renders.append(resumo)
+
+    def ao_terminar_aplicacao(self, resumo):
+        with self._trava:
+            self.aplicacoes.append(resumo)
+
+    def limpar(self):
+        with self._trava:
+            self.fases.clear()
+            self.renders.clear()
+            self.aplicacoes.clear()
+
+
+_ganchos = []
+_trava = threading.Lock()
+# Render em andamento: tempo acumulado por fase e contadores (as saídas rasterizam em threads separadas)
+_render_atual = None
+
+
+def adicionar_gancho(gancho):
+    with _trava:
+        if gancho not in _ganchos:
+            _ganchos.append(gancho)
+    return gancho
+
+
+def remover_gancho(gancho):
+    with _trava:
+        if gancho in _ganchos:
+            _ganchos.remove(gancho)
+
+
+def _notificar(metodo, *args):
+    for gancho in list(_ganchos):
+        try:
+            getattr(gancho, metodo)(*args)
+        except Exception as e:
+            print(f"Aviso: Erro no gancho de métricas {type(gancho).__name__}: {e}")
+
+
+@contextmanager
+def fase(nome, **contexto):
+    """Marca um trecho do render. O tempo entra no resumo do render e é enviado aos ganchos."""
+    if not _ganchos:
+        yield
+        return
+
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        ms = (time.perf_counter() - inicio) * 1000
+        with _trava:
+            if _render_atual is not None:
+                _render_atual['fases'][nome] = _render_atual['fases'].get(nome, 0.0) + ms
+        _notificar('ao_terminar_fase', nome, ms, contexto)
+
+
+def contar(nome, quantidade=1):
+    """Soma quantidade ao contador nome do render em andamento (ex.: linhas desenhadas)."""
+    if not _ganchos:
+        return
+    with _trava:
+        if _render_atual is not None:
+            contadores = _render_atual['contadores']
+            contadores[nome] = contadores.get(nome, 0) + quantidade
+
+
+@contextmanager
+def render(**contexto):
+    """
+    Delimita um gerar_wallpaper(). Entrega o dicionário do resumo, onde o chamador pode acrescentar campos
+    (ex.: 'resultado'); ao sair, o resumo vai para ao_terminar_render() dos ganchos.
+    """
+    global _render_atual
+    if not _ganchos:
+        yield {}
+        return
+
+    resumo = dict(contexto)
+    with _trava:
+        _render_atual = {'fases': {}, 'contadores': {}}
+    inicio = time.perf_counter()
+    try:
+        yield resumo
+    finally:
+        with _trava:
+            atual, _render_atual = _render_atual, None
+        resumo['ms'] = round((time.perf_counter() - inicio) * 1000, 3)
+        resumo['fases'] = {nome: round(ms, 3) for nome, ms in atual['fases'].items()}
+        resumo['contadores'] = atual['contadores']
+        _notificar('ao_terminar_render', resumo)
+
+
+def aplicacao_concluida(resumo):
+    """Envia aos ganchos o resumo de uma aplicação do wallpaper (fora de qualquer render)."""
+    if _ganchos:
+        _notificar('ao_terminar_aplicacao', resumo)
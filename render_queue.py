@@ -0,0 +1,79 @@
+import threading
+
+
+class FilaRenderizacao:
+    """
+    Executa os renders do wallpaper numa thread em segundo plano, com a política "o mais recente vence".
+
+    Cada chamada a solicitar() apenas marca que o wallpaper está desatualizado. Se várias solicitações
+    chegarem enquanto um render está em andamento (ou antes de ele começar), elas são agrupadas num único
+    render seguinte, que lê o estado mais novo do progress.json. Os callbacks de todas as solicitações
+    agrupadas são chamados ao fim desse render, na thread do worker, com (resultado, erro).
+    """
+
+    def __init__(self, funcao_render):
+        self._funcao_render = funcao_render
+        self._condicao = threading.Condition()
+        self._pendente = False
+        self._ocupado = False
+        self._encerrar = False
+        self._callbacks = []
+
+        # Contadores para diagnóstico: quantas solicitações chegaram x quantos renders foram feitos
+        self.solicitacoes = 0
+        self.renders = 0
+
+        self._thread = threading.Thread(target=self._executar, name="EvoMetricRender", daemon=True)
+        self._thread.start()
+
+    def solicitar(self, callback=None):
+        """Agenda um render do estado atual. Não bloqueia."""
+        with self._condicao:
+            if self._encerrar:
+                return
+            self._pendente = True
+            self.solicitacoes += 1
+            if callback is not None:
+                self._callbacks.append(callback)
+            self._condicao.notify_all()
+
+    def aguardar(self, timeout=None):
+        """Bloqueia até não haver render pendente nem em andamento. Retorna False se o timeout estourar."""
+        with self._condicao:
+            return self._condicao.wait_for(lambda: not self._pendente and not self._ocupado, timeout)
+
+    def encerrar(self, aguardar=True, timeout=None):
+        """Para o worker depois de concluir o que já foi solicitado (o render em andamento nunca é cortado)."""
+        with self._condicao:
+            self._encerrar = True
+            self._condicao.notify_all()
+        if aguardar:
+            self._thread.join(timeout)
+
+    def _executar(self):
+        while True:
+            with self._condicao:
+                self._condicao.wait_for(lambda: self._pendente or self._encerrar)
+                if not self._pendente:
+                    return
+                self._pendente = False
+                self._ocupado = True
+                callbacks, self._callbacks = self._callbacks, []
+
+            resultado, erro = None, None
+            try:
+                resultado = self._funcao_render()
+            except Exception as e:
+                erro = e
+                print(f"Erro ao gerar o wallpaper em segundo plano: {e}")
+
+            with self._condicao:
+                self.renders += 1
+                self._ocupado = False
+                self._condicao.notify_all()
+
+            for callback in callbacks:
+                try:
+                    callback(resultado, erro)
+                except Exception as e:
+                    print(f"Erro no callback de render: {e}")
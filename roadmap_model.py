@@ -0,0 +1,412 @@
+import os
+import threading
+
+from completion_history import HistoricoConclusoes, caminho_historico, identidade_pratica
+from search_index import IndiceBusca
+from progress_store import (ArmazenamentoProgresso, aplicar_mutacao, localizar_pratica, localizar_subtopico,
+                            pratica_ja_adicionada, OP_ADICIONAR_PRATICA, OP_CONCLUIR_PRATICA, OP_CONFIGURAR)
+
+# --- Modelo em memória do roadmap ---
+# Os IDs são derivados da posição na árvore ("m3", "m3.s1", "m3.s1.p2"). Como o EvoMetric só acrescenta
+# itens (nunca remove nem reordena), eles são estáveis entre execuções e batem com as chaves do layout
+# do wallpaper_generator. As mutações do journal levam, além das posições, os nomes dos itens (ver
+# progress_store.localizar_subtopico), para não cair no item errado se o progress.json for editado por fora;
+# o histórico de conclusões, pelo mesmo motivo, guarda a identidade da prática (ver completion_history).
+#
+# Cada subtópico, módulo e FASE guarda no próprio dicionário as contagens 'concluidas' e 'total' de práticas
+# (a raiz guarda o mesmo em 'progresso'), e o 'concluido' deles é derivado delas. Elas são recalculadas ao
+# carregar (a árvore já é percorrida para os índices) e atualizadas em O(profundidade) a cada mutação;
+# como ficam nos dados, vão para o progress.json na próxima consolidação do snapshot.
+
+
+class Pratica:
+    __slots__ = ('id', 'indice', 'subtopico', 'dados')
+
+    def __init__(self, indice, subtopico, dados):
+        self.id = f"{subtopico.id}.p{indice}"
+        self.indice = indice
+        self.subtopico = subtopico
+        self.dados = dados
+
+    @property
+    def nome(self):
+        return self.dados['nome']
+
+    @property
+    def concluido(self):
+        return bool(self.dados.get('concluido', False))
+
+    @property
+    def ordem(self):
+        """Posição no documento, para listar na mesma ordem do progress.json."""
+        return (self.subtopico.modulo.indice, self.subtopico.indice, self.indice)
+
+    @property
+    def nome_completo(self):
+        modulo = self.subtopico.modulo
+        return f"[{modulo.nome_curto}] {self.subtopico.nome} -> {self.nome}"
+
+    @property
+    def identidade(self):
+        """Identidade gravada no histórico de conclusões (não muda se a prática mudar de posição)."""
+        return identidade_pratica(self.subtopico.modulo.nome, self.subtopico.nome, self.nome)
+
+
+class Subtopico:
+    __slots__ = ('id', 'indice', 'modulo', 'praticas', 'dados')
+
+    def __init__(self, indice, modulo, dados):
+        self.id = f"{modulo.id}.s{indice}"
+        self.indice = indice
+        self.modulo = modulo
+        self.dados = dados
+        self.praticas = [Pratica(k, self, p) for k, p in enumerate(dados.get('praticas', []))]
+
+    @property
+    def nome(self):
+        return self.dados['nome']
+
+    @property
+    def pai(self):
+        return self.modulo
+
+    @property
+    def nome_completo(self):
+        return f"{self.modulo.nome_formatado} > {self.nome}"
+
+
+class Modulo:
+    __slots__ = ('id', 'indice', 'subtopicos', 'subtopicos_por_nome', 'dados', 'fase')
+
+    def __init__(self, indice, dados):
+        self.id = f"m{indice}"
+        self.indice = indice
+        self.dados = dados
+        # FASE (separador) que agrupa este módulo: a última que aparece antes dele no documento
+        self.fase = None
+        self.subtopicos = [Subtopico(j, self, s) for j, s in enumerate(dados.get('subtopicos', []))]
+        self.subtopicos_por_nome = {s.nome: s for s in self.subtopicos}
+
+    @property
+    def nome(self):
+        return self.dados['nome']
+
+    @property
+    def e_fase(self):
+        return self.dados.get('tipo') == 'FASE'
+
+    @property
+    def nome_curto(self):
+        """Código antes do ':' ("S2"), ou o nome inteiro se não houver ':'."""
+        return self.nome.split(':')[0].strip() if ':' in self.nome else self.nome
+
+    @property
+    def pai(self):
+        return self.fase
+
+    @property
+    def nome_formatado(self):
+        """Nome como aparece nas listas da interface: "[S2] Clean Architecture..."."""
+        if ':' in self.nome:
+            return f"[{self.nome_curto}] {self.nome.split(':', 1)[1].strip()}"
+        return self.nome
+
+
+class Roadmap:
+    """
+    Roadmap carregado uma vez e indexado: busca por ID e por nome em O(1) e conjunto de práticas
+    pendentes mantido a cada mutação. As mutações passam pelo ArmazenamentoProgresso (journal) e
+    atualizam os índices sem reler o arquivo; as mutações gravadas por outro processo (ex.: o serviço
+    de render e a interface) são lidas do fim do journal e aplicadas do mesmo jeito.
+    """
+    __slots__ = ('armazenamento', 'dados', 'modulos', 'por_id', 'modulos_por_nome', 'pendentes',
+                 'assinatura', 'trava', '_indice_praticas', '_indice_subtopicos', 'progresso', 'posicao_journal',
+                 'historico', '_praticas_por_identidade')
+
+    def __init__(self, armazenamento, dados, assinatura=None):
+        self.armazenamento = armazenamento
+        self.dados = dados
+        self.posicao_journal = armazenamento.posicao_journal
+        # Lido só na primeira consulta
+        self.historico = HistoricoConclusoes(caminho_historico(armazenamento.caminho_json),
+                                             resolver=self._resolver_conclusao)
+        self._praticas_por_identidade = None
+        self.trava = threading.RLock()
+        self.modulos = [Modulo(i, m) for i, m in enumerate(dados['modulos'])]
+        self.por_id = {}
+        self.modulos_por_nome = {}
+        self.pendentes = {}
+        self._indice_praticas = None
+        self._indice_subtopicos = None
+        self.assinatura = assinatura if assinatura is not None else assinatura_arquivos(armazenamento)
+
+        self.progresso = dados.setdefault('progresso', {})
+        _zerar_contagem(self.progresso)
+
+        fase = None
+        for modulo in self.modulos:
+            self.por_id[modulo.id] = modulo
+            _zerar_contagem(modulo.dados)
+            if modulo.e_fase:
+                fase = modulo
+                continue
+            modulo.fase = fase
+            self._indexar_nome_modulo(modulo)
+            for subtopico in modulo.subtopicos:
+                self.por_id[subtopico.id] = subtopico
+                _zerar_contagem(subtopico.dados)
+                for pratica in subtopico.praticas:
+                    self._indexar_pratica(pratica)
+                    self._propagar(subtopico, 1 if pratica.concluido else 0, 1)
+
+    def _indexar_nome_modulo(self, modulo):
+        # Aceita o nome completo, o código ("S2") ou o nome formatado, sem diferenciar maiúsculas
+        for nome in (modulo.nome, modulo.nome_curto, modulo.nome_formatado):
+            self.modulos_por_nome.setdefault(nome.strip().lower(), modulo)
+
+    def _indexar_pratica(self, pratica):
+        self.por_id[pratica.id] = pratica
+        if not pratica.concluido:
+            self.pendentes[pratica.id] = pratica
+
+    def _propagar(self, subtopico, concluidas, total):
+        """Soma às contagens do subtópico, do módulo, da FASE e da raiz: O(profundidade), sem percorrer a árvore."""
+        no = subtopico
+        while no is not None:
+            _somar_contagem(no.dados, concluidas, total)
+            no = no.pai
+        self.progresso['concluidas'] += concluidas
+        self.progresso['total'] += total
+
+    def obter(self, id_item):
+        return self.por_id.get(id_item)
+
+    def _resolver_conclusao(self, id_pratica, identidade):
+        """
+        ID atual da prática de um registro do histórico: o ID gravado, se a prática nessa posição ainda tem a
+        mesma identidade; senão (progress.json editado por fora), a prática com essa identidade, ou None.
+        """
+        # Sem a trava do roadmap: é chamado com a trava do histórico, que concluir_pratica() pega na ordem inversa
+        pratica = self.por_id.get(id_pratica)
+        if isinstance(pratica, Pratica) and pratica.identidade == identidade:
+            return id_pratica
+        por_identidade = self._praticas_por_identidade
+        if por_identidade is None:
+            # Montado só na primeira divergência; com nomes repetidos, fica a primeira no documento
+            por_identidade = {}
+            for modulo in self.modulos:
+                for subtopico in modulo.subtopicos:
+                    for outra in subtopico.praticas:
+                        por_identidade.setdefault(outra.identidade, outra.id)
+            self._praticas_por_identidade = por_identidade
+        return por_identidade.get(identidade)
+
+    def modulos_reais(self):
+        return [m for m in self.modulos if not m.e_fase]
+
+    def modulo_por_nome(self, nome):
+        """Módulo pelo nome, código ("S2") ou nome formatado; se não houver correspondência exata, por trecho do nome."""
+        chave = nome.strip().lower()
+        modulo = self.modulos_por_nome.get(chave)
+        if modulo is None:
+            modulo = next((m for m in self.modulos_reais() if chave in m.nome.lower()), None)
+        return modulo
+
+    def praticas_pendentes(self):
+        """Práticas pendentes na ordem do documento."""
+        return sorted(self.pendentes.values(), key=lambda p: p.ordem)
+
+    # --- Busca (seletores da interface) ---
+
+    def indice_praticas(self):
+        """Índice de busca de todas as práticas (por nome completo), montado na primeira chamada."""
+        with self.trava:
+            if self._indice_praticas is None:
+                self._indice_praticas = IndiceBusca(
+                    (p for m in self.modulos for s in m.subtopicos for p in s.praticas),
+                    texto=lambda p: p.nome_completo)
+            return self._indice_praticas
+
+    def indice_subtopicos(self):
+        """Índice de busca dos subtópicos ("[S2] Módulo > Subtópico"), montado na primeira chamada."""
+        with self.trava:
+            if self._indice_subtopicos is None:
+                self._indice_subtopicos = IndiceBusca(
+                    (s for m in self.modulos_reais() for s in m.subtopicos), texto=lambda s: s.nome_completo)
+            return self._indice_subtopicos
+
+    # --- Mutações (journal + índices) ---
+
+    def adicionar_pratica(self, subtopico, nome):
+        with self.trava:
+            self._executar({
+                "op": OP_ADICIONAR_PRATICA, "modulo": subtopico.modulo.indice, "subtopico": subtopico.indice,
+                "pratica": len(subtopico.praticas), "nome": nome,
+                "nome_modulo": subtopico.modulo.nome, "nome_subtopico": subtopico.nome,
+            })
+            return subtopico.praticas[-1]
+
+    def concluir_pratica(self, pratica):
+        """Conclui a prática (journal) e, se ela ainda estava pendente, acrescenta a conclusão ao histórico."""
+        with self.trava:
+            ja_concluida = pratica.concluido
+            self._executar({
+                "op": OP_CONCLUIR_PRATICA, "modulo": pratica.subtopico.modulo.indice,
+                "subtopico": pratica.subtopico.indice, "pratica": pratica.indice,
+                "nome_modulo": pratica.subtopico.modulo.nome, "nome_subtopico": pratica.subtopico.nome,
+                "nome_pratica": pratica.nome,
+            })
+            if not ja_concluida:
+                try:
+                    self.historico.registrar(pratica.id, identidade=pratica.identidade)
+                except OSError as e:
+                    # A conclusão já está no journal; só o histórico (cooldown, velocidade) fica sem ela
+                    print(f"Aviso: Não foi possível registrar a conclusão no histórico. Erro: {e}")
+
+    def configurar(self, campos):
+        with self.trava:
+            self._executar({"op": OP_CONFIGURAR, "campos": campos})
+
+    def _executar(self, mutacao):
+        # Grava antes de aplicar: se a gravação falhar (disco cheio), o erro sobe e a memória não fica à frente
+        # do disco
+        precisa_compactar = self.armazenamento.registrar(mutacao)
+        self._aplicar(mutacao)
+        if precisa_compactar:
+            try:
+                self.armazenamento.compactar(self.dados)
+            except OSError as e:
+                # A mutação já está no journal; a consolidação fica para a próxima gravação
+                print(f"Aviso: Não foi possível consolidar o journal. Erro: {e}")
+                return
+            # O journal foi consolidado num snapshot com exatamente estes dados
+            self.posicao_journal = 0
+            self.assinatura = assinatura_arquivos(self.armazenamento)
+        # Sem consolidação, a assinatura antiga fica: a próxima obter_roadmap() lê o fim do journal, onde está
+        # esta mutação (reaplicá-la não muda nada) e as que outro processo tenha gravado nesse meio-tempo
+
+    def _aplicar(self, mutacao):
+        """
+        Aplica a mutação nos dados e no modelo (índices, pendentes, contagens). Idempotente, como no journal.
+        Retorna False se o item da mutação não existir mais no roadmap (ver progress_store.localizar_subtopico).
+        """
+        op = mutacao['op']
+        if op == OP_ADICIONAR_PRATICA:
+            posicao = localizar_subtopico(self.dados, mutacao)
+            if posicao is None:
+                return False
+            subtopico = self.modulos[posicao[0]].subtopicos[posicao[1]]
+            if pratica_ja_adicionada(subtopico.dados.get('praticas', []), mutacao):
+                return True
+            aplicar_mutacao(self.dados, mutacao)
+            pratica = Pratica(len(subtopico.praticas), subtopico, subtopico.dados['praticas'][-1])
+            subtopico.praticas.append(pratica)
+            self._indexar_pratica(pratica)
+            self._propagar(subtopico, 0, 1)
+            if self._praticas_por_identidade is not None:
+                self._praticas_por_identidade.setdefault(pratica.identidade, pratica.id)
+            if self._indice_praticas is not None:
+                # A ordem do índice deixa de ser a do documento só para práticas criadas nesta sessão
+                self._indice_praticas.adicionar(pratica)
+
+        elif op == OP_CONCLUIR_PRATICA:
+            posicao = localizar_pratica(self.dados, mutacao)
+            if posicao is None:
+                return False
+            i, j, k = posicao
+            pratica = self.modulos[i].subtopicos[j].praticas[k]
+            if pratica.concluido:
+                return True
+            aplicar_mutacao(self.dados, mutacao)
+            self.pendentes.pop(pratica.id, None)
+            self._propagar(pratica.subtopico, 1, 0)
+
+        else:
+            aplicar_mutacao(self.dados, mutacao)
+        return True
+
+    def atualizar_pelo_journal(self, assinatura):
+        """
+        Aplica as mutações gravadas no journal desde a última leitura, sem reler o snapshot.
+        Retorna False se elas não se encaixarem no modelo (aí o roadmap precisa ser recarregado).
+        """
+        with self.trava:
+            mutacoes, posicao = self.armazenamento.ler_journal(self.posicao_journal)
+            try:
+                for mutacao in mutacoes:
+                    if not self._aplicar(mutacao):
+                        raise ValueError("mutação não corresponde a nenhum item do roadmap")
+            except (KeyError, IndexError, ValueError) as e:
+                print(f"Aviso: Journal não pôde ser aplicado ao roadmap em memória; recarregando. Erro: {e}")
+                return False
+            self.posicao_journal = posicao
+            self.assinatura = assinatura
+            return True
+
+
+def _zerar_contagem(dados):
+    dados['concluidas'] = 0
+    dados['total'] = 0
+    if 'concluido' in dados:
+        dados['concluido'] = False
+
+
+def _somar_contagem(dados, concluidas, total):
+    dados['concluidas'] += concluidas
+    dados['total'] += total
+    # Subtópico/módulo/FASE concluído = todas as suas práticas concluídas (e pelo menos uma prática)
+    dados['concluido'] = dados['total'] > 0 and dados['concluidas'] == dados['total']
+
+
+def assinatura_arquivos(armazenamento):
+    """(mtime, tamanho) do snapshot e do journal: verificação barata, sem abrir nem parsear nada."""
+    assinatura = []
+    for caminho in (armazenamento.caminho_json, armazenamento.caminho_journal):
+        try:
+            info = os.stat(caminho)
+            assinatura.append((info.st_mtime_ns, info.st_size))
+        except FileNotFoundError:
+            assinatura.append(None)
+    return tuple(assinatura)
+
+
+_roadmaps = {}
+_trava_roadmaps = threading.Lock()
+
+
+def obter_roadmap(caminho_json):
+    """
+    Roadmap compartilhado do processo para caminho_json. Se só o journal cresceu, aplica as mutações novas;
+    relê tudo quando o snapshot mudou (consolidação, edição manual). Se o snapshot mudou com o journal ainda
+    cheio, ou o journal não bate mais com ele, snapshot + journal são consolidados logo depois da releitura,
+    para que a mesma divergência não seja reinterpretada a cada carga. Propaga os erros de leitura do
+    ArmazenamentoProgresso.
+    """
+    chave = os.path.abspath(caminho_json)
+    with _trava_roadmaps:
+        roadmap = _roadmaps.get(chave)
+        if roadmap is not None:
+            assinatura = assinatura_arquivos(roadmap.armazenamento)
+            if roadmap.assinatura == assinatura:
+                return roadmap
+            # Snapshot igual e journal só cresceu: basta aplicar o fim do journal
+            if (assinatura[0] == roadmap.assinatura[0] and assinatura[1] is not None
+                    and assinatura[1][1] >= roadmap.posicao_journal
+                    and roadmap.atualizar_pelo_journal(assinatura)):
+                return roadmap
+
+        armazenamento = ArmazenamentoProgresso(caminho_json)
+        # A assinatura é tirada antes da leitura: uma escrita concorrente força nova leitura na próxima vez
+        assinatura = assinatura_arquivos(armazenamento)
+        roadmap_anterior = roadmap
+        roadmap = Roadmap(armazenamento, armazenamento.carregar(), assinatura)
+        snapshot_mudou = roadmap_anterior is not None and assinatura[0] != roadmap_anterior.assinatura[0]
+        if assinatura[1] is not None and (armazenamento.journal_divergente or snapshot_mudou):
+            try:
+                armazenamento.compactar(roadmap.dados)
+                roadmap.posicao_journal = 0
+                roadmap.assinatura = assinatura_arquivos(armazenamento)
+            except OSError as e:
+                print(f"Aviso: Não foi possível consolidar o journal após a mudança do progress.json. Erro: {e}")
+        _roadmaps[chave] = roadmap
+        return roadmap
@@ -0,0 +1,91 @@
+import bisect
+import re
+import unicodedata
+
+_PALAVRA = re.compile(r"\w+")
+# Quantas consultas por termo ficam guardadas (digitar "hex", "hexa", "hexag"... repete os termos anteriores)
+LIMITE_CACHE_TERMOS = 256
+
+
+def normalizar(texto):
+    """Minúsculas e sem acentos: "Prática" e "pratica" devem encontrar a mesma coisa."""
+    decomposto = unicodedata.normalize('NFKD', texto.lower())
+    return "".join(c for c in decomposto if not unicodedata.combining(c))
+
+
+def tokens(texto):
+    return _PALAVRA.findall(normalizar(texto))
+
+
+class IndiceBusca:
+    """
+    Índice de busca por prefixo de palavras, montado uma vez e atualizado a cada item acrescentado.
+
+    Cada palavra do texto de um item aponta para a lista (crescente) das posições dos itens que a contêm;
+    as palavras ficam numa lista ordenada, então um prefixo vira um intervalo achado com bisect.
+    Uma consulta "s2 hexa" devolve os itens que têm alguma palavra começando com "s2" E alguma começando
+    com "hexa", na ordem em que foram acrescentados. O custo depende do número de resultados, não do
+    tamanho do roadmap.
+    """
+
+    def __init__(self, itens=(), texto=str):
+        self.texto = texto
+        self.itens = []
+        self._posicoes = {}
+        self._palavras = []
+        self._cache_termos = {}
+        for item in itens:
+            self.adicionar(item)
+
+    def __len__(self):
+        return len(self.itens)
+
+    def adicionar(self, item):
+        posicao = len(self.itens)
+        self.itens.append(item)
+        for palavra in set(tokens(self.texto(item))):
+            posicoes = self._posicoes.get(palavra)
+            if posicoes is None:
+                self._posicoes[palavra] = [posicao]
+                bisect.insort(self._palavras, palavra)
+            else:
+                posicoes.append(posicao)
+        self._cache_termos.clear()
+
+    def _posicoes_prefixo(self, termo):
+        """Conjunto das posições dos itens com alguma palavra que começa com termo."""
+        resultado = self._cache_termos.get(termo)
+        if resultado is not None:
+            return resultado
+
+        inicio = bisect.bisect_left(self._palavras, termo)
+        fim = bisect.bisect_left(self._palavras, termo + "\uffff", inicio)
+        if fim - inicio == 1:
+            resultado = set(self._posicoes[self._palavras[inicio]])
+        else:
+            resultado = set()
+            for palavra in self._palavras[inicio:fim]:
+                resultado.update(self._posicoes[palavra])
+
+        if len(self._cache_termos) >= LIMITE_CACHE_TERMOS:
+            self._cache_termos.clear()
+        self._cache_termos[termo] = resultado
+        return resultado
+
+    def buscar(self, consulta, filtro=None):
+        """Itens que casam com todos os termos da consulta (todos, se ela estiver vazia), na ordem original."""
+        termos = tokens(consulta)
+        if not termos:
+            encontrados = self.itens
+        else:
+            conjuntos = sorted((self._posicoes_prefixo(t) for t in set(termos)), key=len)
+            posicoes = set(conjuntos[0])
+            for conjunto in conjuntos[1:]:
+                posicoes &= conjunto
+                if not posicoes:
+                    break
+            encontrados = [self.itens[p] for p in sorted(posicoes)]
+
+        if filtro is not None:
+            return [item for item in encontrados if filtro(item)]
+        return list(encontrados)
@@ -0,0 +1,144 @@
+import tkinter as tk
+import tkinter.font as tkfont
+
+# Linhas mostradas antes de a janela ter tamanho real (e mínimo depois de redimensionar)
+LINHAS_PADRAO = 15
+
+
+class ListaVirtual(tk.Frame):
+    """
+    Lista rolável que só cria as linhas visíveis: o Listbox tem apenas as ~15 linhas da tela e é
+    preenchido de novo a cada rolagem, com os textos de obter_texto(i). Abrir e rolar custam o mesmo
+    com 10 ou 10.000 itens.
+    """
+
+    def __init__(self, master, ao_confirmar=None, **kwargs):
+        super().__init__(master, **kwargs)
+        self.ao_confirmar = ao_confirmar
+        self.total = 0
+        self.obter_texto = None
+        self.inicio = 0
+        self.selecionado = None
+        self._linhas = LINHAS_PADRAO
+
+        self.barra = tk.Scrollbar(self, command=self._rolar)
+        self.barra.pack(side=tk.RIGHT, fill=tk.Y)
+        self.listbox = tk.Listbox(self, selectmode=tk.SINGLE, exportselection=False, height=LINHAS_PADRAO,
+                                  activestyle='none')
+        self.listbox.pack(side=tk.LEFT, fill='both', expand=True)
+        self._altura_linha = tkfont.nametofont(self.listbox.cget('font')).metrics('linespace') + 1
+
+        self.listbox.bind('<Configure>', self._ao_redimensionar)
+        self.listbox.bind('<<ListboxSelect>>', self._ao_clicar)
+        self.listbox.bind('<Double-Button-1>', lambda e: self.confirmar())
+        self.listbox.bind('<Return>', lambda e: self.confirmar())
+        # A rolagem é nossa: o Listbox nunca tem mais linhas que as visíveis
+        self.listbox.bind('<MouseWheel>', lambda e: self._rolar('scroll', -1 if e.delta > 0 else 1, 'units'))
+        self.listbox.bind('<Button-4>', lambda e: self._rolar('scroll', -1, 'units'))
+        self.listbox.bind('<Button-5>', lambda e: self._rolar('scroll', 1, 'units'))
+        for tecla, passo in (('<Up>', -1), ('<Down>', 1), ('<Prior>', -LINHAS_PADRAO), ('<Next>', LINHAS_PADRAO)):
+            self.listbox.bind(tecla, lambda e, p=passo: self.mover_selecao(p) or "break")
+
+    def definir(self, total, obter_texto):
+        """Troca o conteúdo: total itens, cujo texto é obter_texto(i). Seleciona o primeiro."""
+        self.total = total
+        self.obter_texto = obter_texto
+        self.inicio = 0
+        self.selecionado = 0 if total else None
+        self._desenhar()
+
+    def mover_selecao(self, passo):
+        if not self.total:
+            return
+        atual = self.selecionado if self.selecionado is not None else -1
+        self.selecionado = min(max(atual + passo, 0), self.total - 1)
+        if self.selecionado < self.inicio:
+            self.inicio = self.selecionado
+        elif self.selecionado >= self.inicio + self._linhas:
+            self.inicio = self.selecionado - self._linhas + 1
+        self._desenhar()
+
+    def _max_inicio(self):
+        return max(0, self.total - self._linhas)
+
+    def _rolar(self, acao, quantidade=None, unidade=None):
+        if acao == 'moveto':
+            self.inicio = int(float(quantidade) * self.total)
+        elif acao == 'scroll':
+            passo = self._linhas if unidade == 'pages' else 1
+            self.inicio += int(quantidade) * passo
+        self.inicio = min(max(self.inicio, 0), self._max_inicio())
+        self._desenhar()
+        return "break"
+
+    def _ao_redimensionar(self, evento):
+        linhas = max(1, evento.height // self._altura_linha)
+        if linhas != self._linhas:
+            self._linhas = linhas
+            self.inicio = min(self.inicio, self._max_inicio())
+            self._desenhar()
+
+    def _ao_clicar(self, evento):
+        selecao = self.listbox.curselection()
+        if selecao:
+            self.selecionado = self.inicio + selecao[0]
+
+    def confirmar(self):
+        if self.selecionado is not None and self.ao_confirmar:
+            self.ao_confirmar()
+        return "break"
+
+    def _desenhar(self):
+        fim = min(self.inicio + self._linhas, self.total)
+        self.listbox.delete(0, tk.END)
+        if self.total:
+            self.listbox.insert(tk.END, *[self.obter_texto(i) for i in range(self.inicio, fim)])
+        if self.selecionado is not None and self.inicio <= self.selecionado < fim:
+            self.listbox.selection_set(self.selecionado - self.inicio)
+
+        if self.total:
+            self.barra.set(self.inicio / self.total, fim / self.total)
+        else:
+            self.barra.set(0, 1)
+
+
+class SeletorBusca(tk.Frame):
+    """
+    Campo de busca + ListaVirtual sobre um IndiceBusca (search_index). Filtra a cada tecla; setas,
+    PageUp/PageDown e Enter funcionam direto do campo de busca. filtro(item) esconde itens
+    (ex.: práticas já concluídas) e texto(item) é o que aparece na lista.
+    """
+
+    def __init__(self, master, indice, texto=None, filtro=None, ao_confirmar=None, **kwargs):
+        super().__init__(master, **kwargs)
+        self.indice = indice
+        self.texto = texto or indice.texto
+        self.filtro = filtro
+        self.resultados = []
+
+        self.consulta = tk.StringVar()
+        self.campo = tk.Entry(self, textvariable=self.consulta)
+        self.campo.pack(fill='x', pady=(0, 5))
+        self.status = tk.Label(self, anchor='w', fg="#666666")
+        self.status.pack(fill='x')
+        self.lista = ListaVirtual(self, ao_confirmar=ao_confirmar)
+        self.lista.pack(fill='both', expand=True)
+
+        self.consulta.trace_add('write', lambda *args: self.atualizar())
+        for tecla, passo in (('<Up>', -1), ('<Down>', 1), ('<Prior>', -LINHAS_PADRAO), ('<Next>', LINHAS_PADRAO)):
+            self.campo.bind(tecla, lambda e, p=passo: self.lista.mover_selecao(p) or "break")
+        self.campo.bind('<Return>', lambda e: self.lista.confirmar())
+
+        self.atualizar()
+        self.campo.focus_set()
+
+    def atualizar(self):
+        self.resultados = self.indice.buscar(self.consulta.get(), self.filtro)
+        self.lista.definir(len(self.resultados), lambda i: self.texto(self.resultados[i]))
+        self.status.config(text=f"{len(self.resultados)} resultado(s)")
+
+    def selecionado(self):
+        """Item selecionado, ou None."""
+        if self.lista.selecionado is None:
+            return None
+        return self.resultados[self.lista.selecionado]
@@ -1,77 +1,69 @@
 import tkinter as tk
 from tkinter import messagebox, filedialog, simpledialog, scrolledtext
-import json
 import os
-import shutil
-import time
-from PIL import Image
+import queue
+import threading
 
-# Importa a função do outro script. Garanta que ambos estejam na mesma pasta.
+# Importa os outros scripts. Garanta que todos estejam na mesma pasta.
+# O wallpaper_generator (e o Pillow) só é importado se o serviço de render não estiver disponível.
 try:
-    from wallpaper_generator import gerar_wallpaper 
-except ImportError:
-    messagebox.showerror("Erro de Importação", "Não foi possível encontrar 'wallpaper_generator.py'. Certifique-se de que ambos os scripts estão na mesma pasta.")
+    from render_daemon import ClienteRender, ServicoIndisponivel
+    from render_queue import FilaRenderizacao
+    from roadmap_model import obter_roadmap
+    from search_picker import SeletorBusca
+except ImportError as e:
+    messagebox.showerror("Erro de Importação", f"Não foi possível importar o módulo '{e.name}'. Certifique-se de que todos os scripts do EvoMetric estão na mesma pasta e de que as dependências estão instaladas.")
     exit()
 
 # --- Constantes ---
 # Caminho real do seu projeto (com underscore '_')
 JSON_PATH = "C:\\Users\\ayres\\Projetos_Python\\EvoMetric\\progress.json"
+# Arquivo antigo do cooldown (só a última conclusão); migrado para o histórico (progress.json.historico)
 LAST_COMPLETION_FILE = os.path.join(os.path.dirname(JSON_PATH), "last_completion.txt")
 
 DIMENSAO_MINIMA_LARGURA = 1280
 DIMENSAO_MINIMA_ALTURA = 720
 COOLDOWN_SECONDS = 4 * 60 * 60 # 4 horas em segundos
+INTERVALO_VERIFICACAO_RENDER_MS = 100 # Frequência com que a GUI recolhe os renders concluídos
+OBSERVAR_PROGRESSO = True # Regenera o wallpaper quando o progress.json (ou o fundo) é alterado por outros programas
+USAR_SERVICO_RENDER = True # Renderiza no serviço residente (render_daemon.py), iniciado na primeira abertura
 
 # --- Funções Auxiliares de JSON e Tempo ---
 
-def carregar_dados_json():
-    """Carrega os dados do roadmap."""
+def carregar_roadmap():
+    """
+    Roadmap indexado compartilhado com o wallpaper_generator. Só relê o progress.json (e o journal)
+    quando ele foi alterado por fora; abrir um diálogo normalmente não parseia nada.
+    """
     try:
-        with open(JSON_PATH, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
+        return obter_roadmap(JSON_PATH)
+    except (FileNotFoundError, ValueError, KeyError, IndexError):
         messagebox.showerror("Erro de Arquivo", f"Não foi possível carregar o arquivo {JSON_PATH}. Verifique o caminho e a sintaxe JSON.")
         return None
 
-def salvar_dados_json(dados):
-    """Salva os dados atualizados no arquivo JSON."""
+def executar_mutacao(funcao, *args):
+    """Executa uma mutação do Roadmap (journal + índices), exibindo o erro de escrita se houver."""
     try:
-        with open(JSON_PATH, 'w', encoding='utf-8') as f:
-            json.dump(dados, f, indent=4, ensure_ascii=False)
-        return True
+        return funcao(*args) or True
     except Exception as e:
         messagebox.showerror("Erro de Escrita", f"Erro ao salvar o arquivo: {e}")
         return False
 
-def get_cooldown_status(parent_window):
-    """Verifica se o cooldown está ativo."""
-    if not os.path.exists(LAST_COMPLETION_FILE):
-        return False
+def get_cooldown_status(parent_window, roadmap):
+    """Verifica se o cooldown está ativo (contado da última conclusão do histórico)."""
     try:
-        with open(LAST_COMPLETION_FILE, 'r') as f:
-            last_timestamp = float(f.read())
-        
-        tempo_restante = (last_timestamp + COOLDOWN_SECONDS) - time.time()
-        
-        if tempo_restante > 0:
-            horas = int(tempo_restante // 3600)
-            minutos = int((tempo_restante % 3600) // 60)
-            messagebox.showinfo("Cooldown Ativo", 
-                                f"Você só pode marcar a próxima prática após o cooldown. Tempo restante: {horas}h {minutos}m.",
-                                parent=parent_window)
-            return True
-        return False
-        
+        tempo_restante = roadmap.historico.cooldown_restante(COOLDOWN_SECONDS)
     except Exception:
         return False
 
-def registrar_conclusao():
-    """Salva o timestamp da conclusão."""
-    try:
-        with open(LAST_COMPLETION_FILE, 'w') as f:
-            f.write(str(time.time()))
-    except Exception as e:
-        print(f"Erro ao registrar timestamp: {e}")
+    if tempo_restante > 0:
+        horas = int(tempo_restante // 3600)
+        minutos = int((tempo_restante % 3600) // 60)
+        messagebox.showinfo("Cooldown Ativo", 
+                            f"Você só pode marcar a próxima prática após o cooldown. Tempo restante: {horas}h {minutos}m.",
+                            parent=parent_window)
+        return True
+    return False
 
 
 # --- CLASSE PRINCIPAL DA APLICAÇÃO ---
@@ -81,9 +73,72 @@ class EvoMetricApp:
         self.master = master
         self.master.title("EvoMetric Task Adder")
         
+        # Renders rodam fora da thread do Tk; os resultados voltam por esta fila e são tratados via master.after
+        self.renders_concluidos = queue.Queue()
+        self.fila_render = FilaRenderizacao(self.renderizar_wallpaper)
+        self.observador = None
+        # Com o serviço, ele mesmo observa os arquivos; a conexão (e o início dele, se preciso) fica em segundo plano
+        self.cliente_render = ClienteRender(JSON_PATH) if USAR_SERVICO_RENDER else None
+
         # Chama os métodos que definem a aparência e os botões
         self.configure_root_window() 
         self.create_buttons()
+        self.master.after(INTERVALO_VERIFICACAO_RENDER_MS, self.verificar_renders_concluidos)
+        self.master.after_idle(self.preparar_indices_busca)
+        if self.cliente_render is not None:
+            threading.Thread(target=self.cliente_render.conectar, name="EvoMetricConexao", daemon=True).start()
+        else:
+            self.master.after_idle(self.iniciar_render_local)
+
+    def renderizar_wallpaper(self):
+        """Roda na thread da fila de render: pede ao serviço ou, se ele não estiver disponível, renderiza aqui."""
+        if self.cliente_render is not None:
+            try:
+                return self.cliente_render.renderizar()
+            except ServicoIndisponivel as e:
+                print(f"Aviso: Serviço de render indisponível ({e}); renderizando nesta janela.")
+                self.cliente_render = None
+                self.iniciar_render_local()
+        from wallpaper_generator import gerar_wallpaper
+        return gerar_wallpaper(caminho_json=JSON_PATH)
+
+    def iniciar_render_local(self):
+        """Render dentro da interface: importa o wallpaper_generator e passa a observar os arquivos daqui."""
+        if OBSERVAR_PROGRESSO and self.observador is None:
+            from wallpaper_generator import iniciar_observador
+            self.observador = iniciar_observador(self.fila_render, JSON_PATH)
+
+    def preparar_indices_busca(self):
+        """
+        Monta os índices de busca dos seletores logo após abrir, para os diálogos abrirem sem espera, e migra
+        o last_completion.txt antigo para o histórico de conclusões.
+        """
+        try:
+            roadmap = obter_roadmap(JSON_PATH)
+            roadmap.indice_praticas()
+            roadmap.indice_subtopicos()
+            roadmap.historico.migrar_texto(LAST_COMPLETION_FILE)
+        except Exception as e:
+            # O erro de leitura aparece para o usuário quando ele abrir um diálogo
+            print(f"Aviso: Não foi possível preparar a busca. Erro: {e}")
+
+    def solicitar_render(self):
+        """Pede um novo wallpaper sem travar a janela. Edições em sequência rápida viram um único render."""
+        self.fila_render.solicitar(lambda resultado, erro: self.renders_concluidos.put((resultado, erro)))
+
+    def verificar_renders_concluidos(self):
+        """Roda na thread do Tk: trata os renders que terminaram em segundo plano."""
+        try:
+            while True:
+                resultado, erro = self.renders_concluidos.get_nowait()
+                if erro is None:
+                    # "renderizado", "reaplicado" ou "reutilizado" (entradas idênticas ao último wallpaper)
+                    print(f"Wallpaper: {resultado}")
+                else:
+                    messagebox.showerror("Erro no Wallpaper", f"Não foi possível gerar o wallpaper. Erro: {erro}", parent=self.master)
+        except queue.Empty:
+            pass
+        self.master.after(INTERVALO_VERIFICACAO_RENDER_MS, self.verificar_renders_concluidos)
 
     def configure_root_window(self):
         """Configurações da janela flutuante principal."""
@@ -140,149 +195,98 @@ class EvoMetricApp:
 
     # --- Funções de Diálogo (Métodos da Classe) ---
 
+    def abrir_seletor(self, titulo, rotulo, indice, ao_confirmar, filtro=None, texto_botao="OK - Confirmar"):
+        """
+        Janela modal com busca + lista virtualizada (só as linhas visíveis existem). ao_confirmar(item, janela)
+        é chamado com o item escolhido (Enter, duplo clique ou botão). Retorna a janela.
+        """
+        selection_window = tk.Toplevel(self.master)
+        selection_window.title(titulo)
+        selection_window.geometry("600x400")
+        selection_window.grab_set()
+
+        tk.Label(selection_window, text=rotulo, padx=10, pady=10).pack()
+
+        def confirmar():
+            item = seletor.selecionado()
+            if item is None:
+                messagebox.showwarning("Atenção", "Nenhum item selecionado.", parent=selection_window)
+                return
+            ao_confirmar(item, selection_window)
+
+        seletor = SeletorBusca(selection_window, indice, filtro=filtro, ao_confirmar=confirmar)
+        seletor.pack(padx=10, pady=5, fill='both', expand=True)
+
+        tk.Button(selection_window, text=texto_botao, command=confirmar,
+                  bg="#00CC66", fg="white", font=("Arial", 12, "bold"), padx=20, pady=5).pack(pady=10)
+        return selection_window
+
     def adicionar_tarefa_dialog(self):
-        """Guia o usuário através da hierarquia Módulo > Subtópico para adicionar uma nova Prática."""
-        
-        dados = carregar_dados_json()
-        if dados is None: return
-        
-        modulos_reais = [m for m in dados['modulos'] if m.get('tipo') != 'FASE']
+        """Seleciona o Subtópico (com o Módulo) numa lista com busca e pede o nome da nova Prática."""
         
-        nomes_modulos_formatados = []
-        for m in modulos_reais:
-            if ':' in m['nome']:
-                nomes_modulos_formatados.append(f"[{m['nome'].split(':')[0].strip()}] {m['nome'].split(':')[1].strip()}")
-            else:
-                nomes_modulos_formatados.append(m['nome'])
-        
-        modulo_selecionado_nome = simpledialog.askstring(
-            "Nova Tarefa (1/3) - Selecione o Módulo", 
-            "Em qual Módulo/Semana deseja adicionar a nova prática?\n\nOpções:\n" + "\n".join(nomes_modulos_formatados),
-            parent=self.master
-        )
-        
-        if not modulo_selecionado_nome: return
-        
-        modulo_obj = next((m for m in modulos_reais if modulo_selecionado_nome in m['nome']), None)
-        
-        if not modulo_obj:
-            messagebox.showerror("Erro", "Módulo inválido ou não encontrado.", parent=self.master)
-            return
+        roadmap = carregar_roadmap()
+        if roadmap is None: return
 
-        subtopicos = modulo_obj.get('subtopicos', [])
-        nomes_subtopicos = [s['nome'] for s in subtopicos]
-        
-        subtopico_selecionado_nome = simpledialog.askstring(
-            "Nova Tarefa (2/3) - Selecione o Subtópico", 
-            f"Em qual Subtópico de '{modulo_obj['nome']}' deseja adicionar a prática?\n\nOpções:\n" + "\n".join(nomes_subtopicos),
-            parent=self.master
-        )
-        
-        if not subtopico_selecionado_nome: return
+        def subtopico_escolhido(subtopico_obj, selection_window):
+            selection_window.destroy()
+            modulo_obj = subtopico_obj.modulo
 
-        subtopico_obj = next((s for s in subtopicos if s['nome'] == subtopico_selecionado_nome), None)
-        
-        if not subtopico_obj:
-            messagebox.showerror("Erro", "Subtópico inválido ou não encontrado.", parent=self.master)
-            return
+            nova_pratica_nome = simpledialog.askstring(
+                "Nova Tarefa (2/2) - Nome da Prática", 
+                f"{modulo_obj.nome} > {subtopico_obj.nome}\n\nDigite o nome da nova Prática/Tarefa de código a ser adicionada:", 
+                parent=self.master
+            )
             
-        nova_pratica_nome = simpledialog.askstring(
-            "Nova Tarefa (3/3) - Nome da Prática", 
-            "Digite o nome da nova Prática/Tarefa de código a ser adicionada:", 
-            parent=self.master
-        )
-        
-        if not nova_pratica_nome: return
+            if not nova_pratica_nome: return
 
-        novo_item = {"nome": nova_pratica_nome, "concluido": False}
-        
-        if 'praticas' not in subtopico_obj:
-            subtopico_obj['praticas'] = [] 
+            if executar_mutacao(roadmap.adicionar_pratica, subtopico_obj, nova_pratica_nome):
+                messagebox.showinfo("Sucesso", f"Prática '{nova_pratica_nome}' adicionada em:\n{modulo_obj.nome} > {subtopico_obj.nome}", parent=self.master)
+                self.solicitar_render()
 
-        subtopico_obj['praticas'].append(novo_item)
-        
-        if salvar_dados_json(dados):
-            messagebox.showinfo("Sucesso", f"Prática '{nova_pratica_nome}' adicionada em:\n{modulo_obj['nome']} > {subtopico_obj['nome']}", parent=self.master)
-            gerar_wallpaper()
+        self.abrir_seletor(
+            "Nova Tarefa (1/2) - Selecione o Subtópico",
+            "Digite parte do nome do módulo (ex: S2) e/ou do subtópico e selecione onde adicionar a prática:",
+            roadmap.indice_subtopicos(), subtopico_escolhido, texto_botao="Próximo"
+        )
 
     def marcar_concluido_dialog(self):
-        """Abre uma nova janela modal com lista clicável das práticas pendentes."""
+        """Abre uma janela modal com busca e lista das práticas pendentes."""
         
-        if get_cooldown_status(self.master):
-            return
+        roadmap = carregar_roadmap()
+        if roadmap is None: return
 
-        dados = carregar_dados_json()
-        if dados is None: return
+        if get_cooldown_status(self.master, roadmap):
+            return
 
-        praticas_pendentes_flat = []
-        
-        for modulo in dados['modulos']:
-            if modulo.get('tipo') == 'FASE': continue
-            for subtopico in modulo.get('subtopicos', []):
-                for pratica in subtopico.get('praticas', []):
-                    if not pratica.get('concluido', False):
-                        # Garante que o split não falhe se não houver ':'
-                        nome_modulo_curto = modulo['nome'].split(':')[0].strip() if ':' in modulo['nome'] else modulo['nome']
-                        nome_completo = f"[{nome_modulo_curto}] {subtopico['nome']} -> {pratica['nome']}"
-                        praticas_pendentes_flat.append({'nome_completo': nome_completo, 'obj': pratica})
-
-        if not praticas_pendentes_flat:
+        if not roadmap.pendentes:
             messagebox.showinfo("Sucesso", "Parabéns! Todas as práticas estão concluídas.", parent=self.master)
             return
 
-        selection_window = tk.Toplevel(self.master)
-        selection_window.title("✅ Concluir Prática - Seleção")
-        selection_window.geometry("600x400")
-        selection_window.grab_set() 
-
-        tk.Label(selection_window, text="Selecione a prática concluída:", padx=10, pady=10).pack()
-
-        list_frame = tk.Frame(selection_window)
-        list_frame.pack(padx=10, pady=5, fill='both', expand=True)
-
-        scrollbar = tk.Scrollbar(list_frame)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-
-        pratica_listbox = tk.Listbox(list_frame, yscrollcommand=scrollbar.set, selectmode=tk.SINGLE)
-        pratica_listbox.pack(side=tk.LEFT, fill='both', expand=True)
-        scrollbar.config(command=pratica_listbox.yview)
-
-        for item in praticas_pendentes_flat:
-            pratica_listbox.insert(tk.END, item['nome_completo'])
-
-        def confirmar_conclusao():
-            selected_indices = pratica_listbox.curselection()
-            
-            if not selected_indices:
-                messagebox.showwarning("Atenção", "Selecione uma prática para concluir.", parent=selection_window)
-                return
-
-            index = selected_indices[0]
-            pratica_selecionada = praticas_pendentes_flat[index]
-            pratica_obj_ref = pratica_selecionada['obj']
-            
+        def confirmar_conclusao(pratica_selecionada, selection_window):
             confirmacao = messagebox.askyesno(
                 "Confirmar Conclusão",
-                f"Tem certeza que deseja marcar:\n\n{pratica_selecionada['nome_completo']}\n\ncomo CONCLUÍDA?",
+                f"Tem certeza que deseja marcar:\n\n{pratica_selecionada.nome_completo}\n\ncomo CONCLUÍDA?",
                 parent=selection_window
             )
             
             if confirmacao:
-                pratica_obj_ref['concluido'] = True
-                
-                if salvar_dados_json(dados):
-                    registrar_conclusao()
-                    gerar_wallpaper()
+                # A conclusão vai para o journal e para o histórico (que conta o cooldown)
+                if executar_mutacao(roadmap.concluir_pratica, pratica_selecionada):
+                    self.solicitar_render()
                     messagebox.showinfo("Sucesso", "Prática concluída com sucesso! Cooldown de 4 horas iniciado.", parent=selection_window)
                     selection_window.destroy()
-            
-        tk.Button(selection_window, text="OK - Confirmar", command=confirmar_conclusao, 
-                  bg="#00CC66", fg="white", font=("Arial", 12, "bold"), padx=20, pady=5).pack(pady=10)
+
+        # O índice tem todas as práticas; as concluídas são filtradas só entre os resultados da busca
+        self.abrir_seletor(
+            "✅ Concluir Prática - Seleção", "Selecione a prática concluída (digite para filtrar):",
+            roadmap.indice_praticas(), confirmar_conclusao, filtro=lambda p: not p.concluido
+        )
 
     def configurar_layout_dialog(self):
         """Permite ao usuário ajustar as cores e a largura do contorno do texto."""
-        dados = carregar_dados_json()
-        if dados is None: return
+        roadmap = carregar_roadmap()
+        if roadmap is None: return
+        dados = roadmap.dados
 
         cor_p_str = ', '.join(map(str, dados.get('texto_cor_principal', [255, 255, 255])))
         cor_s_str = ', '.join(map(str, dados.get('contorno_cor', [0, 0, 0])))
@@ -304,13 +308,15 @@ class EvoMetricApp:
                                                       parent=self.master, minvalue=0, maxvalue=5)
             if nova_largura_s is None: return
 
-            dados['texto_cor_principal'] = [int(x.strip()) for x in nova_cor_p.split(',')]
-            dados['contorno_cor'] = [int(x.strip()) for x in nova_cor_s.split(',')]
-            dados['contorno_largura'] = nova_largura_s
+            campos = {
+                'texto_cor_principal': [int(x.strip()) for x in nova_cor_p.split(',')],
+                'contorno_cor': [int(x.strip()) for x in nova_cor_s.split(',')],
+                'contorno_largura': nova_largura_s,
+            }
             
-            if salvar_dados_json(dados):
+            if executar_mutacao(roadmap.configurar, campos):
                 messagebox.showinfo("Sucesso", "Configurações de layout salvas e wallpaper atualizado.", parent=self.master)
-                gerar_wallpaper()
+                self.solicitar_render()
 
         except ValueError:
             messagebox.showerror("Erro de Formato", "O formato RGB deve ser 'R, G, B' (ex: 255, 0, 0) com números entre 0 e 255.", parent=self.master)
@@ -318,41 +324,45 @@ class EvoMetricApp:
             messagebox.showerror("Erro", f"Ocorreu um erro: {e}", parent=self.master)
 
     def selecionar_e_aplicar_fundo(self):
-        """Abre o explorador de arquivos, copia a imagem e atualiza o JSON."""
-        dados = carregar_dados_json()
-        if dados is None: return
+        """
+        Abre o explorador de arquivos e grava na pasta do projeto uma cópia da imagem já ajustada à
+        resolução do wallpaper (decodificada reduzida, sem o original de vários MB); depois atualiza o JSON.
+        """
+        roadmap = carregar_roadmap()
+        if roadmap is None: return
 
         caminho_imagem_selecionada = filedialog.askopenfilename(
             parent=self.master,
             title="Selecione a Imagem de Fundo do Wallpaper",
-            filetypes=(("Arquivos de Imagem", "*.jpg *.jpeg *.png *.bmp"), ("Todos os arquivos", "*.*"))
+            filetypes=(("Arquivos de Imagem", "*.jpg *.jpeg *.png *.bmp *.webp"), ("Todos os arquivos", "*.*"))
         )
 
         if not caminho_imagem_selecionada: return
 
         try:
-            img = Image.open(caminho_imagem_selecionada)
-            largura, altura = img.size
+            # Só este diálogo precisa da Pillow na janela
+            from background_import import importar_fundo, ler_dimensoes, limite_memoria_fundo, tamanho_importacao
+            largura, altura = ler_dimensoes(caminho_imagem_selecionada)
             
             if largura < DIMENSAO_MINIMA_LARGURA or altura < DIMENSAO_MINIMA_ALTURA:
                 aviso = (f"A imagem é muito pequena ({largura}x{altura}). "
                          f"O mínimo recomendado é {DIMENSAO_MINIMA_LARGURA}x{DIMENSAO_MINIMA_ALTURA}. "
-                         f"Deseja usá-la mesmo assim (ela será esticada/distorcida)?")
+                         f"Deseja usá-la mesmo assim (ela será ampliada e perderá nitidez)?")
                 if not messagebox.askyesno("Aviso de Dimensão", aviso, parent=self.master):
                     return
+
+            with roadmap.trava:
+                largura_destino, altura_destino = tamanho_importacao(roadmap.dados)
+                limite = limite_memoria_fundo(roadmap.dados)
+            nome_arquivo = importar_fundo(caminho_imagem_selecionada, os.path.dirname(JSON_PATH),
+                                          largura_destino, altura_destino, limite)
             
-            nome_arquivo = os.path.basename(caminho_imagem_selecionada)
-            destino = os.path.join(os.path.dirname(JSON_PATH), nome_arquivo)
-            
-            if caminho_imagem_selecionada != destino:
-                 shutil.copy2(caminho_imagem_selecionada, destino)
-            
-            dados['caminho_fundo'] = nome_arquivo
-            
-            if salvar_dados_json(dados):
+            if executar_mutacao(roadmap.configurar, {'caminho_fundo': nome_arquivo}):
                 messagebox.showinfo("Sucesso", f"Imagem de fundo '{nome_arquivo}' configurada.", parent=self.master)
-                gerar_wallpaper()
+                self.solicitar_render()
                 
+        except MemoryError as e:
+            messagebox.showerror("Imagem Muito Grande", f"Não foi possível importar a imagem: {e}", parent=self.master)
         except Exception as e:
             messagebox.showerror("Erro de Imagem", f"Não foi possível processar a imagem. Erro: {e}", parent=self.master)
 
@@ -362,4 +372,14 @@ class EvoMetricApp:
 if __name__ == '__main__':
     root = tk.Tk()
     app = EvoMetricApp(root)
-    root.mainloop()
\ No newline at end of file
+    root.mainloop()
+    # Não interrompe um render no meio da gravação do PNG
+    if app.observador is not None:
+        app.observador.parar()
+    app.fila_render.encerrar()
+    if app.cliente_render is None:
+        from wallpaper_apply import obter_aplicador
+        obter_aplicador().aguardar()
+    else:
+        # O serviço continua rodando, com tudo em memória, para a próxima abertura
+        app.cliente_render.fechar()
\ No newline at end of file
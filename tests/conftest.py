@@ -0,0 +1,52 @@
+import json
+import os
+import sys
+
+import pytest
+
+# Os módulos do EvoMetric ficam na raiz do repositório
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def roadmap_pequeno(pasta, resolucao="480x270", **campos):
+    """progress.json pequeno (2 módulos, 1 separador FASE) com um fundo sintético do tamanho da tela."""
+    from PIL import Image
+
+    largura, altura = (int(v) for v in resolucao.split('x'))
+    caminho_fundo = os.path.join(pasta, "fundo.png")
+    Image.linear_gradient('L').resize((largura, altura)).convert('RGB').save(caminho_fundo)
+    dados = {
+        "resolucao": resolucao, "titulo": "Roadmap de Teste", "caminho_fundo": caminho_fundo,
+        "fundo_cor": [30, 30, 30], "texto_cor_principal": [255, 255, 255], "texto_cor_concluido": [0, 255, 100],
+        "contorno_cor": [0, 0, 0], "contorno_largura": 2, "caminho_saida": os.path.join(pasta, "saida.png"),
+        "modulos": [
+            {"nome": "FASE 1: Fundação", "tipo": "FASE", "concluido": False},
+            {"nome": "S1: Java Moderno", "subtopicos": [
+                {"nome": "Records", "praticas": [{"nome": f"Prática {i}", "concluido": i < 9} for i in range(12)]},
+            ]},
+            {"nome": "S2: Coleções", "subtopicos": [
+                {"nome": "Listas", "praticas": [{"nome": "ArrayList", "concluido": False}]},
+            ]},
+        ],
+    }
+    dados.update(campos)
+    caminho_json = os.path.join(pasta, "progress.json")
+    with open(caminho_json, 'w', encoding='utf-8') as f:
+        json.dump(dados, f, ensure_ascii=False)
+    return caminho_json, dados
+
+
+@pytest.fixture
+def wg(tmp_path, monkeypatch):
+    """wallpaper_generator com cache de fundos numa pasta temporária e sem estado de renders anteriores."""
+    import roadmap_model
+    import wallpaper_generator
+
+    monkeypatch.setattr(wallpaper_generator, 'DIRETORIO_CACHE', str(tmp_path / "cache"))
+    wallpaper_generator.limpar_cache_fundos()
+    wallpaper_generator._ultimo_render.clear()
+    roadmap_model._roadmaps.clear()
+    yield wallpaper_generator
+    wallpaper_generator.limpar_cache_fundos()
+    wallpaper_generator._ultimo_render.clear()
+    roadmap_model._roadmaps.clear()
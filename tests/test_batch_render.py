@@ -0,0 +1,17 @@
+import batch_render
+from conftest import roadmap_pequeno
+
+
+def test_saida_na_pasta_de_entrada_nao_vira_roadmap(wg, tmp_path, capsys):
+    caminho_json, _ = roadmap_pequeno(str(tmp_path))
+    relatorio = tmp_path / "lote.json"
+    argumentos = [str(tmp_path), "--saida", str(tmp_path), "--trabalhadores", "1"]
+
+    # A segunda rodada de cada um encontra o relatório da primeira na pasta de entrada
+    for _ in range(2):
+        assert batch_render.main(argumentos) == 0
+    for _ in range(2):
+        assert batch_render.main(argumentos + ["--relatorio", str(relatorio)]) == 0
+    assert (tmp_path / batch_render.RELATORIO_PADRAO).exists() and relatorio.exists()
+    assert batch_render.listar_roadmaps([str(tmp_path)], ignorar=[str(relatorio)]) == [caminho_json]
+    assert "[erro]" not in capsys.readouterr().out
@@ -0,0 +1,101 @@
+import datetime
+
+import pytest
+
+from completion_history import CABECALHO, REGISTRO, SEM_IDENTIDADE, HistoricoConclusoes, caminho_historico, identidade_pratica
+
+
+def _instante(dia, hora=12):
+    return datetime.datetime.combine(dia, datetime.time(hora)).timestamp()
+
+
+HOJE = datetime.date(2026, 3, 10)
+AGORA = _instante(HOJE, 18)
+
+
+@pytest.fixture
+def historico(tmp_path):
+    return HistoricoConclusoes(caminho_historico(str(tmp_path / "progress.json")))
+
+
+def test_registros_relidos_por_outra_instancia(historico):
+    historico.registrar("m1.s0.p2", _instante(HOJE, 9))
+    historico.registrar("m3.s1.p0", _instante(HOJE, 10))
+
+    outro = HistoricoConclusoes(historico.caminho)
+    assert outro.eventos() == [(_instante(HOJE, 9), "m1.s0.p2"), (_instante(HOJE, 10), "m3.s1.p0")]
+    assert outro.ultima() == (_instante(HOJE, 10), "m3.s1.p0")
+
+    # Registros acrescentados por outro processo aparecem na próxima consulta
+    outro.registrar("m0.s0.p0", _instante(HOJE, 11))
+    assert len(historico) == 3
+
+
+def test_instante_nunca_volta(historico):
+    historico.registrar("m0.s0.p0", _instante(HOJE, 10))
+    gravado = historico.registrar("m0.s0.p1", _instante(HOJE, 8))
+    assert gravado == _instante(HOJE, 10)
+    assert [i for i, _ in historico.eventos()] == sorted(i for i, _ in historico.eventos())
+
+
+def test_registro_incompleto_ignorado(historico):
+    historico.registrar("m0.s0.p0", _instante(HOJE))
+    with open(historico.caminho, 'ab') as f:
+        f.write(bytes(REGISTRO.size // 2))
+    assert len(HistoricoConclusoes(historico.caminho)) == 1
+
+
+def test_contagens_e_cooldown(historico):
+    ontem = HOJE - datetime.timedelta(days=1)
+    for hora in (8, 9, 20):
+        historico.registrar("m0.s0.p0", _instante(ontem, hora))
+    historico.registrar("m0.s0.p1", _instante(HOJE, 9))
+
+    assert historico.contagens_por_dia(3, AGORA) == [0, 3, 1]
+    assert historico.contar(_instante(HOJE, 0), AGORA) == 1
+    assert historico.velocidade(2, AGORA) == 2.0
+    assert historico.cooldown_restante(4 * 3600, _instante(HOJE, 10)) == pytest.approx(3 * 3600)
+    assert historico.cooldown_restante(4 * 3600, AGORA) == 0
+
+
+def test_sequencias(historico):
+    for dias_atras in (9, 8, 3, 2, 1):
+        historico.registrar(None, _instante(HOJE - datetime.timedelta(days=dias_atras)))
+
+    # Sem conclusão hoje, a sequência que termina ontem ainda vale
+    assert historico.sequencia_atual(AGORA) == 3
+    assert historico.sequencia_atual(_instante(HOJE + datetime.timedelta(days=1))) == 0
+    historico.registrar(None, _instante(HOJE, 9))
+    assert historico.sequencia_atual(AGORA) == 4
+    assert historico.maior_sequencia() == 4
+    assert historico.resumo(3, AGORA) == {'dias': [1, 1, 1], 'total': 3, 'sequencia': 4}
+
+
+def test_migracao_do_last_completion(historico, tmp_path):
+    texto = tmp_path / "last_completion.txt"
+    texto.write_text(str(_instante(HOJE)))
+
+    assert historico.migrar_texto(str(texto))
+    assert historico.ultima() == (_instante(HOJE), None)
+    # Histórico já preenchido: não importa de novo
+    assert not historico.migrar_texto(str(texto))
+    assert len(historico) == 1
+    with open(historico.caminho, 'rb') as f:
+        assert f.read(len(CABECALHO)) == CABECALHO
+
+
+def test_identidade_resolvida_na_leitura(historico):
+    identidade = identidade_pratica("Coleções", "Listas", "ArrayList")
+    historico.registrar("m1.s0.p0", _instante(HOJE, 9), identidade=identidade)
+    historico.registrar("m1.s0.p1", _instante(HOJE, 10))
+
+    vistos = []
+    def resolver(id_pratica, identidade):
+        vistos.append((id_pratica, identidade))
+        return "m2.s0.p0"
+
+    outro = HistoricoConclusoes(historico.caminho, resolver=resolver)
+    # Registro sem identidade (gravado antes dela existir) fica com o ID posicional
+    assert outro.eventos() == [(_instante(HOJE, 9), "m2.s0.p0"), (_instante(HOJE, 10), "m1.s0.p1")]
+    assert vistos == [("m1.s0.p0", identidade)]
+    assert identidade != SEM_IDENTIDADE
@@ -0,0 +1,179 @@
+import json
+import os
+
+import pytest
+
+import roadmap_model
+from progress_store import ArmazenamentoProgresso, aplicar_mutacao, OP_CONCLUIR_PRATICA
+
+
+def _roadmap_base():
+    return {
+        "titulo": "Roadmap",
+        "modulos": [
+            {"nome": "Fundamentos", "subtopicos": [
+                {"nome": "Sintaxe", "praticas": [{"nome": "Variáveis", "concluido": False}]},
+            ]},
+            {"nome": "Coleções", "subtopicos": [
+                {"nome": "Listas", "praticas": [
+                    {"nome": "ArrayList", "concluido": False},
+                    {"nome": "LinkedList", "concluido": False},
+                ]},
+            ]},
+        ],
+    }
+
+
+@pytest.fixture
+def caminho(tmp_path):
+    caminho = tmp_path / "progress.json"
+    caminho.write_text(json.dumps(_roadmap_base()), encoding='utf-8')
+    roadmap_model._roadmaps.clear()
+    yield str(caminho)
+    roadmap_model._roadmaps.clear()
+
+
+def _ler(caminho):
+    with open(caminho, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _praticas(dados, modulo, subtopico=0):
+    return dados['modulos'][modulo]['subtopicos'][subtopico]['praticas']
+
+
+def test_journal_reaplicado_ao_carregar(caminho):
+    armazenamento = ArmazenamentoProgresso(caminho)
+    roadmap = roadmap_model.Roadmap(armazenamento, armazenamento.carregar())
+    subtopico = roadmap.modulos[1].subtopicos[0]
+    roadmap.adicionar_pratica(subtopico, "HashMap")
+    roadmap.concluir_pratica(subtopico.praticas[1])
+
+    # O snapshot não foi tocado; tudo está no journal
+    assert len(_praticas(_ler(caminho), 1)) == 2
+    dados = ArmazenamentoProgresso(caminho).carregar()
+    assert [p['nome'] for p in _praticas(dados, 1)] == ["ArrayList", "LinkedList", "HashMap"]
+    assert [p['concluido'] for p in _praticas(dados, 1)] == [False, True, False]
+
+
+def test_compactacao_preserva_dados(caminho):
+    armazenamento = ArmazenamentoProgresso(caminho, limite_journal_bytes=1)
+    roadmap = roadmap_model.Roadmap(armazenamento, armazenamento.carregar())
+    roadmap.concluir_pratica(roadmap.modulos[0].subtopicos[0].praticas[0])
+
+    assert not os.path.exists(armazenamento.caminho_journal)
+    assert _praticas(_ler(caminho), 0)[0]['concluido'] is True
+    assert roadmap.posicao_journal == 0
+
+
+def test_mutacoes_idempotentes(caminho):
+    dados = _roadmap_base()
+    mutacao = {"op": OP_CONCLUIR_PRATICA, "modulo": 1, "subtopico": 0, "pratica": 1,
+               "nome_modulo": "Coleções", "nome_subtopico": "Listas", "nome_pratica": "LinkedList"}
+    assert aplicar_mutacao(dados, mutacao) == (1, 0, 1)
+    antes = json.dumps(dados)
+    aplicar_mutacao(dados, mutacao)
+    assert json.dumps(dados) == antes
+
+
+def test_linha_incompleta_ignorada(caminho):
+    armazenamento = ArmazenamentoProgresso(caminho)
+    roadmap = roadmap_model.Roadmap(armazenamento, armazenamento.carregar())
+    roadmap.concluir_pratica(roadmap.modulos[1].subtopicos[0].praticas[0])
+    # Queda no meio da gravação da próxima linha
+    with open(armazenamento.caminho_journal, 'a', encoding='utf-8') as f:
+        f.write('{"op": "concluir_pratica", "modu')
+
+    dados = ArmazenamentoProgresso(caminho).carregar()
+    assert [p['concluido'] for p in _praticas(dados, 1)] == [True, False]
+
+    # A próxima mutação não cola na linha pela metade
+    roadmap.concluir_pratica(roadmap.modulos[1].subtopicos[0].praticas[1])
+    dados = ArmazenamentoProgresso(caminho).carregar()
+    assert [p['concluido'] for p in _praticas(dados, 1)] == [True, True]
+
+
+def test_modulo_inserido_por_fora_nao_conclui_pratica_errada(caminho):
+    roadmap = roadmap_model.obter_roadmap(caminho)
+    roadmap.concluir_pratica(roadmap.modulos[1].subtopicos[0].praticas[1])
+
+    # Outro script insere um módulo na posição 1 com o journal ainda cheio
+    dados = _ler(caminho)
+    dados['modulos'].insert(1, {"nome": "Intruso", "subtopicos": [
+        {"nome": "Outro", "praticas": [{"nome": "A", "concluido": False}, {"nome": "B", "concluido": False}]},
+    ]})
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump(dados, f)
+
+    dados = ArmazenamentoProgresso(caminho).carregar()
+    assert [p['concluido'] for p in _praticas(dados, 1)] == [False, False]
+    assert [p['concluido'] for p in _praticas(dados, 2)] == [False, True]
+
+
+def test_historico_segue_a_pratica_inserida_por_fora(caminho):
+    roadmap = roadmap_model.obter_roadmap(caminho)
+    roadmap.concluir_pratica(roadmap.modulos[1].subtopicos[0].praticas[1])
+    roadmap.concluir_pratica(roadmap.modulos[0].subtopicos[0].praticas[0])
+    assert [id_pratica for _, id_pratica in roadmap.historico.eventos()] == ["m1.s0.p1", "m0.s0.p0"]
+
+    # Uma prática inserida no começo de "Listas" e "Variáveis" removida por fora
+    dados = _ler(caminho)
+    _praticas(dados, 1).insert(0, {"nome": "Vetores", "concluido": False})
+    del _praticas(dados, 0)[0]
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump(dados, f)
+
+    roadmap = roadmap_model.obter_roadmap(caminho)
+    assert [id_pratica for _, id_pratica in roadmap.historico.eventos()] == ["m1.s0.p2", None]
+    assert roadmap.obter("m1.s0.p2").nome == "LinkedList"
+
+
+def test_mutacao_sem_item_correspondente_e_ignorada(caminho):
+    armazenamento = ArmazenamentoProgresso(caminho)
+    roadmap = roadmap_model.Roadmap(armazenamento, armazenamento.carregar())
+    roadmap.concluir_pratica(roadmap.modulos[1].subtopicos[0].praticas[1])
+
+    dados = _ler(caminho)
+    del _praticas(dados, 1)[1]
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump(dados, f)
+
+    armazenamento = ArmazenamentoProgresso(caminho)
+    dados = armazenamento.carregar()
+    assert armazenamento.journal_divergente
+    assert [p['concluido'] for p in _praticas(dados, 1)] == [False]
+
+
+def test_obter_roadmap_consolida_journal_divergente(caminho):
+    roadmap = roadmap_model.obter_roadmap(caminho)
+    roadmap.concluir_pratica(roadmap.modulos[1].subtopicos[0].praticas[1])
+
+    dados = _ler(caminho)
+    dados['modulos'].insert(0, {"nome": "Intruso", "subtopicos": []})
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump(dados, f)
+
+    roadmap = roadmap_model.obter_roadmap(caminho)
+    assert roadmap.modulos[2].subtopicos[0].praticas[1].concluido
+    assert not roadmap.modulos[2].subtopicos[0].praticas[0].concluido
+    # O journal foi incorporado ao snapshot: não é reinterpretado na próxima carga
+    assert roadmap.assinatura[1] is None
+    assert _praticas(_ler(caminho), 2)[1]['concluido'] is True
+
+
+def test_falha_ao_gravar_nao_altera_memoria(caminho, monkeypatch):
+    armazenamento = ArmazenamentoProgresso(caminho)
+    roadmap = roadmap_model.Roadmap(armazenamento, armazenamento.carregar())
+    pratica = roadmap.modulos[0].subtopicos[0].praticas[0]
+
+    def disco_cheio(mutacao):
+        raise OSError(28, "No space left on device")
+    monkeypatch.setattr(armazenamento, 'registrar', disco_cheio)
+
+    with pytest.raises(OSError):
+        roadmap.concluir_pratica(pratica)
+    assert not pratica.concluido
+    assert pratica.id in roadmap.pendentes
+    with pytest.raises(OSError):
+        roadmap.adicionar_pratica(pratica.subtopico, "Constantes")
+    assert len(pratica.subtopico.praticas) == 1
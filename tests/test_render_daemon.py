@@ -0,0 +1,75 @@
+import threading
+
+import pytest
+
+import render_daemon
+from conftest import roadmap_pequeno
+
+
+@pytest.fixture
+def caminho_json(wg, tmp_path, monkeypatch):
+    monkeypatch.setattr(render_daemon, 'DIRETORIO_CACHE', str(tmp_path / "cache"))
+    caminho_json, _ = roadmap_pequeno(str(tmp_path))
+    return caminho_json
+
+
+def _servir(caminho_json, versao=None, tempo_ocioso=0):
+    """Serviço rodando numa thread deste processo (em vez de um processo separado)."""
+    servico = render_daemon.ServicoRender(caminho_json, aplicar=False, observar=False, tempo_ocioso=tempo_ocioso)
+    if versao is not None:
+        servico.versao = versao
+    pronto = threading.Event()
+    aquecer = servico.aquecer
+    servico.aquecer = lambda: (aquecer(), pronto.set())
+    thread = threading.Thread(target=servico.servir, daemon=True)
+    thread.start()
+    assert pronto.wait(10)
+    return servico, thread
+
+
+class _ProcessoEmThread:
+    """O que o ClienteRender usa do Popen devolvido por iniciar_servico()."""
+
+    def __init__(self, thread):
+        self.thread = thread
+
+    def poll(self):
+        return None if self.thread.is_alive() else 0
+
+
+def test_servico_de_outra_versao_e_reiniciado(caminho_json, monkeypatch):
+    antigo, thread_antiga = _servir(caminho_json, versao="versao-antiga")
+    novos = []
+
+    def iniciar_servico(caminho, aplicar=True):
+        novos.append(_servir(caminho))
+        return _ProcessoEmThread(novos[-1][1])
+    monkeypatch.setattr(render_daemon, 'iniciar_servico', iniciar_servico)
+
+    cliente = render_daemon.ClienteRender(caminho_json, aplicar=False)
+    try:
+        assert cliente.pedir('ping')['versao'] == render_daemon.versao_codigo()
+    finally:
+        cliente.fechar()
+    thread_antiga.join(10)
+    assert not thread_antiga.is_alive()
+    assert len(novos) == 1
+
+    # Serviço da versão atual: reaproveitado
+    cliente = render_daemon.ClienteRender(caminho_json, aplicar=False)
+    try:
+        cliente.pedir('ping')
+    finally:
+        cliente.fechar()
+    assert len(novos) == 1
+
+    _, thread_nova = novos[0]
+    render_daemon.ClienteRender(caminho_json, iniciar=False).pedir('encerrar')
+    thread_nova.join(10)
+
+
+def test_servico_ocioso_se_encerra(caminho_json):
+    servico, thread = _servir(caminho_json, tempo_ocioso=0.2)
+    thread.join(10)
+    assert not thread.is_alive()
+    assert render_daemon.ler_estado(caminho_json) is None
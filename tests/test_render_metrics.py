@@ -0,0 +1,47 @@
+import render_metrics as metricas
+
+
+def test_coletor_recebe_fases_e_contadores():
+    coletor = metricas.adicionar_gancho(metricas.ColetorMemoria())
+    try:
+        with metricas.render(caminho_json="progress.json") as resumo:
+            with metricas.fase('desenhar', saida=0):
+                metricas.contar('linhas_desenhadas', 3)
+                metricas.contar('linhas_desenhadas')
+            with metricas.fase('salvar'):
+                pass
+            resumo['resultado'] = "renderizado"
+    finally:
+        metricas.remover_gancho(coletor)
+
+    assert [(nome, contexto) for nome, _, contexto in coletor.fases] == [('desenhar', {'saida': 0}), ('salvar', {})]
+    [resumo] = coletor.renders
+    assert resumo['resultado'] == "renderizado"
+    assert set(resumo['fases']) == {'desenhar', 'salvar'}
+    assert resumo['contadores'] == {'linhas_desenhadas': 4}
+
+
+def test_sem_ganchos_nada_e_coletado():
+    coletor = metricas.ColetorMemoria()
+    with metricas.render() as resumo:
+        with metricas.fase('desenhar'):
+            metricas.contar('linhas_desenhadas')
+    assert resumo == {}
+    assert coletor.fases == [] and coletor.renders == []
+
+
+def test_erro_no_gancho_nao_interrompe_o_render():
+    class Quebrado(metricas.GanchoMetricas):
+        def ao_terminar_fase(self, nome, ms, contexto):
+            raise RuntimeError("falhou")
+
+    quebrado = metricas.adicionar_gancho(Quebrado())
+    coletor = metricas.adicionar_gancho(metricas.ColetorMemoria())
+    try:
+        with metricas.render():
+            with metricas.fase('desenhar'):
+                pass
+    finally:
+        metricas.remover_gancho(quebrado)
+        metricas.remover_gancho(coletor)
+    assert len(coletor.fases) == 1 and len(coletor.renders) == 1
@@ -0,0 +1,52 @@
+import threading
+
+from render_queue import FilaRenderizacao
+
+
+def test_solicitacoes_durante_um_render_viram_um_unico_render_do_estado_mais_novo():
+    estado = {'versao': 0}
+    renderizados = []
+    iniciou, liberar = threading.Event(), threading.Event()
+
+    def render():
+        versao = estado['versao']
+        renderizados.append(versao)
+        iniciou.set()
+        liberar.wait(5)
+        return versao
+
+    fila = FilaRenderizacao(render)
+    respostas = []
+    try:
+        estado['versao'] = 1
+        fila.solicitar(lambda resultado, erro: respostas.append((1, resultado, erro)))
+        assert iniciou.wait(5)
+        # O primeiro render está bloqueado: as próximas solicitações se acumulam
+        for versao in range(2, 6):
+            estado['versao'] = versao
+            fila.solicitar(lambda resultado, erro, versao=versao: respostas.append((versao, resultado, erro)))
+        liberar.set()
+        assert fila.aguardar(5)
+    finally:
+        fila.encerrar(timeout=5)
+
+    assert renderizados == [1, 5]
+    assert (fila.solicitacoes, fila.renders) == (5, 2)
+    # Cada callback recebe o resultado do render que atendeu a sua solicitação
+    assert sorted(respostas) == [(1, 1, None)] + [(versao, 5, None) for versao in range(2, 6)]
+
+
+def test_erro_do_render_chega_aos_callbacks():
+    def render():
+        raise ValueError("fundo inválido")
+
+    fila = FilaRenderizacao(render)
+    respostas = []
+    try:
+        fila.solicitar(lambda resultado, erro: respostas.append((resultado, erro)))
+        assert fila.aguardar(5)
+    finally:
+        fila.encerrar(timeout=5)
+
+    [(resultado, erro)] = respostas
+    assert resultado is None and isinstance(erro, ValueError)
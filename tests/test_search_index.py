@@ -0,0 +1,37 @@
+from search_index import IndiceBusca, normalizar
+
+
+def _indice():
+    return IndiceBusca([
+        "S2: Arquitetura Hexagonal > Portas e Adaptadores",
+        "S1: Coleções > ArrayList",
+        "S2: Hexagonal na Prática > Testes",
+        "S3: Mensageria > Kafka",
+    ])
+
+
+def test_normalizar_ignora_acentos_e_caixa():
+    assert normalizar("Prática Coleções") == "pratica colecoes"
+
+
+def test_busca_por_prefixos_de_todos_os_termos():
+    indice = _indice()
+    assert indice.buscar("s2 hexa") == [
+        "S2: Arquitetura Hexagonal > Portas e Adaptadores",
+        "S2: Hexagonal na Prática > Testes",
+    ]
+    assert indice.buscar("pratica") == ["S2: Hexagonal na Prática > Testes"]
+    assert indice.buscar("colecoes kafka") == []
+
+
+def test_consulta_vazia_e_filtro():
+    indice = _indice()
+    assert len(indice.buscar("")) == 4
+    assert indice.buscar("s2", filtro=lambda texto: "Testes" in texto) == ["S2: Hexagonal na Prática > Testes"]
+
+
+def test_item_acrescentado_invalida_consultas_guardadas():
+    indice = _indice()
+    assert indice.buscar("kaf") == ["S3: Mensageria > Kafka"]
+    indice.adicionar("S4: Streams > Kafka Streams")
+    assert indice.buscar("kaf") == ["S3: Mensageria > Kafka", "S4: Streams > Kafka Streams"]
@@ -0,0 +1,209 @@
+import glob
+import json
+import os
+import time
+
+import pytest
+from PIL import Image, ImageChops, ImageFont
+
+import render_metrics as metricas
+import roadmap_model
+from completion_history import HistoricoConclusoes, caminho_historico
+from conftest import roadmap_pequeno
+
+
+def _gerar(wg, caminho_json, **opcoes):
+    """gerar_wallpaper() (sem aplicar, por padrão), devolvendo o resumo do render (resultado e contadores)."""
+    opcoes.setdefault('aplicar', False)
+    coletor = metricas.adicionar_gancho(metricas.ColetorMemoria())
+    try:
+        wg.gerar_wallpaper(caminho_json=caminho_json, **opcoes)
+    finally:
+        metricas.remover_gancho(coletor)
+    return coletor.renders[-1]
+
+
+def test_fundo_decodificado_uma_vez_com_varias_saidas_em_paralelo(wg, tmp_path, capsys):
+    alvos = [{"resolucao": "480x270", "caminho_saida": str(tmp_path / f"monitor{i}.png")} for i in range(4)]
+    caminho_json, _ = roadmap_pequeno(str(tmp_path), alvos=alvos)
+
+    for _ in range(5):
+        wg.limpar_cache_fundos(disco=True)
+        resumo = _gerar(wg, caminho_json, forcar=True)
+        assert resumo['contadores'].get('fundos_decodificados') == 1
+
+    assert "Não foi possível gravar o cache do fundo" not in capsys.readouterr().out
+    assert len(glob.glob(os.path.join(wg.DIRETORIO_CACHE, "fundo_*.raw"))) == 1
+    assert not glob.glob(os.path.join(wg.DIRETORIO_CACHE, "*.tmp"))
+    assert all(os.path.exists(alvo['caminho_saida']) for alvo in alvos)
+
+
+@pytest.mark.parametrize('modo', ['contorno', 'painel'])
+def test_repintura_incremental_igual_ao_render_completo(wg, tmp_path, modo):
+    caminho_json, dados = roadmap_pequeno(str(tmp_path), legibilidade=modo)
+    # 9 conclusões no histórico: a próxima leva a legenda do gráfico (alinhada à direita) de "9 em" para "10 em"
+    historico = HistoricoConclusoes(caminho_historico(caminho_json))
+    for i in range(9):
+        historico.registrar("m1.s0.p0", time.time() - 3600 + i)
+
+    _gerar(wg, caminho_json)
+    antes = {item['chave']: item for item in wg._ultimo_render[dados['caminho_saida']]['itens']}
+    roadmap = roadmap_model.obter_roadmap(caminho_json)
+    # 9/12 -> 10/12 na barra do módulo (texto centralizado), sem recolher nenhuma linha
+    roadmap.concluir_pratica(roadmap.obter("m1.s0.p9"))
+
+    resumo = _gerar(wg, caminho_json)
+    assert resumo['contadores'].get('regioes_repintadas') and not resumo['contadores'].get('renders_completos')
+    depois = {item['chave']: item for item in wg._ultimo_render[dados['caminho_saida']]['itens']}
+    for chave in ('m1.barra', 'velocidade.texto', 'barra'):
+        assert antes[chave]['pos'] != depois[chave]['pos']
+
+    with Image.open(dados['caminho_saida']) as img:
+        incremental = img.convert('RGB')
+    _gerar(wg, caminho_json, forcar=True, incremental=False)
+    with Image.open(dados['caminho_saida']) as img:
+        completo = img.convert('RGB')
+    assert ImageChops.difference(incremental, completo).getbbox() is None
+
+
+def _alterar_json(caminho_json, **campos):
+    with open(caminho_json, encoding='utf-8') as f:
+        dados = json.load(f)
+    dados.update(campos)
+    with open(caminho_json, 'w', encoding='utf-8') as f:
+        json.dump(dados, f, ensure_ascii=False)
+
+
+@pytest.fixture
+def memoizado(wg, tmp_path):
+    """Roadmap já renderizado e aplicado (backend "arquivo"): o próximo render não deveria fazer nada."""
+    destino = str(tmp_path / "aplicado.png")
+    caminho_json, dados = roadmap_pequeno(str(tmp_path), aplicacao={'backend': 'arquivo', 'destino': destino})
+    assert _gerar(wg, caminho_json, aplicar=True)['resultado'] == wg.RESULTADO_RENDERIZADO
+    assert wg.obter_aplicador().aguardar(5)
+    return caminho_json, dados, destino
+
+
+def test_entrada_igual_nao_renderiza_nem_aplica(wg, memoizado):
+    caminho_json, dados, destino = memoizado
+    mtimes = (os.stat(dados['caminho_saida']).st_mtime_ns, os.stat(destino).st_mtime_ns)
+
+    assert _gerar(wg, caminho_json, aplicar=True)['resultado'] == wg.RESULTADO_REUTILIZADO
+    assert wg.obter_aplicador().aguardar(5)
+    assert (os.stat(dados['caminho_saida']).st_mtime_ns, os.stat(destino).st_mtime_ns) == mtimes
+
+
+@pytest.mark.parametrize('mudanca', ['fundo', 'resolucao', 'codificacao'])
+def test_mudanca_de_entrada_invalida_o_digest(wg, memoizado, mudanca):
+    caminho_json, dados, _ = memoizado
+    if mudanca == 'fundo':
+        info = os.stat(dados['caminho_fundo'])
+        os.utime(dados['caminho_fundo'], ns=(info.st_atime_ns, info.st_mtime_ns + 10**9))
+    elif mudanca == 'resolucao':
+        _alterar_json(caminho_json, resolucao="400x300")
+    else:
+        _alterar_json(caminho_json, formato_saida={'compress_level': 6})
+
+    assert _gerar(wg, caminho_json, aplicar=True)['resultado'] == wg.RESULTADO_RENDERIZADO
+    assert wg.obter_aplicador().aguardar(5)
+
+
+def test_digest_depende_do_arquivo_de_fonte(wg, tmp_path):
+    class Fonte:
+        size = 24
+
+        def __init__(self, path):
+            self.path = path
+
+    _, dados = roadmap_pequeno(str(tmp_path))
+    arquivo = tmp_path / "fonte.ttf"
+    arquivo.write_bytes(b"versao 1")
+    antes = wg.calcular_digest(dados, dados['caminho_fundo'], {'pratica': Fonte(str(arquivo))})
+    assert wg.calcular_digest(dados, dados['caminho_fundo'], {'pratica': Fonte(str(arquivo))}) == antes
+
+    arquivo.write_bytes(b"versao 2, maior")
+    assert wg.calcular_digest(dados, dados['caminho_fundo'], {'pratica': Fonte(str(arquivo))}) != antes
+    # A fonte padrão do Pillow não tem arquivo ('path' é um BytesIO nas versões novas)
+    padrao = {'pratica': ImageFont.load_default()}
+    assert wg.calcular_digest(dados, dados['caminho_fundo'], padrao) == \
+        wg.calcular_digest(dados, dados['caminho_fundo'], padrao)
+
+
+def _roadmap_layout(modulos, **campos):
+    """Só o que o layout lê do progress.json."""
+    return dict({"titulo": "Roadmap", "texto_cor_principal": [255, 255, 255], "texto_cor_concluido": [0, 255, 100],
+                 "modulos": modulos}, **campos)
+
+
+def _modulo(nome, praticas, concluidas=0, subtopicos=1):
+    return {"nome": nome, "subtopicos": [
+        {"nome": f"{nome} / {j}", "praticas": [{"nome": f"Prática {k}", "concluido": k < concluidas}
+                                            for k in range(praticas)]}
+        for j in range(subtopicos)]}
+
+
+def _distribuir(wg, dados, proporcao):
+    """_distribuir_roadmap numa área com `proporcao` da altura de todas as linhas, sem recolher nada."""
+    fontes = wg._carregar_fontes()
+    contagem, _ = wg.contagens_progresso(dados)
+    linhas = wg._linhas_roadmap(dados, contagem, fontes, 0)
+    altura = sum(linha['altura'] + linha['depois'] for linha in linhas)
+    return linhas, wg._distribuir_roadmap(dados, contagem, fontes, 100, 100 + int(altura * proporcao))
+
+
+def test_roadmap_que_nao_cabe_numa_coluna_vai_para_duas(wg):
+    dados = _roadmap_layout([_modulo(f"S{i}", 6) for i in range(4)], colunas_max=3)
+    linhas, (posicionadas, colunas, fora) = _distribuir(wg, dados, 0.6)
+
+    assert (colunas, fora) == (2, 0)
+    assert [linha['chave'] for linha, _, _ in posicionadas] == [linha['chave'] for linha in linhas]
+    colunas_usadas = [coluna for _, coluna, _ in posicionadas]
+    assert colunas_usadas == sorted(colunas_usadas) and set(colunas_usadas) == {0, 1}
+    # Nenhum cabeçalho fica sozinho no pé da primeira coluna
+    ultima_da_primeira = [linha for linha, coluna, _ in posicionadas if coluna == 0][-1]
+    assert not ultima_da_primeira['manter']
+
+
+def test_modulo_concluido_e_recolhido_quando_falta_espaco(wg):
+    dados = _roadmap_layout([_modulo("Feito", 20, concluidas=20), _modulo("Pendente", 3)], colunas_max=1)
+    _, (posicionadas, colunas, fora) = _distribuir(wg, dados, 0.5)
+
+    chaves = [linha['chave'] for linha, _, _ in posicionadas]
+    assert (colunas, fora) == (1, 0)
+    assert "m0" in chaves and not any(chave.startswith("m0.") for chave in chaves)
+    assert [chave for chave in chaves if chave.startswith("m1.")] == ["m1.s0", "m1.s0.p0", "m1.s0.p1", "m1.s0.p2"]
+
+
+def test_linhas_que_sobram_viram_mais_n_linhas(wg):
+    dados = _roadmap_layout([_modulo(f"S{i}", 10) for i in range(3)], colunas_max=1)
+    linhas, (posicionadas, colunas, fora) = _distribuir(wg, dados, 0.3)
+
+    aviso, _, _ = posicionadas[-1]
+    assert aviso['chave'] == 'mais'
+    assert fora > 0 and len(posicionadas) - 1 + fora == len(linhas)
+    assert aviso['texto'] == f"… mais {fora} linhas"
+    # As linhas que couberam são as primeiras, na ordem
+    assert [linha['chave'] for linha, _, _ in posicionadas[:-1]] == [linha['chave'] for linha in linhas[:-fora]]
+
+
+def test_lista_de_exibicao_gravada_permite_repintura_em_outro_processo(wg, tmp_path):
+    caminho_json, dados = roadmap_pequeno(str(tmp_path))
+    roadmap = roadmap_model.obter_roadmap(caminho_json)
+    # A primeira conclusão faz surgir o gráfico de velocidade (mudança de layout, render completo)
+    roadmap.concluir_pratica(roadmap.obter("m1.s0.p9"))
+    _gerar(wg, caminho_json)
+    ultimo = wg._ultimo_render[dados['caminho_saida']]
+    salvos = wg._ler_lista_exibicao(dados['caminho_saida'], ultimo['base'], ultimo['mtime_saida'])
+    assert salvos == ultimo['itens']
+
+    # "Outro processo": sem o render em memória, a lista gravada é a referência para a repintura
+    wg._ultimo_render.clear()
+    roadmap.concluir_pratica(roadmap.obter("m1.s0.p10"))
+    resumo = _gerar(wg, caminho_json)
+    assert resumo['contadores'].get('regioes_repintadas') and not resumo['contadores'].get('renders_completos')
+
+    with Image.open(dados['caminho_saida']) as img:
+        incremental = img.convert('RGB')
+    _gerar(wg, caminho_json, forcar=True, incremental=False)
+    with Image.open(dados['caminho_saida']) as img:
+        assert ImageChops.difference(incremental, img.convert('RGB')).getbbox() is None
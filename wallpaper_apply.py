@@ -0,0 +1,243 @@
+import ctypes
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+
+import render_metrics as metricas
+
+# --- Aplicação do wallpaper ---
+# Quem define a imagem como papel de parede é um backend escolhido em 'aplicacao' no progress.json:
+#   "aplicacao": "windows"                                  (padrão no Windows)
+#   "aplicacao": "arquivo"                                  (padrão nos outros sistemas: só registra)
+#   "aplicacao": {"backend": "arquivo", "destino": "..."}   (copia a imagem aplicada para destino)
+#   "aplicacao": {"backend": "comando", "comando": ["feh", "--bg-fill", "{caminho}"]}
+#   "aplicacao": "nenhum"
+# As aplicações rodam numa thread própria, fora do render, e o tempo delas vai para os ganchos do
+# render_metrics separado do tempo do render (ao_terminar_aplicacao).
+
+# --- Constantes do Windows API ---
+SPI_SETDESKWALLPAPER = 20
+SPIF_UPDATEINIFILE = 0x01
+SPIF_SENDCHANGE    = 0x02
+
+# Registro do backend "arquivo" sem destino: a última imagem "aplicada" (para CI e render em lote)
+ARQUIVO_REGISTRO_PADRAO = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".evometric_cache",
+                                       "wallpaper_aplicado.txt")
+# Tempo máximo de um backend "comando"
+TEMPO_LIMITE_COMANDO_SEGUNDOS = 30
+
+
+class BackendAplicacao:
+    """Interface dos backends: aplicar(caminho_imagem) retorna True se a imagem virou o papel de parede."""
+
+    nome = None
+
+    def __init__(self, **opcoes):
+        self.opcoes = opcoes
+
+    def aplicar(self, caminho_imagem):
+        raise NotImplementedError
+
+
+class BackendWindows(BackendAplicacao):
+    """SystemParametersInfoW: define o papel de parede do Windows e grava no perfil do usuário."""
+
+    nome = 'windows'
+
+    def aplicar(self, caminho_imagem):
+        sucesso = ctypes.windll.user32.SystemParametersInfoW(
+            SPI_SETDESKWALLPAPER,
+            0,
+            os.path.abspath(caminho_imagem),
+            SPIF_UPDATEINIFILE | SPIF_SENDCHANGE
+        )
+        if not sucesso:
+            print("Erro ao aplicar o wallpaper. (Verifique permissões ou o caminho da imagem)")
+        return bool(sucesso)
+
+
+class BackendArquivo(BackendAplicacao):
+    """
+    Sumidouro para CI, servidores e render em lote: com 'destino', copia a imagem para lá (ex.: a pasta
+    que outro programa usa como papel de parede); sem destino, grava o caminho aplicado num arquivo texto.
+    """
+
+    nome = 'arquivo'
+
+    def aplicar(self, caminho_imagem):
+        destino = self.opcoes.get('destino')
+        if destino:
+            temporario = f"{destino}.{os.getpid()}.tmp"
+            shutil.copyfile(caminho_imagem, temporario)
+            os.replace(temporario, destino)
+            return True
+
+        registro = self.opcoes.get('registro', ARQUIVO_REGISTRO_PADRAO)
+        os.makedirs(os.path.dirname(registro), exist_ok=True)
+        with open(registro, 'w', encoding='utf-8') as f:
+            f.write(os.path.abspath(caminho_imagem) + "\n")
+        return True
+
+
+class BackendComando(BackendAplicacao):
+    """Executa um comando externo (ex.: feh, gsettings, swaybg); "{caminho}" é trocado pelo caminho da imagem."""
+
+    nome = 'comando'
+
+    def aplicar(self, caminho_imagem):
+        comando = [parte.replace("{caminho}", os.path.abspath(caminho_imagem)) for parte in self.opcoes['comando']]
+        processo = subprocess.run(comando, capture_output=True, text=True, timeout=TEMPO_LIMITE_COMANDO_SEGUNDOS)
+        if processo.returncode != 0:
+            print(f"Erro ao aplicar o wallpaper com {comando[0]} (código {processo.returncode}): "
+                  f"{processo.stderr.strip()}")
+        return processo.returncode == 0
+
+
+class BackendNenhum(BackendAplicacao):
+    """Não aplica nada (a imagem só é gerada)."""
+
+    nome = 'nenhum'
+
+    def aplicar(self, caminho_imagem):
+        return True
+
+
+BACKENDS = {classe.nome: classe for classe in (BackendWindows, BackendArquivo, BackendComando, BackendNenhum)}
+
+
+def registrar_backend(classe):
+    """Acrescenta um backend (ex.: de outro ambiente gráfico), escolhido pelo atributo nome da classe."""
+    BACKENDS[classe.nome] = classe
+    return classe
+
+
+def backend_padrao():
+    return 'windows' if sys.platform == 'win32' else 'arquivo'
+
+
+def ler_config_aplicacao(dados):
+    """Normaliza 'aplicacao' do progress.json para {'backend': nome, opções...}."""
+    config = dados.get('aplicacao') or backend_padrao()
+    if isinstance(config, str):
+        config = {'backend': config}
+    config = dict(config)
+    config.setdefault('backend', backend_padrao())
+    if config['backend'] not in BACKENDS:
+        print(f"Aviso: Backend de aplicação '{config['backend']}' desconhecido; usando '{backend_padrao()}'.")
+        config['backend'] = backend_padrao()
+    return config
+
+
+def criar_backend(config):
+    opcoes = {chave: valor for chave, valor in config.items() if chave != 'backend'}
+    return BACKENDS[config['backend']](**opcoes)
+
+
+class Aplicador:
+    """
+    Fila de aplicações numa thread própria. Por arquivo de saída vale só o pedido mais recente (renders em
+    sequência rápida viram uma aplicação), e um pedido para a mesma imagem (mesmo mtime) que já foi aplicada
+    com o mesmo backend é descartado sem chamar o backend.
+
+    ao_concluir(sucesso) é chamado na thread do aplicador depois de cada aplicação (ou descarte).
+    """
+
+    def __init__(self):
+        self._condicao = threading.Condition()
+        self._pendentes = {}
+        self._ocupado = False
+        self._aplicados = {}
+        self._backends = {}
+        self._thread = None
+
+        # Contadores para diagnóstico
+        self.solicitacoes = 0
+        self.aplicacoes = 0
+        self.descartes = 0
+
+    def solicitar(self, caminho_imagem, mtime_imagem, config, ao_concluir=None):
+        """Agenda a aplicação da imagem. Não bloqueia."""
+        with self._condicao:
+            self.solicitacoes += 1
+            if self._pendentes.pop(caminho_imagem, None) is not None:
+                # O pedido mais novo do mesmo arquivo substitui o anterior, que não chega a ser aplicado
+                self.descartes += 1
+            self._pendentes[caminho_imagem] = {
+                'mtime': mtime_imagem, 'config': config, 'ao_concluir': ao_concluir, 'solicitado': time.perf_counter(),
+            }
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._executar, name="EvoMetricAplicacao", daemon=True)
+                self._thread.start()
+            self._condicao.notify_all()
+
+    def aguardar(self, timeout=None):
+        """Bloqueia até a fila esvaziar. Retorna False se o timeout estourar."""
+        with self._condicao:
+            return self._condicao.wait_for(lambda: not self._pendentes and not self._ocupado, timeout)
+
+    def _backend(self, config):
+        chave = repr(sorted(config.items()))
+        backend = self._backends.get(chave)
+        if backend is None:
+            backend = self._backends[chave] = criar_backend(config)
+        return backend
+
+    def _executar(self):
+        while True:
+            with self._condicao:
+                self._condicao.wait_for(lambda: self._pendentes)
+                caminho_imagem = next(iter(self._pendentes))
+                pedido = self._pendentes.pop(caminho_imagem)
+                self._ocupado = True
+
+            config = pedido['config']
+            identidade = (pedido['mtime'], repr(sorted(config.items())))
+            espera_ms = (time.perf_counter() - pedido['solicitado']) * 1000
+            inicio = time.perf_counter()
+            repetido = self._aplicados.get(caminho_imagem) == identidade
+            sucesso = True
+            if not repetido:
+                print(f"Aplicando novo wallpaper ({config['backend']}): {caminho_imagem}")
+                try:
+                    if not os.path.exists(caminho_imagem):
+                        print(f"Erro: Imagem de saída não encontrada em {caminho_imagem}")
+                        sucesso = False
+                    else:
+                        sucesso = bool(self._backend(config).aplicar(caminho_imagem))
+                except Exception as e:
+                    print(f"Erro ao aplicar o wallpaper: {e}")
+                    sucesso = False
+            ms = (time.perf_counter() - inicio) * 1000
+
+            if sucesso:
+                self._aplicados[caminho_imagem] = identidade
+            else:
+                self._aplicados.pop(caminho_imagem, None)
+            metricas.aplicacao_concluida({
+                'caminho_saida': caminho_imagem, 'backend': config['backend'], 'sucesso': sucesso,
+                'repetido': repetido, 'ms': round(ms, 3), 'espera_ms': round(espera_ms, 3),
+            })
+            if pedido['ao_concluir'] is not None:
+                try:
+                    pedido['ao_concluir'](sucesso)
+                except Exception as e:
+                    print(f"Erro no callback de aplicação: {e}")
+
+            with self._condicao:
+                if repetido:
+                    self.descartes += 1
+                else:
+                    self.aplicacoes += 1
+                self._ocupado = False
+                self._condicao.notify_all()
+
+
+_aplicador = Aplicador()
+
+
+def obter_aplicador():
+    """Aplicador compartilhado do processo."""
+    return _aplicador
@@ -1,207 +1,1531 @@
 import json
 import os
-import ctypes
-from PIL import Image, ImageDraw, ImageFont, ImageFilter 
+import glob
+import hashlib
+import argparse
+import cProfile
+import logging
+import pstats
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image, ImageChops, ImageDraw, ImageFont, ImageFilter 
 
-# --- Constantes do Windows API ---
-SPI_SETDESKWALLPAPER = 20
-SPIF_UPDATEINIFILE = 0x01
-SPIF_SENDCHANGE    = 0x02
+from background_import import decodificar_ajustado, limite_memoria_fundo
+from roadmap_model import obter_roadmap
+from file_watcher import ObservadorArquivos
+from render_queue import FilaRenderizacao
+import render_metrics as metricas
+from wallpaper_apply import criar_backend, ler_config_aplicacao, obter_aplicador
 
-def carregar_dados(caminho_json="progress.json"):
+# --- Memoização do render ---
+# Incrementar sempre que o desenho mudar, para invalidar os wallpapers gerados por versões anteriores.
+VERSAO_RENDERIZADOR = 4
+
+# Resultado de gerar_wallpaper()
+RESULTADO_RENDERIZADO = "renderizado"   # imagem gerada (completa ou incremental), salva e com a aplicação agendada
+RESULTADO_REAPLICADO = "reaplicado"     # imagem em disco já estava atualizada; só a aplicação foi agendada de novo
+RESULTADO_REUTILIZADO = "reutilizado"   # imagem em disco já estava atualizada e aplicada; nada foi feito
+
+# --- Cache da camada de fundo ---
+# Pasta (ao lado deste script) onde o fundo já decodificado e redimensionado é guardado entre execuções.
+DIRETORIO_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".evometric_cache")
+
+# Cache em memória: vale durante toda a vida do processo (ex.: enquanto a janela do task_adder estiver aberta).
+_cache_fundos = {}
+# As saídas são rasterizadas em threads (ver _rasterizar_alvo): _trava_fundos guarda o dicionário acima e
+# cada chave sendo carregada tem a sua trava, para que o mesmo fundo seja decodificado uma vez só.
+_trava_fundos = threading.Lock()
+_fundos_em_carga = {}
+
+# --- Cache de fontes e de sprites de texto ---
+# Teto de memória do cache de sprites (linhas de texto já rasterizadas, com contorno, em RGBA).
+LIMITE_CACHE_SPRITES_BYTES = 64 * 1024 * 1024
+LIMITE_CACHE_MEDIDAS = 20000
+
+_cache_fontes = {}
+# Conjunto de fontes padrão de cada escala em que as fontes do layout não foram encontradas
+_cache_fontes_padrao = {}
+_cache_medidas = {}
+_cache_alturas = {}
+_cache_encaixes = {}
+_contadores_fontes = {'acertos': 0, 'falhas': 0}
+_contadores_medidas = {'acertos': 0, 'falhas': 0}
+# Guarda os caches e contadores acima: as saídas são rasterizadas em threads (ver _rasterizar_alvo). A medição
+# em si roda fora da trava; duas threads medindo o mesmo texto ao mesmo tempo só repetem o trabalho.
+_trava_caches_texto = threading.Lock()
+
+# Fontes de cada nível do roadmap: (arquivo, tamanho em unidades de layout). No render, o tamanho é
+# multiplicado pela escala de cada saída (ex.: 2.0 num monitor 4K com 200% de escala).
+FONTES_LAYOUT = {
+    'titulo': ("arialbd.ttf", 60),
+    'fase': ("arialbd.ttf", 36),
+    'modulo': ("arial.ttf", 30),
+    'pratica': ("arial.ttf", 24),
+}
+
+# Codificadores da imagem de saída: formato do Pillow, extensão e opções padrão.
+# O PNG usa compress_level 1: continua sem perdas, com arquivo um pouco maior e codificação várias vezes mais rápida.
+# O BMP não é comprimido: é o mais rápido de gravar e o que o Windows carrega mais rápido como papel de parede.
+CODIFICADORES = {
+    'png': {'formato': 'PNG', 'extensao': '.png', 'padrao': {'compress_level': 1}},
+    'bmp': {'formato': 'BMP', 'extensao': '.bmp', 'padrao': {}},
+    'jpeg': {'formato': 'JPEG', 'extensao': '.jpg', 'padrao': {'qualidade': 92}},
+    'webp': {'formato': 'WEBP', 'extensao': '.webp', 'padrao': {'qualidade': 90, 'metodo': 4}},
+}
+_CODIFICADOR_POR_EXTENSAO = {'.png': 'png', '.bmp': 'bmp', '.jpg': 'jpeg', '.jpeg': 'jpeg', '.webp': 'webp'}
+
+# Altura das barras de progresso de cada módulo e FASE (a global tem 30)
+ALTURA_BARRA_MODULO = 24
+
+# --- Layout medido ---
+# A altura de cada linha é a da fonte (ascendente + descendente) mais este espaço, por nível (em unidades de layout)
+ENTRELINHA_LAYOUT = {'fase': 10, 'modulo': 2, 'subtopico': 3, 'pratica': 0}
+ESPACO_APOS_TITULO = 30
+ESPACO_APOS_SUBTOPICO = 10
+ESPACO_APOS_MODULO = 20
+# Espaço livre entre a última linha do roadmap e o rodapé (gráfico de velocidade e barra global)
+ESPACO_RODAPE = 20
+RECUO_SUBTOPICO = 20
+RECUO_PRATICA = 40
+ESPACO_COLUNAS = 40
+# Quando o roadmap não cabe na tela, ele é distribuído em até 'colunas_max' colunas (progress.json);
+# se ainda não couber, os módulos concluídos (e depois os subtópicos concluídos) são recolhidos
+COLUNAS_MAX_PADRAO = 3
+# Formatos em que a imagem salva é idêntica à desenhada: só neles a repintura parte do arquivo em disco
+FORMATOS_SEM_PERDAS = ('png', 'bmp')
+
+# Gráfico de velocidade acima da barra global: conclusões por dia nos últimos dias (do histórico de conclusões)
+DIAS_GRAFICO_VELOCIDADE = 28
+ALTURA_GRAFICO_VELOCIDADE = 40
+
+# --- Legibilidade do texto ---
+# 'legibilidade' no progress.json escolhe como o texto se destaca do fundo:
+#   "contorno" (padrão): contorno (stroke) em volta de cada glifo, com 'contorno_cor' e 'contorno_largura'
+#   "painel": o fundo é desfocado e escurecido só atrás das linhas de texto, e o texto vai sem contorno
+#   {"modo": "painel", "desfoque": 8, "escurecer": 0.45, "margem": 8}   (desfoque e margem em unidades de layout)
+LEGIBILIDADE_PADRAO = {'modo': 'contorno', 'desfoque': 8, 'escurecer': 0.45, 'margem': 8}
+MODOS_LEGIBILIDADE = ('contorno', 'painel')
+# Passadas do desfoque de caixa (BoxBlur): duas já se aproximam de um desfoque gaussiano
+PASSADAS_DESFOQUE_PAINEL = 2
+
+# Máximo de saídas (monitores) rasterizadas ao mesmo tempo
+MAX_TRABALHADORES_RENDER = 4
+
+# Último render de cada arquivo de saída (layout, caixas e imagem final), para a repintura incremental.
+_ultimo_render = {}
+# Os registros de saída são gravados pelo render e, depois da aplicação, pela thread do aplicador
+_trava_registros = threading.Lock()
+
+def carregar_roadmap(caminho_json="progress.json"):
     """
-    Carrega os dados de progresso a partir do arquivo JSON.
+    Carrega o roadmap indexado (snapshot + journal de mutações), compartilhado com o task_adder.
+    Só relê o arquivo quando ele mudou desde a última leitura.
     Retorna None em caso de erro (FileNotFound ou JSONDecode) para manter a interface gráfica ativa.
     """
     try:
         # Tenta carregar o JSON do diretório de trabalho atual
-        with open(caminho_json, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return obter_roadmap(caminho_json)
     except FileNotFoundError:
         print(f"Erro: Arquivo {caminho_json} não encontrado. Certifique-se de que o caminho JSON_PATH em task_adder.py está correto.")
         return None
     except json.JSONDecodeError:
         print("Erro: Arquivo JSON inválido. Verifique a sintaxe.")
         return None
+    except (KeyError, IndexError, ValueError) as e:
+        print(f"Erro: Journal de progresso inconsistente com o progress.json. Erro: {e}")
+        return None
 
-def aplicar_wallpaper(caminho_imagem):
-    """Define a imagem gerada como papel de parede do Windows."""
-    print(f"Aplicando novo wallpaper: {caminho_imagem}")
+def carregar_dados(caminho_json="progress.json"):
+    """Carrega os dados de progresso (dicionário do JSON). Os dados são compartilhados: não modifique."""
+    roadmap = carregar_roadmap(caminho_json)
+    return roadmap.dados if roadmap is not None else None
+
+def aplicar_wallpaper(caminho_imagem, config=None):
+    """
+    Aplica a imagem agora, na thread atual, com o backend de config (ver wallpaper_apply; padrão: o do sistema).
+    O gerar_wallpaper() não usa esta função: ele agenda a aplicação no aplicador, fora do render.
+    """
     if not os.path.exists(caminho_imagem):
         print(f"Erro: Imagem de saída não encontrada em {caminho_imagem}")
-        return
+        return False
+    return bool(criar_backend(config or ler_config_aplicacao({})).aplicar(caminho_imagem))
 
-    sucesso = ctypes.windll.user32.SystemParametersInfoW(
-        SPI_SETDESKWALLPAPER,
-        0,
-        caminho_imagem,
-        SPIF_UPDATEINIFILE | SPIF_SENDCHANGE
-    )
-    
-    if sucesso:
-        print("Wallpaper aplicado com sucesso.")
+def _mtime_arquivo(caminho):
+    """mtime em nanossegundos, ou None se o arquivo não existir."""
+    try:
+        return os.stat(caminho).st_mtime_ns
+    except OSError:
+        return None
+
+def _chave_fundo(caminho_fundo, largura, altura):
+    """
+    Identifica o fundo pelo arquivo de origem (caminho, mtime, tamanho), pela resolução de destino e pelo
+    ajuste ('cobrir': recorte sem distorção; os caches antigos, esticados, deixam de valer).
+    """
+    info = os.stat(caminho_fundo)
+    return (os.path.abspath(caminho_fundo), info.st_mtime_ns, info.st_size, largura, altura, 'cobrir')
+
+def _caminho_cache_disco(chave):
+    """Nome do arquivo de cache: prefixo por imagem de origem e tamanho + hash da chave completa."""
+    # O tamanho entra no prefixo: roadmaps com o mesmo fundo em resoluções diferentes não apagam o cache um do outro
+    prefixo = hashlib.sha1(repr((chave[0], chave[3], chave[4])).encode('utf-8')).hexdigest()[:12]
+    sufixo = hashlib.sha1(repr(chave).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(DIRETORIO_CACHE, f"fundo_{prefixo}_{sufixo}.raw")
+
+def _ler_cache_disco(chave):
+    """Lê o fundo já redimensionado do cache em disco (bytes RGB crus). Retorna None se não existir."""
+    caminho_cache = _caminho_cache_disco(chave)
+    largura, altura = chave[3], chave[4]
+    try:
+        with open(caminho_cache, 'rb') as f:
+            bruto = f.read()
+    except OSError:
+        return None
+
+    if len(bruto) != largura * altura * 3:
+        return None
+    return Image.frombytes('RGB', (largura, altura), bruto)
+
+def _gravar_cache_disco(chave, img):
+    """Grava o fundo redimensionado em disco e remove versões antigas da mesma imagem de origem."""
+    caminho_cache = _caminho_cache_disco(chave)
+    prefixo = os.path.basename(caminho_cache).rsplit('_', 1)[0]
+    try:
+        os.makedirs(DIRETORIO_CACHE, exist_ok=True)
+        for antigo in glob.glob(os.path.join(DIRETORIO_CACHE, f"{prefixo}_*.raw")):
+            if antigo != caminho_cache:
+                os.remove(antigo)
+
+        # Temporário por processo e thread: vários trabalhadores do render em lote podem gravar o mesmo fundo
+        temporario = f"{caminho_cache}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporario, 'wb') as f:
+            f.write(img.tobytes())
+        os.replace(temporario, caminho_cache)
+    except OSError as e:
+        print(f"Aviso: Não foi possível gravar o cache do fundo. Erro: {e}")
+
+def carregar_fundo(caminho_fundo, largura, altura, limite_bytes=None):
+    """
+    Retorna o fundo decodificado e ajustado a (largura, altura).
+    Usa primeiro o cache em memória, depois o cache em disco; só decodifica a imagem original quando o
+    arquivo de origem ou a resolução mudaram, e aí a decodifica já reduzida (ver background_import), sem
+    passar de limite_bytes. Sempre retorna uma cópia editável.
+    """
+    chave = _chave_fundo(caminho_fundo, largura, altura)
+    with _trava_fundos:
+        base = _cache_fundos.get(chave)
+        if base is None:
+            trava_chave = _fundos_em_carga.setdefault(chave, threading.Lock())
+
+    if base is None:
+        with trava_chave:
+            # Outra thread pode ter carregado este fundo enquanto esta esperava
+            with _trava_fundos:
+                base = _cache_fundos.get(chave)
+            if base is None:
+                try:
+                    base = _carregar_fundo_sem_cache(chave, caminho_fundo, largura, altura, limite_bytes)
+                    with _trava_fundos:
+                        # Mantém só a versão mais recente de cada imagem/resolução
+                        for antiga in [c for c in _cache_fundos if c[0] == chave[0] and c[3:] == chave[3:]]:
+                            del _cache_fundos[antiga]
+                        _cache_fundos[chave] = base
+                finally:
+                    with _trava_fundos:
+                        _fundos_em_carga.pop(chave, None)
+
+    return base.copy()
+
+def _carregar_fundo_sem_cache(chave, caminho_fundo, largura, altura, limite_bytes):
+    """Fundo vindo do cache em disco ou, se não estiver lá, decodificado do arquivo original (e gravado no cache)."""
+    base = _ler_cache_disco(chave)
+    if base is None:
+        metricas.contar('fundos_decodificados')
+        base = decodificar_ajustado(caminho_fundo, largura, altura, limite_bytes)
+        _gravar_cache_disco(chave, base)
     else:
-        print("Erro ao aplicar o wallpaper. (Verifique permissões ou o caminho da imagem)")
+        metricas.contar('fundos_cache_disco')
+    return base
+
+def limpar_cache_fundos(disco=False):
+    """Esvazia o cache de fundos em memória (e, opcionalmente, o cache em disco)."""
+    with _trava_fundos:
+        _cache_fundos.clear()
+    if disco:
+        for arquivo in glob.glob(os.path.join(DIRETORIO_CACHE, "fundo_*.raw")):
+            os.remove(arquivo)
+
+def _dilatar_mascara(mascara, raio):
+    """
+    Dilatação quadrada (2r+1)x(2r+1) da máscara: o mesmo formato que a união das cópias deslocadas
+    em (dx, dy) do contorno antigo. É separável (horizontal e depois vertical) e usa deslocamentos
+    dobrados (1, 2, 4...), então o custo cresce com log(r) e não com r².
+    """
+    for eixo_x, eixo_y in ((1, 0), (0, 1)):
+        alcance = 0
+        while alcance < raio:
+            passo = min(alcance + 1, raio - alcance)
+            deslocadas = ImageChops.lighter(
+                ImageChops.offset(mascara, passo * eixo_x, passo * eixo_y),
+                ImageChops.offset(mascara, -passo * eixo_x, -passo * eixo_y)
+            )
+            mascara = ImageChops.lighter(mascara, deslocadas)
+            alcance += passo
+            metricas.contar('passadas_contorno')
+    return mascara
+
+def mascaras_texto(text, font, largura_contorno):
+    """
+    Rasteriza o texto uma única vez numa máscara 'L' com margem para o contorno.
+    Retorna (mascara_texto, mascara_contorno, deslocamento), onde o deslocamento é a posição do canto
+    superior esquerdo das máscaras relativa à posição do texto. A máscara do contorno é None se a largura for 0.
+    """
+    esquerda, topo, direita, base = font.getbbox(text)
+    margem = max(largura_contorno, 0)
+
+    # A margem garante que a dilatação nunca "dê a volta" na borda em ImageChops.offset
+    mascara = Image.new('L', (direita - esquerda + 2 * margem, base - topo + 2 * margem), 0)
+    ImageDraw.Draw(mascara).text((margem - esquerda, margem - topo), text, font=font, fill=255)
+
+    mascara_contorno = _dilatar_mascara(mascara, margem) if margem > 0 else None
+    return mascara, mascara_contorno, (esquerda - margem, topo - margem)
 
 def desenhar_texto_com_contorno(draw, pos, text, font, cor_principal, cor_contorno, largura_contorno):
-    """Desenha texto com um contorno simples (stroke) ao redor."""
-    x, y = pos
-    
-    # 1. Desenha o contorno (deslocando a posição em 8 direções)
-    for dx in range(-largura_contorno, largura_contorno + 1):
-        for dy in range(-largura_contorno, largura_contorno + 1):
-            if dx != 0 or dy != 0:
-                draw.text((x + dx, y + dy), text, font=font, fill=cor_contorno)
-                
-    # 2. Desenha o texto principal por cima
-    draw.text(pos, text, font=font, fill=cor_principal)
-
-def gerar_wallpaper():
-    """Gera a imagem do wallpaper com base nos dados do JSON, desenhando 3 níveis com contorno."""
-    dados = carregar_dados()
-    
-    if dados is None:
+    """Desenha texto com um contorno simples (stroke) ao redor, rasterizando os glifos uma única vez."""
+    if largura_contorno <= 0:
+        draw.text(pos, text, font=font, fill=cor_principal)
         return
-        
-    # 1. Configuração da Imagem
-    largura_str, altura_str = dados['resolucao'].split('x')
-    largura = int(largura_str)
-    altura = int(altura_str)
-    
-    # Carregando cores
-    cor_fundo = tuple(dados['fundo_cor'])
-    cor_principal = tuple(dados['texto_cor_principal']) 
-    cor_concluido = tuple(dados['texto_cor_concluido'])
-    cor_contorno = tuple(dados['contorno_cor'])        
-    largura_contorno = dados['contorno_largura']       
 
-    # Lógica para carregar imagem de fundo
-    caminho_fundo_relativo = dados.get('caminho_fundo')
-    
-    # Se o caminho de fundo não for absoluto (sem disco/raiz), tentamos resolver a partir da pasta do script
-    if caminho_fundo_relativo and not os.path.isabs(caminho_fundo_relativo):
-        caminho_fundo_relativo = os.path.join(os.path.dirname(dados['caminho_saida']), caminho_fundo_relativo)
-        
-    if caminho_fundo_relativo and os.path.exists(caminho_fundo_relativo):
+    x, y = pos
+    mascara, mascara_contorno, (dx, dy) = mascaras_texto(text, font, largura_contorno)
+    canto = (x + dx, y + dy)
+
+    # 1. Desenha o contorno (máscara do texto dilatada pela largura do contorno)
+    draw.bitmap(canto, mascara_contorno, fill=cor_contorno)
+
+    # 2. Desenha o texto principal por cima, reaproveitando a mesma máscara
+    draw.bitmap(canto, mascara, fill=cor_principal)
+
+class CacheSprites:
+    """
+    Cache LRU de linhas de texto pré-renderizadas (RGBA, contorno + texto), limitado pelo tamanho em bytes.
+    A chave descreve tudo o que muda os pixels da linha: (texto, fonte, tamanho, cor, cor do contorno, largura).
+    """
+
+    def __init__(self, limite_bytes):
+        self.limite_bytes = limite_bytes
+        self.bytes_usados = 0
+        self.acertos = 0
+        self.falhas = 0
+        self.descartes = 0
+        self._itens = OrderedDict()
+        self._trava = threading.Lock()
+
+    def obter(self, chave, criar):
+        """Retorna o sprite da chave, criando-o com criar() (fora da trava) se ainda não estiver no cache."""
+        with self._trava:
+            valor = self._itens.get(chave)
+            if valor is not None:
+                self._itens.move_to_end(chave)
+                self.acertos += 1
+                return valor
+            self.falhas += 1
+
+        valor = criar()
+        sprite = valor[0]
+        tamanho = sprite.width * sprite.height * len(sprite.getbands())
+
+        with self._trava:
+            if tamanho > self.limite_bytes or chave in self._itens:
+                return valor
+            self._itens[chave] = valor
+            self.bytes_usados += tamanho
+            while self.bytes_usados > self.limite_bytes:
+                _, (antigo, _) = self._itens.popitem(last=False)
+                self.bytes_usados -= antigo.width * antigo.height * len(antigo.getbands())
+                self.descartes += 1
+        return valor
+
+    def limpar(self):
+        with self._trava:
+            self._itens.clear()
+            self.bytes_usados = 0
+
+    def estatisticas(self):
+        with self._trava:
+            return {
+                'acertos': self.acertos, 'falhas': self.falhas, 'descartes': self.descartes,
+                'itens': len(self._itens), 'bytes': self.bytes_usados, 'limite_bytes': self.limite_bytes,
+            }
+
+_cache_sprites = CacheSprites(LIMITE_CACHE_SPRITES_BYTES)
+
+def _identificar_fonte(fonte):
+    """Identificação estável da fonte para as chaves de cache (arquivo + tamanho)."""
+    return (getattr(fonte, 'path', None) or id(fonte), getattr(fonte, 'size', None))
+
+def _carregar_fonte(arquivo, tamanho):
+    """Abre a fonte TrueType uma única vez por processo. Propaga IOError se o arquivo não existir."""
+    chave = (arquivo, tamanho)
+    with _trava_caches_texto:
+        fonte = _cache_fontes.get(chave)
+        if fonte is not None:
+            _contadores_fontes['acertos'] += 1
+            return fonte
+        _contadores_fontes['falhas'] += 1
+    fonte = ImageFont.truetype(arquivo, tamanho)
+    with _trava_caches_texto:
+        # Outra thread pode ter aberto a mesma fonte nesse meio-tempo: todas passam a usar a mesma instância
+        return _cache_fontes.setdefault(chave, fonte)
+
+def _carregar_fontes(escala=1.0):
+    """
+    Carrega as fontes usadas no wallpaper, indexadas pelo papel de cada nível do roadmap, na escala pedida.
+    Se elas não forem encontradas, a fonte padrão fica guardada para a escala e os arquivos não são
+    procurados de novo neste processo.
+    """
+    with _trava_caches_texto:
+        fontes_padrao = _cache_fontes_padrao.get(escala)
+        if fontes_padrao is not None:
+            _contadores_fontes['acertos'] += 1
+            return fontes_padrao
+    try:
+        return {nome: _carregar_fonte(arquivo, max(1, round(tamanho * escala)))
+                for nome, (arquivo, tamanho) in FONTES_LAYOUT.items()}
+    except IOError:
+        # O aviso sai só na primeira vez no processo (o render em lote e o benchmark carregam as fontes sempre)
+        with _trava_caches_texto:
+            if ('padrao', None) not in _cache_fontes:
+                print("Aviso: Fontes não encontradas, usando fonte padrão.")
+                _cache_fontes[('padrao', None)] = ImageFont.load_default()
+            fonte_padrao = _cache_fontes[('padrao', None)]
+            fontes_padrao = _cache_fontes_padrao[escala] = {
+                'titulo': fonte_padrao, 'fase': fonte_padrao, 'modulo': fonte_padrao, 'pratica': fonte_padrao}
+            return fontes_padrao
+
+def _medir_texto(texto, fonte):
+    """getbbox() com cache: a maioria das linhas do roadmap não muda entre renders."""
+    chave = (texto, _identificar_fonte(fonte))
+    with _trava_caches_texto:
+        caixa = _cache_medidas.get(chave)
+        if caixa is not None:
+            _contadores_medidas['acertos'] += 1
+            return caixa
+        _contadores_medidas['falhas'] += 1
+    caixa = fonte.getbbox(texto)
+    with _trava_caches_texto:
+        if len(_cache_medidas) >= LIMITE_CACHE_MEDIDAS:
+            _cache_medidas.clear()
+        _cache_medidas[chave] = caixa
+    return caixa
+
+def _criar_sprite(texto, fonte, cor_principal, cor_contorno, largura_contorno):
+    """Rasteriza a linha (contorno + texto) numa imagem RGBA. Retorna (sprite, deslocamento)."""
+    metricas.contar('sprites_criados')
+    mascara, mascara_contorno, deslocamento = mascaras_texto(texto, fonte, largura_contorno)
+    sprite = Image.new('RGBA', mascara.size, tuple(cor_principal) + (0,))
+    sprite.putalpha(mascara)
+    if mascara_contorno is not None:
+        camada_contorno = Image.new('RGBA', mascara.size, tuple(cor_contorno) + (0,))
+        camada_contorno.putalpha(mascara_contorno)
+        sprite = Image.alpha_composite(camada_contorno, sprite)
+    return sprite, deslocamento
+
+def obter_sprite(texto, fonte, cor_principal, cor_contorno, largura_contorno):
+    """Sprite RGBA da linha, vindo do cache LRU quando possível. Retorna (sprite, deslocamento)."""
+    chave = (texto, _identificar_fonte(fonte), tuple(cor_principal), tuple(cor_contorno), largura_contorno)
+    return _cache_sprites.obter(
+        chave, lambda: _criar_sprite(texto, fonte, cor_principal, cor_contorno, largura_contorno))
+
+def estatisticas_cache():
+    """Contadores de acerto/falha dos caches do renderizador (fontes, medidas de texto e sprites)."""
+    with _trava_caches_texto:
+        fontes = dict(_contadores_fontes, itens=len(_cache_fontes))
+        medidas = dict(_contadores_medidas, itens=len(_cache_medidas))
+    return {
+        'fontes': fontes,
+        'medidas': medidas,
+        'sprites': _cache_sprites.estatisticas(),
+        'fundos': {'itens': len(_cache_fundos)},
+    }
+
+def _resolver_caminho_fundo(dados, pasta_json=None):
+    """
+    Resolve o caminho da imagem de fundo. Um caminho relativo é procurado na pasta de saída e, se não
+    existir lá, na pasta do JSON (pasta_json). Retorna None se não houver imagem.
+    """
+    caminho_fundo = dados.get('caminho_fundo')
+    if not caminho_fundo:
+        return None
+    if os.path.isabs(caminho_fundo):
+        return caminho_fundo if os.path.exists(caminho_fundo) else None
+
+    pastas = [os.path.dirname(dados['caminho_saida'])]
+    if pasta_json is not None:
+        pastas.append(pasta_json)
+    for pasta in pastas:
+        candidato = os.path.join(pasta, caminho_fundo)
+        if os.path.exists(candidato):
+            return candidato
+    return None
+
+def _montar_fundo(caminho_fundo, largura, altura, cor_fundo, limite_bytes=None):
+    """Retorna uma cópia editável da camada de fundo (imagem em cache ou cor sólida)."""
+    if caminho_fundo:
         try:
-            img = Image.open(caminho_fundo_relativo).resize((largura, altura))
+            return carregar_fundo(caminho_fundo, largura, altura, limite_bytes)
         except Exception as e:
             print(f"Erro ao carregar imagem de fundo. Usando cor sólida. Erro: {e}")
-            img = Image.new('RGB', (largura, altura), color=cor_fundo)
-    else:
-        img = Image.new('RGB', (largura, altura), color=cor_fundo)
-    
-    draw = ImageDraw.Draw(img)
+    return Image.new('RGB', (largura, altura), color=cor_fundo)
 
-    # Tenta carregar fontes
-    try:
-        fonte_titulo = ImageFont.truetype("arialbd.ttf", 60)
-        fonte_fase = ImageFont.truetype("arialbd.ttf", 36)
-        fonte_modulo = ImageFont.truetype("arial.ttf", 30)
-        fonte_pratica = ImageFont.truetype("arial.ttf", 24)
-    except IOError:
-        print("Aviso: Fontes não encontradas, usando fonte padrão.")
-        fonte_titulo = ImageFont.load_default()
-        fonte_fase = ImageFont.load_default()
-        fonte_modulo = ImageFont.load_default()
-        fonte_pratica = ImageFont.load_default()
-
-    # 2. Desenho do Título
-    margin_x = largura // 20 
-    margin_y = altura // 20
-    
-    desenhar_texto_com_contorno(draw, (margin_x, margin_y), dados['titulo'], 
-                                fonte_titulo, cor_principal, cor_contorno, largura_contorno)
-    y_pos = margin_y + 100
-    
-    # 3. Desenho dos Módulos (Roadmap Três Níveis)
-    total_praticas_global = 0
-    praticas_concluidas_global = 0
+def ler_legibilidade(dados):
+    """Normaliza 'legibilidade' do progress.json para {'modo', 'desfoque', 'escurecer', 'margem'}."""
+    config = dados.get('legibilidade') or LEGIBILIDADE_PADRAO['modo']
+    if isinstance(config, str):
+        config = {'modo': config}
+    config = dict(LEGIBILIDADE_PADRAO, **config)
+    if config['modo'] not in MODOS_LEGIBILIDADE:
+        print(f"Aviso: Modo de legibilidade '{config['modo']}' desconhecido; usando 'contorno'.")
+        config['modo'] = 'contorno'
+    config['escurecer'] = min(max(float(config['escurecer']), 0.0), 1.0)
+    return config
+
+def folga_caixas(dados):
+    """
+    Quanto a caixa de cada linha de texto passa do texto, em unidades de layout: a largura do contorno,
+    ou a margem do painel no modo "painel" (o painel ocupa exatamente a caixa da linha).
+    """
+    legibilidade = ler_legibilidade(dados)
+    return legibilidade['margem'] if legibilidade['modo'] == 'painel' else dados['contorno_largura']
+
+def _altura_fonte(fonte):
+    """Altura de uma linha da fonte (ascendente + descendente), medida uma vez por fonte."""
+    chave = _identificar_fonte(fonte)
+    with _trava_caches_texto:
+        altura = _cache_alturas.get(chave)
+    if altura is None:
+        try:
+            ascendente, descendente = fonte.getmetrics()
+            altura = ascendente + descendente
+        except AttributeError:
+            # A fonte bitmap padrão do Pillow não tem métricas verticais
+            altura = _medir_texto("ÁgÇ", fonte)[3]
+        with _trava_caches_texto:
+            _cache_alturas[chave] = altura
+    return altura
+
+def _encaixar_texto(texto, fonte, largura_max):
+    """Texto cortado com "…" no fim para caber em largura_max (medida com a fonte). Guardado em cache."""
+    largura_texto = _medir_texto(texto, fonte)[2]
+    if largura_texto <= largura_max:
+        return texto
+    chave = (texto, _identificar_fonte(fonte), largura_max)
+    with _trava_caches_texto:
+        cortado = _cache_encaixes.get(chave)
+    if cortado is None:
+        # Busca binária pelo maior prefixo que cabe, começando perto da proporção das larguras
+        baixo, alto = 0, len(texto)
+        meio = int(len(texto) * largura_max / max(largura_texto, 1))
+        while baixo < alto:
+            if fonte.getlength(texto[:meio].rstrip() + "…") <= largura_max:
+                baixo = meio
+            else:
+                alto = meio - 1
+            meio = (baixo + alto + 1) // 2
+        cortado = texto[:baixo].rstrip() + "…"
+        with _trava_caches_texto:
+            if len(_cache_encaixes) >= LIMITE_CACHE_MEDIDAS:
+                _cache_encaixes.clear()
+            _cache_encaixes[chave] = cortado
+    return cortado
+
+def _caixa_texto(pos, texto, fonte, largura_contorno):
+    """Caixa (x0, y0, x1, y1) ocupada pelo texto desenhado em pos, incluindo o contorno (ou o painel)."""
+    esquerda, topo, direita, base = _medir_texto(texto, fonte)
+    x, y = pos
+    return (x + esquerda - largura_contorno, y + topo - largura_contorno,
+            x + direita + largura_contorno, y + base + largura_contorno)
+
+def _intersecta(a, b):
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+def _uniao(a, b):
+    return (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+
+def contagens_progresso(dados):
+    """
+    (concluídas, total) de práticas por índice de módulo (módulos e FASEs) e do roadmap inteiro.
+    Usa as contagens mantidas pelo roadmap_model; só percorre as práticas se os dados não vierem
+    dele (ex.: roadmaps sintéticos do benchmark).
+    """
+    modulos = dados['modulos']
+    if 'progresso' in dados and all('total' in m for m in modulos):
+        por_modulo = {i: (m['concluidas'], m['total']) for i, m in enumerate(modulos)}
+        return por_modulo, (dados['progresso']['concluidas'], dados['progresso']['total'])
+
+    por_modulo = {}
+    concluidas_global = total_global = 0
+    fase = None
+    for i, modulo in enumerate(modulos):
+        if modulo.get('tipo') == 'FASE':
+            fase = i
+            por_modulo[i] = (0, 0)
+            continue
+        praticas = [p for s in modulo.get('subtopicos', []) for p in s.get('praticas', [])]
+        concluidas = sum(1 for p in praticas if p.get('concluido', False))
+        por_modulo[i] = (concluidas, len(praticas))
+        if fase is not None:
+            por_modulo[fase] = (por_modulo[fase][0] + concluidas, por_modulo[fase][1] + len(praticas))
+        concluidas_global += concluidas
+        total_global += len(praticas)
+    return por_modulo, (concluidas_global, total_global)
+
+def _linhas_roadmap(dados, contagem_modulos, fontes, recolher):
+    """
+    Linhas do roadmap (FASEs, módulos, subtópicos e práticas) na ordem de leitura, ainda sem posição.
+    Cada linha tem a altura medida com a fonte, o espaço depois dela e se é um cabeçalho que não pode
+    ficar sozinho no pé de uma coluna. recolher=1 mostra só a linha dos módulos concluídos; recolher=2
+    faz o mesmo com os subtópicos concluídos.
+    """
+    cor_principal = tuple(dados['texto_cor_principal'])
+    cor_concluido = tuple(dados['texto_cor_concluido'])
+    linhas = []
+
+    def linha(chave, texto, nivel, nome_fonte, cor, recuo=0, modulo=None):
+        linhas.append({
+            'chave': chave, 'texto': texto, 'fonte': nome_fonte, 'cor': cor, 'recuo': recuo, 'modulo': modulo,
+            'altura': _altura_fonte(fontes[nome_fonte]) + ENTRELINHA_LAYOUT[nivel], 'depois': 0,
+            'manter': nivel != 'pratica',
+        })
+
+    for i, modulo in enumerate(dados['modulos']):
+        chave_modulo = f"m{i}"
 
-    for modulo in dados['modulos']:
-        
         # Tipo FASE (Separador)
         if modulo.get('tipo') == 'FASE':
-            desenhar_texto_com_contorno(draw, (margin_x, y_pos), modulo['nome'], 
-                                        fonte_fase, cor_concluido, cor_contorno, largura_contorno)
-            y_pos += 50
+            linha(chave_modulo, modulo['nome'], 'fase', 'fase', cor_concluido, modulo=i)
             continue
 
-        # Nível 1: Módulo (Semana)
-        mod_cor = cor_principal
-        desenhar_texto_com_contorno(draw, (margin_x, y_pos), f"▶ {modulo['nome']}", 
-                                    fonte_modulo, mod_cor, cor_contorno, largura_contorno)
-        y_pos += 35
+        # Nível 1: Módulo (Semana), na cor de concluído quando todas as práticas estiverem concluídas
+        concluidas, total = contagem_modulos[i]
+        modulo_concluido = total > 0 and concluidas == total
+        linha(chave_modulo, f"▶ {modulo['nome']}", 'modulo', 'modulo',
+              cor_concluido if modulo_concluido else cor_principal, modulo=i)
+        if recolher >= 1 and modulo_concluido:
+            linhas[-1]['manter'] = False
+            linhas[-1]['depois'] = ESPACO_APOS_MODULO
+            continue
 
         # Nível 2: Subtópicos
-        for subtopico in modulo.get('subtopicos', []):
-            sub_cor = cor_principal
-            desenhar_texto_com_contorno(draw, (margin_x + 20, y_pos), f"  • {subtopico['nome']}", 
-                                        fonte_pratica, sub_cor, cor_contorno, largura_contorno)
-            y_pos += 30
-
-            # Nível 3: Práticas (Checklist)
-            for pratica in subtopico.get('praticas', []):
-                total_praticas_global += 1
-                prat_concluido = pratica.get('concluido', False)
-                
-                if prat_concluido:
-                    praticas_concluidas_global += 1
-                    prefixo = "✅"
-                    prat_cor = cor_concluido
-                else:
-                    prefixo = "☐"
-                    prat_cor = cor_principal
-                
-                # Desenha a Prática com recuo duplo e o ícone de checklist
-                desenhar_texto_com_contorno(draw, (margin_x + 40, y_pos), f"    {prefixo} {pratica['nome']}", 
-                                            fonte_pratica, prat_cor, cor_contorno, largura_contorno)
-                y_pos += 25
-            
-            y_pos += 10
-        y_pos += 20
-
-    # 4. Desenho da Barra de Progresso (Com correção de métricas de texto)
-    progresso_percentual = (praticas_concluidas_global / total_praticas_global) * 100 if total_praticas_global > 0 else 0
-    
+        for j, subtopico in enumerate(modulo.get('subtopicos', [])):
+            chave_subtopico = f"{chave_modulo}.s{j}"
+            praticas = subtopico.get('praticas', [])
+            if 'total' in subtopico:
+                subtopico_concluido = subtopico['total'] > 0 and subtopico['concluidas'] == subtopico['total']
+            else:
+                subtopico_concluido = bool(praticas) and all(p.get('concluido', False) for p in praticas)
+            linha(chave_subtopico, f"  • {subtopico['nome']}", 'subtopico', 'pratica',
+                  cor_concluido if subtopico_concluido else cor_principal, RECUO_SUBTOPICO)
+
+            # Nível 3: Práticas (Checklist), com recuo duplo e o ícone de checklist
+            if not (recolher >= 2 and subtopico_concluido):
+                for k, pratica in enumerate(praticas):
+                    concluida = pratica.get('concluido', False)
+                    linha(f"{chave_subtopico}.p{k}", f"    {'✅' if concluida else '☐'} {pratica['nome']}",
+                          'pratica', 'pratica', cor_concluido if concluida else cor_principal, RECUO_PRATICA)
+            linhas[-1]['depois'] += ESPACO_APOS_SUBTOPICO
+        linhas[-1]['depois'] += ESPACO_APOS_MODULO
+    return linhas
+
+def _fluir_linhas(linhas, colunas, y_inicio, y_limite, cortar=False):
+    """
+    Distribui as linhas de cima para baixo em até `colunas` colunas entre y_inicio e y_limite. Um cabeçalho
+    (FASE, módulo, subtópico) que ficaria sozinho no pé de uma coluna passa para a próxima.
+    Retorna [(linha, coluna, y)]; se nem todas couberem, None (ou, com cortar, as que couberam).
+    """
+    posicionadas = []
+    coluna, y = 0, y_inicio
+    for indice, linha in enumerate(linhas):
+        necessario = linha['altura']
+        if linha['manter'] and indice + 1 < len(linhas):
+            necessario += linha['depois'] + linhas[indice + 1]['altura']
+        if y + necessario > y_limite and y > y_inicio:
+            coluna, y = coluna + 1, y_inicio
+        if coluna >= colunas or y + linha['altura'] > y_limite:
+            return posicionadas if cortar else None
+        posicionadas.append((linha, coluna, y))
+        y += linha['altura'] + linha['depois']
+    return posicionadas
+
+def _distribuir_roadmap(dados, contagem_modulos, fontes, y_inicio, y_limite):
+    """
+    Escolhe como o roadmap ocupa a área entre y_inicio e y_limite: uma coluna; se não couber, mais colunas
+    (até 'colunas_max'); se ainda não couber, recolhendo módulos e depois subtópicos concluídos. No último
+    caso, as linhas que sobrarem são trocadas por uma linha "… mais N linhas".
+    Retorna (posicionadas, colunas, linhas que ficaram de fora).
+    """
+    colunas_max = max(1, int(dados.get('colunas_max', COLUNAS_MAX_PADRAO)))
+    altura_area = y_limite - y_inicio
+    for recolher in (0, 1, 2):
+        linhas = _linhas_roadmap(dados, contagem_modulos, fontes, recolher)
+        # Limite inferior barato: nem somando só as alturas das linhas elas cabem nas colunas
+        if sum(linha['altura'] for linha in linhas) > colunas_max * altura_area:
+            continue
+        for colunas in range(1, colunas_max + 1):
+            posicionadas = _fluir_linhas(linhas, colunas, y_inicio, y_limite)
+            if posicionadas is not None:
+                return posicionadas, colunas, 0
+
+    posicionadas = _fluir_linhas(linhas, colunas_max, y_inicio, y_limite, cortar=True)
+    if len(posicionadas) == len(linhas):
+        return posicionadas, colunas_max, 0
+
+    # Abre espaço para a linha "… mais N linhas" logo depois da última linha que coube
+    altura_aviso = _altura_fonte(fontes['pratica']) + ENTRELINHA_LAYOUT['pratica']
+    coluna, y_aviso = 0, y_inicio
+    while posicionadas:
+        linha, coluna, y = posicionadas[-1]
+        y_aviso = y + linha['altura'] + linha['depois']
+        # Um cabeçalho não fica sozinho antes do aviso
+        if y_aviso + altura_aviso <= y_limite and not linha['manter']:
+            break
+        posicionadas.pop()
+        y_aviso = y
+    aviso = {'chave': 'mais', 'texto': f"… mais {len(linhas) - len(posicionadas)} linhas", 'fonte': 'pratica',
+             'cor': tuple(dados['texto_cor_principal']), 'recuo': 0, 'modulo': None, 'altura': altura_aviso,
+             'depois': 0, 'manter': False}
+    return posicionadas + [(aviso, coluna, y_aviso)], colunas_max, len(linhas) - len(posicionadas)
+
+def _montar_layout(dados, largura, altura, fontes, velocidade=None):
+    """
+    Etapa de layout: mede as linhas com as métricas das fontes e calcula tudo o que será desenhado, sem
+    rasterizar nada. Retorna a lista de exibição: os itens na ordem de desenho, só com valores
+    serializáveis em JSON (ver _gravar_lista_exibicao). Cada linha de texto tem uma chave estável
+    ('titulo', 'm3', 'm3.s1', 'm3.s1.p2'), posição, texto, fonte, cor e a caixa ocupada.
+
+    O roadmap fica entre o título e o rodapé, em colunas quando não cabe numa só (ver _distribuir_roadmap);
+    textos mais largos que a coluna são cortados com "…". Módulos e FASEs têm uma barra de progresso própria
+    ('m3.barra') à direita da coluna. No rodapé fica a barra de progresso global ('barra', o último item) e,
+    com velocidade (ver resumo_velocidade), o gráfico 'velocidade' e a legenda dele logo acima, à direita.
+    """
+    cor_principal = tuple(dados['texto_cor_principal'])
+    largura_contorno = folga_caixas(dados)
+    barras_modulos = dados.get('barras_modulos', True)
+    contagem_modulos, (praticas_concluidas_global, total_praticas_global) = contagens_progresso(dados)
+    itens = []
+
+    def linha(chave, pos, texto, nome_fonte, cor):
+        itens.append({
+            'chave': chave, 'tipo': 'texto', 'pos': pos, 'texto': texto, 'fonte': nome_fonte, 'cor': cor,
+            'caixa': _caixa_texto(pos, texto, fontes[nome_fonte], largura_contorno),
+        })
+
+    def barra(chave, retangulo, concluidas, total, texto, nome_fonte):
+        """Barra de progresso com o texto centralizado sobre ela."""
+        x0, y0, x1, y1 = retangulo
+        progresso_largura = int((x1 - x0) * concluidas / total) if total > 0 else 0
+
+        # CORREÇÃO: Utiliza getlength() e getmetrics() no objeto da fonte
+        fonte = fontes[nome_fonte]
+        text_w = fonte.getlength(texto)
+        try:
+            text_h = fonte.getmetrics()[0]
+        except AttributeError:
+            text_h = 30
+
+        text_x = x0 + (x1 - x0 - text_w) // 2
+        text_y = y0 + (y1 - y0 - text_h) // 2
+        itens.append({
+            'chave': chave, 'tipo': 'barra', 'pos': (text_x, text_y), 'texto': texto, 'fonte': nome_fonte,
+            'retangulo': retangulo, 'progresso_x1': x0 + progresso_largura,
+            'caixa': _uniao((x0, y0, x1 + 1, y1 + 1), _caixa_texto((text_x, text_y), texto, fonte, 0)),
+        })
+
+    # 1. Título
+    margin_x = largura // 20
+    margin_y = altura // 20
+    titulo = _encaixar_texto(dados['titulo'], fontes['titulo'], largura - 2 * margin_x)
+    linha('titulo', (margin_x, margin_y), titulo, 'titulo', cor_principal)
+    y_inicio = margin_y + _altura_fonte(fontes['titulo']) + ESPACO_APOS_TITULO
+
+    # 2. Rodapé: a área do roadmap termina acima do gráfico de velocidade e da barra global
     bar_altura = altura - (altura // 10)
     margin_bar = largura // 20
-    bar_largura = largura - (2 * margin_bar)
     bar_height = 30
-    
+    y_limite = bar_altura - ESPACO_RODAPE
+    if velocidade is not None:
+        grafico_x1 = largura - margin_bar
+        grafico_x0 = grafico_x1 - largura // 5
+        grafico_y1 = bar_altura - 15
+        grafico_y0 = grafico_y1 - ALTURA_GRAFICO_VELOCIDADE
+        legenda_y = grafico_y0 - _altura_fonte(fontes['pratica']) - 8
+        y_limite = legenda_y - ESPACO_RODAPE
+
+    # 3. Módulos (Roadmap Três Níveis), em uma ou mais colunas
+    posicionadas, colunas, _ = _distribuir_roadmap(dados, contagem_modulos, fontes, y_inicio, y_limite)
+    largura_coluna = (largura - 2 * margin_x - (colunas - 1) * ESPACO_COLUNAS) // colunas
+    largura_barra_modulo = min(largura // 8, largura_coluna // 3)
+    for item, coluna, y in posicionadas:
+        x_coluna = margin_x + coluna * (largura_coluna + ESPACO_COLUNAS)
+        x = x_coluna + item['recuo']
+        limite_texto = x_coluna + largura_coluna
+        indice = item['modulo']
+        concluidas, total = contagem_modulos[indice] if indice is not None else (0, 0)
+        com_barra = barras_modulos and total > 0
+        if com_barra:
+            limite_texto -= largura_barra_modulo + ESPACO_COLUNAS // 2
+        fonte = fontes[item['fonte']]
+        linha(item['chave'], (x, y), _encaixar_texto(item['texto'], fonte, limite_texto - x), item['fonte'],
+              item['cor'])
+        if com_barra:
+            # À direita da coluna, centralizada na altura da linha do módulo/FASE
+            x1 = x_coluna + largura_coluna
+            y0 = y + (item['altura'] - ALTURA_BARRA_MODULO) // 2
+            barra(f"{item['chave']}.barra", (x1 - largura_barra_modulo, y0, x1, y0 + ALTURA_BARRA_MODULO),
+                  concluidas, total, f"{concluidas}/{total}", 'pratica')
+
+    # 4. Gráfico de velocidade e Barra de Progresso Global (contagens já mantidas pelo modelo)
+    progresso_percentual = (praticas_concluidas_global / total_praticas_global) * 100 if total_praticas_global > 0 else 0
+    texto_progresso = f"Progresso Global: {praticas_concluidas_global} de {total_praticas_global} Práticas ({progresso_percentual:.1f}%)"
+    if velocidade is not None:
+        x0, y0, x1, y1 = grafico_x0, grafico_y0, grafico_x1, grafico_y1
+        itens.append({
+            'chave': 'velocidade', 'tipo': 'grafico', 'pos': (x0, y0), 'retangulo': (x0, y0, x1, y1),
+            'valores': list(velocidade['dias']), 'caixa': (x0 - 1, y0 - 1, x1 + 2, y1 + 2),
+        })
+        dias = len(velocidade['dias'])
+        texto_velocidade = f"{velocidade['total']} em {dias} dias | sequência: {velocidade['sequencia']}"
+        largura_texto = fontes['pratica'].getlength(texto_velocidade)
+        linha('velocidade.texto', (int(x1 - largura_texto), legenda_y), texto_velocidade, 'pratica', cor_principal)
+        # Alinhada à direita: a posição depende do texto, o layout não (ver _ancora_layout)
+        itens[-1]['ancora'] = (x1, legenda_y)
+
+    barra('barra', (margin_bar, bar_altura, largura - margin_bar, bar_altura + bar_height),
+          praticas_concluidas_global, total_praticas_global, texto_progresso, 'modulo')
+    return itens
+
+def resumo_velocidade(roadmap, dados):
+    """
+    Dados do gráfico de velocidade (conclusões por dia, total e sequência atual), ou None se ele estiver
+    desligado ('grafico_velocidade': false) ou o histórico estiver vazio. O histórico guarda o resumo até
+    chegar uma conclusão nova ou o dia virar, então o render não percorre o histórico.
+    """
+    if not dados.get('grafico_velocidade', True):
+        return None
+    try:
+        return roadmap.historico.resumo(DIAS_GRAFICO_VELOCIDADE)
+    except OSError as e:
+        print(f"Aviso: Não foi possível ler o histórico de conclusões. Erro: {e}")
+        return None
+
+def _desenhar_grafico(draw, item, cor_concluido, cor_contorno, origem=(0, 0)):
+    """Desenha o gráfico de velocidade: uma coluna por dia, proporcional ao dia com mais conclusões."""
+    ox, oy = origem
+    x0, y0, x1, y1 = item['retangulo']
+    valores = item['valores']
+    maximo = max(valores) or 1
+    largura_coluna = (x1 - x0) / len(valores)
+
+    draw.line((x0 - ox, y1 - oy, x1 - ox, y1 - oy), fill=cor_contorno, width=2)
+    for i, valor in enumerate(valores):
+        if not valor:
+            continue
+        cx0 = x0 + int(i * largura_coluna)
+        cx1 = max(cx0, x0 + int((i + 1) * largura_coluna) - 2)
+        cy0 = y1 - max(2, int((y1 - y0) * valor / maximo))
+        draw.rectangle((cx0 - ox, cy0 - oy, cx1 - ox, y1 - oy), fill=cor_concluido, outline=cor_contorno)
+
+def _desenhar_barra(draw, item, fontes, cor_concluido, origem=(0, 0)):
+    """Desenha a barra de progresso global e o texto centralizado sobre ela."""
+    ox, oy = origem
+    x0, y0, x1, y1 = item['retangulo']
+
     # Fundo da barra
     draw.rectangle(
-        (margin_bar, bar_altura, largura - margin_bar, bar_altura + bar_height),
+        (x0 - ox, y0 - oy, x1 - ox, y1 - oy),
         fill=(50, 50, 50), 
         outline=(200, 200, 200)
     )
     
     # Progresso
-    progresso_largura = int(bar_largura * (progresso_percentual / 100))
     draw.rectangle(
-        (margin_bar, bar_altura, margin_bar + progresso_largura, bar_altura + bar_height),
+        (x0 - ox, y0 - oy, item['progresso_x1'] - ox, y1 - oy),
         fill=cor_concluido 
     )
     
     # Texto de progresso 
-    texto_progresso = f"Progresso Global: {praticas_concluidas_global} de {total_praticas_global} Práticas ({progresso_percentual:.1f}%)"
-    
-    # CORREÇÃO: Utiliza getlength() e getmetrics() no objeto da fonte
-    text_w = fonte_modulo.getlength(texto_progresso)
+    text_x, text_y = item['pos']
+    draw.text((text_x - ox, text_y - oy), item['texto'], fill=(0, 0, 0), font=fontes[item['fonte']])
+
+def _escalar_layout(itens, escala, fontes, largura_contorno):
+    """
+    Converte o layout (em unidades) para os pixels de uma saída com a escala dada.
+    As caixas são medidas de novo com as fontes da saída, já que o hinting não escala linearmente.
+    """
+    if escala == 1.0:
+        return itens
+
+    def px(valor):
+        return int(round(valor * escala))
+
+    escalados = []
+    for item in itens:
+        novo = dict(item)
+        novo['pos'] = (px(item['pos'][0]), px(item['pos'][1]))
+        if 'ancora' in item:
+            novo['ancora'] = (px(item['ancora'][0]), px(item['ancora'][1]))
+        if item['tipo'] == 'barra':
+            retangulo = tuple(px(v) for v in item['retangulo'])
+            novo['retangulo'] = retangulo
+            novo['progresso_x1'] = px(item['progresso_x1'])
+            novo['caixa'] = _uniao((retangulo[0], retangulo[1], retangulo[2] + 1, retangulo[3] + 1),
+                                   _caixa_texto(novo['pos'], item['texto'], fontes[item['fonte']], 0))
+        elif item['tipo'] == 'grafico':
+            retangulo = tuple(px(v) for v in item['retangulo'])
+            novo['retangulo'] = retangulo
+            novo['caixa'] = (retangulo[0] - 1, retangulo[1] - 1, retangulo[2] + 2, retangulo[3] + 2)
+        else:
+            novo['caixa'] = _caixa_texto(novo['pos'], item['texto'], fontes[item['fonte']], largura_contorno)
+        escalados.append(novo)
+    return escalados
+
+def _aplicar_paineis(img, fundo, itens, painel, regiao):
+    """
+    Modo "painel": desfoca e escurece o fundo dentro das caixas das linhas de texto que intersectam a região.
+    img é o recorte da região (ou o próprio fundo, com a região sendo a imagem inteira) e fundo é a camada
+    de fundo inteira, de onde os pixels são lidos. Só os blocos de texto (o título, cada módulo com os
+    subtópicos e práticas, a legenda do gráfico) são desfocados, com BoxBlur, e cada bloco é lido com uma
+    margem de folga: um pixel sai igual no render completo e na repintura de uma região.
+    """
+    ox, oy, rx1, ry1 = regiao
+    blocos = {}
+    for item in itens:
+        if item['tipo'] != 'texto' or not _intersecta(item['caixa'], regiao):
+            continue
+        x0, y0, x1, y1 = item['caixa']
+        caixa = (max(x0, ox), max(y0, oy), min(x1, rx1), min(y1, ry1))
+        bloco = item['chave'].split('.')[0]
+        blocos.setdefault(bloco, []).append(caixa)
+    if not blocos:
+        return
+
+    raio = painel['desfoque']
+    alcance = PASSADAS_DESFOQUE_PAINEL * (int(raio) + 2)
+    fator = 1.0 - painel['escurecer']
+    tabela = [int(v * fator) for v in range(256)] * len(fundo.getbands())
+
+    # Todos os blocos são lidos antes de colar qualquer um: img pode ser o próprio fundo
+    prontos = []
+    for caixas in blocos.values():
+        bx0, by0, bx1, by1 = caixas[0]
+        for caixa in caixas[1:]:
+            bx0, by0, bx1, by1 = _uniao((bx0, by0, bx1, by1), caixa)
+        leitura = (max(bx0 - alcance, 0), max(by0 - alcance, 0),
+                   min(bx1 + alcance, fundo.width), min(by1 + alcance, fundo.height))
+        with metricas.fase('painel_desfoque'):
+            desfocado = fundo.crop(leitura)
+            if raio > 0:
+                for _ in range(PASSADAS_DESFOQUE_PAINEL):
+                    desfocado = desfocado.filter(ImageFilter.BoxBlur(raio))
+            desfocado = desfocado.crop((bx0 - leitura[0], by0 - leitura[1], bx1 - leitura[0], by1 - leitura[1]))
+            if fator < 1.0:
+                desfocado = desfocado.point(tabela)
+
+        mascara = Image.new('L', desfocado.size, 0)
+        desenho = ImageDraw.Draw(mascara)
+        for x0, y0, x1, y1 in caixas:
+            desenho.rectangle((x0 - bx0, y0 - by0, x1 - bx0 - 1, y1 - by0 - 1), fill=255)
+        prontos.append(((bx0 - ox, by0 - oy), desfocado, mascara))
+        metricas.contar('paineis_desenhados')
+
+    for destino, desfocado, mascara in prontos:
+        img.paste(desfocado, destino, mascara)
+
+def _compor_sprite(camada, sprite, destino):
+    """Compõe o sprite na camada RGBA de texto, cortando o que ficar fora dela (destino pode ser negativo)."""
+    x, y = destino
+    origem_sprite = (max(-x, 0), max(-y, 0))
+    if origem_sprite[0] >= sprite.width or origem_sprite[1] >= sprite.height \
+            or x >= camada.width or y >= camada.height:
+        return
+    camada.alpha_composite(sprite, (max(x, 0), max(y, 0)), origem_sprite)
+
+def _camada_texto(img, itens, regiao):
+    """
+    Camada RGBA transparente para as linhas de texto, só do tamanho do retângulo que elas ocupam em img.
+    Retorna (camada, canto da camada em img), ou (None, None) se nenhuma linha cair em img.
+    """
+    ox, oy = regiao[:2] if regiao else (0, 0)
+    limite = (ox, oy, ox + img.width, oy + img.height)
+    caixa = None
+    for item in itens:
+        if item['tipo'] == 'texto' and _intersecta(item['caixa'], limite):
+            caixa = item['caixa'] if caixa is None else _uniao(caixa, item['caixa'])
+    if caixa is None:
+        return None, None
+    x0, y0 = max(caixa[0], limite[0]) - ox, max(caixa[1], limite[1]) - oy
+    x1, y1 = min(caixa[2], limite[2]) - ox, min(caixa[3], limite[3]) - oy
+    return Image.new('RGBA', (x1 - x0, y1 - y0), (0, 0, 0, 0)), (x0, y0)
+
+def _compor_camada(img, camada, canto):
+    """Compõe a camada de texto sobre img (alpha_composite), só no retângulo da camada."""
+    x, y = canto
+    base = img.crop((x, y, x + camada.width, y + camada.height)).convert('RGBA')
+    base.alpha_composite(camada)
+    img.paste(base.convert(img.mode), canto)
+
+def _desenhar_itens(img, itens, fontes, estilo, regiao=None):
+    """
+    Etapa de rasterização: desenha os itens do layout sobre img.
+    Com uma região (x0, y0, x1, y1), img é o recorte do fundo daquela região e só os itens que a
+    intersectam são desenhados, deslocados para as coordenadas do recorte.
+    No modo "painel", as linhas de texto vão para uma única camada RGBA, composta sobre img no final.
+    """
+    draw = ImageDraw.Draw(img)
+    ox, oy = origem = regiao[:2] if regiao else (0, 0)
+    cor_contorno = estilo['cor_contorno']
+    cor_concluido = estilo['cor_concluido']
+    largura_contorno = estilo['largura_contorno']
+    camada = canto = None
+    if estilo['painel']:
+        camada, canto = _camada_texto(img, itens, regiao)
+
+    for item in itens:
+        if regiao and not _intersecta(item['caixa'], regiao):
+            continue
+        if item['tipo'] == 'barra':
+            with metricas.fase('barra'):
+                _desenhar_barra(draw, item, fontes, cor_concluido, origem)
+        elif item['tipo'] == 'grafico':
+            _desenhar_grafico(draw, item, cor_concluido, cor_contorno, origem)
+        else:
+            x, y = item['pos']
+            sprite, (dx, dy) = obter_sprite(item['texto'], fontes[item['fonte']], item['cor'],
+                                            cor_contorno, largura_contorno)
+            if camada is None:
+                img.paste(sprite, (x + dx - ox, y + dy - oy), sprite)
+            else:
+                _compor_sprite(camada, sprite, (x + dx - ox - canto[0], y + dy - oy - canto[1]))
+            metricas.contar('linhas_desenhadas')
+
+    if camada is not None:
+        with metricas.fase('compor_texto'):
+            _compor_camada(img, camada, canto)
+
+def _ancora_layout(item):
+    """
+    O que fixa o item no layout. Barras e gráfico são fixados pelo retângulo (o texto da barra é centralizado
+    nele) e textos alinhados pela 'ancora'; a 'pos' deles muda junto com o texto ('9/24' -> '10/24') sem que
+    o layout mude. Os demais textos são fixados pela própria 'pos'.
+    """
+    if 'ancora' in item:
+        return item['ancora']
+    if item['tipo'] in ('barra', 'grafico'):
+        return item['retangulo']
+    return item.get('pos')
+
+def _regioes_sujas(itens_anteriores, itens, largura, altura):
+    """
+    Compara o layout novo com o do último render. Retorna a lista de regiões a repintar, ou None se
+    o layout mudou (itens inseridos, removidos ou deslocados) e é preciso um render completo.
+    Um texto que só se move dentro da sua âncora (ver _ancora_layout) repinta a união das caixas antiga e nova.
+    """
+    if len(itens_anteriores) != len(itens):
+        return None
+
+    regioes = []
+    for antigo, novo in zip(itens_anteriores, itens):
+        if antigo['chave'] != novo['chave'] or antigo['tipo'] != novo['tipo'] \
+                or _ancora_layout(antigo) != _ancora_layout(novo) or antigo.get('fonte') != novo.get('fonte'):
+            return None
+        if antigo != novo:
+            x0, y0, x1, y1 = _uniao(antigo['caixa'], novo['caixa'])
+            regioes.append((max(x0, 0), max(y0, 0), min(x1, largura), min(y1, altura)))
+
+    return [r for r in regioes if r[0] < r[2] and r[1] < r[3]]
+
+def _identidade_arquivo(caminho):
+    """(caminho, mtime, tamanho) de um arquivo, ou (caminho, None, None) se ele não existir."""
     try:
-        text_h = fonte_modulo.getmetrics()[0]
-    except AttributeError:
-        text_h = 30 
-        
-    text_x = margin_bar + (bar_largura - text_w) // 2
-    text_y = bar_altura + (bar_height - text_h) // 2
+        info = os.stat(caminho)
+        return (os.path.abspath(caminho), info.st_mtime_ns, info.st_size)
+    except OSError:
+        return (caminho, None, None)
+
+def _identidade_fonte(fonte):
+    """Identidade do arquivo de fonte; nomes como "arial.ttf" são procurados também na pasta de fontes do Windows."""
+    caminho = getattr(fonte, 'path', None)
+    # A fonte padrão do Pillow não tem arquivo (nas versões novas, 'path' é um BytesIO em memória)
+    if not isinstance(caminho, str) or not caminho:
+        return ('padrao', None, None)
+    if not os.path.exists(caminho):
+        na_pasta_fontes = os.path.join(os.environ.get('WINDIR', 'C:\\Windows'), 'Fonts', caminho)
+        if os.path.exists(na_pasta_fontes):
+            caminho = na_pasta_fontes
+    return _identidade_arquivo(caminho)
+
+def calcular_digest(dados, caminho_fundo, fontes, alvo=None, velocidade=None):
+    """
+    Digest estável de tudo o que afeta a imagem: os campos do progress.json usados no desenho,
+    a identidade do arquivo de fundo, os arquivos de fonte, a versão do renderizador, a saída
+    (resolução, escala, caminho e codificação) a que ele se refere e o gráfico de velocidade.
+    """
+    modulos = [
+        {
+            'nome': m['nome'], 'tipo': m.get('tipo'),
+            'subtopicos': [
+                {'nome': s['nome'], 'praticas': [[p['nome'], bool(p.get('concluido', False))] for p in s.get('praticas', [])]}
+                for s in m.get('subtopicos', [])
+            ],
+        }
+        for m in dados['modulos']
+    ]
+    entradas = {
+        'versao': VERSAO_RENDERIZADOR,
+        'config': {campo: dados.get(campo) for campo in (
+            'resolucao', 'titulo', 'fundo_cor', 'texto_cor_principal', 'texto_cor_concluido',
+            'contorno_cor', 'contorno_largura', 'caminho_saida', 'barras_modulos', 'limite_memoria_fundo_mb', 'grafico_velocidade',
+            'legibilidade', 'colunas_max')},
+        'alvo': [alvo['largura'], alvo['altura'], alvo['escala'], alvo['caminho_saida'],
+                 alvo['codificacao']] if alvo else None,
+        'modulos': modulos,
+        'fundo': _identidade_arquivo(caminho_fundo) if caminho_fundo else None,
+        'fontes': sorted({_identidade_fonte(f) for f in fontes.values()}, key=repr),
+        'velocidade': velocidade,
+    }
+    texto = json.dumps(entradas, sort_keys=True, ensure_ascii=False, default=list)
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()
+
+def _caminho_registro_saida(caminho_saida):
+    return caminho_saida + ".evometric.json"
+
+def _ler_registro_saida(caminho_saida):
+    """Lê o registro gravado junto da última imagem gerada (digest, mtime e se foi aplicada)."""
+    try:
+        with open(_caminho_registro_saida(caminho_saida), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _confirmar_aplicacao(caminho_saida, registro, sucesso):
+    """Roda na thread do aplicador: marca a saída como aplicada se o registro ainda for o daquela imagem."""
+    if not sucesso:
+        return
+    with _trava_registros:
+        atual = _ler_registro_saida(caminho_saida)
+        if atual.get('digest') == registro['digest'] and atual.get('mtime_saida') == registro['mtime_saida']:
+            _gravar_registro_saida(caminho_saida, dict(atual, aplicado=True))
+
+def _gravar_registro_saida(caminho_saida, registro):
+    caminho_registro = _caminho_registro_saida(caminho_saida)
+    temporario = caminho_registro + ".tmp"
+    try:
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(registro, f)
+        os.replace(temporario, caminho_registro)
+    except OSError as e:
+        print(f"Aviso: Não foi possível gravar o registro do wallpaper. Erro: {e}")
+
+def _caminho_lista_exibicao(caminho_saida):
+    return caminho_saida + ".evometric.layout.json"
+
+def _base_json(base):
+    """A tupla base de _rasterizar_alvo como o JSON a devolve (listas no lugar de tuplas)."""
+    return json.loads(json.dumps(base))
+
+def _gravar_lista_exibicao(caminho_saida, base, itens, mtime_saida):
+    """
+    Grava ao lado da saída a lista de exibição do último render: um processo novo (a GUI reaberta, o
+    render em lote do dia seguinte) compara o layout dele com ela em vez de rasterizar tudo de novo.
+    """
+    caminho = _caminho_lista_exibicao(caminho_saida)
+    temporario = caminho + ".tmp"
+    try:
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump({'versao': VERSAO_RENDERIZADOR, 'base': base, 'mtime_saida': mtime_saida, 'itens': itens},
+                      f, ensure_ascii=False)
+        os.replace(temporario, caminho)
+    except (OSError, TypeError, ValueError) as e:
+        print(f"Aviso: Não foi possível gravar a lista de exibição. Erro: {e}")
+
+def _ler_lista_exibicao(caminho_saida, base, mtime_saida):
+    """
+    Itens da lista de exibição gravada pelo último render da saída, ou None se ela não corresponder mais
+    ao arquivo em disco (outro mtime) ou ao que muda a imagem inteira (base, versão do renderizador).
+    """
+    if mtime_saida is None:
+        return None
+    try:
+        with open(_caminho_lista_exibicao(caminho_saida), 'r', encoding='utf-8') as f:
+            salvo = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if salvo.get('versao') != VERSAO_RENDERIZADOR or salvo.get('mtime_saida') != mtime_saida \
+            or salvo.get('base') != _base_json(base):
+        return None
+    # O JSON devolve listas; os itens do layout usam tuplas (e são comparados com ==)
+    return [{chave: tuple(valor) if chave in ('pos', 'caixa', 'retangulo', 'cor', 'ancora') else valor
+             for chave, valor in item.items()} for item in salvo['itens']]
+
+def _abrir_saida_anterior(caminho_saida, codificacao):
+    """A imagem salva pelo último render, para repintar só as regiões que mudaram (só formatos sem perdas)."""
+    if codificacao['formato'] not in FORMATOS_SEM_PERDAS:
+        return None
+    try:
+        with Image.open(caminho_saida) as img:
+            return img.convert('RGB')
+    except (OSError, ValueError) as e:
+        print(f"Aviso: Não foi possível reabrir {caminho_saida} para a repintura. Erro: {e}")
+        return None
+
+def ler_codificacao(config, caminho_saida):
+    """
+    Codificação de uma saída a partir de 'formato_saida' no progress.json (ou num item de 'alvos'):
+    {"formato": "png" | "bmp" | "jpeg" | "webp", "compress_level": 0-9 (PNG), "qualidade": 1-100 (JPEG/WebP)}.
+    Sem 'formato', ele vem da extensão do caminho de saída. Retorna o dicionário completo, com os padrões.
+    """
+    config = dict(config or {})
+    extensao = os.path.splitext(caminho_saida)[1].lower()
+    nome = str(config.pop('formato', None) or _CODIFICADOR_POR_EXTENSAO.get(extensao, 'png')).lower()
+    if nome == 'jpg':
+        nome = 'jpeg'
+    if nome not in CODIFICADORES:
+        print(f"Aviso: Formato de saída '{nome}' desconhecido, usando PNG.")
+        nome = 'png'
+    return {'formato': nome, **CODIFICADORES[nome]['padrao'], **config}
+
+def opcoes_codificacao(codificacao):
+    """Converte a codificação (ver ler_codificacao) em (formato do Pillow, parâmetros do Image.save)."""
+    nome = codificacao['formato']
+    if nome == 'png':
+        return 'PNG', {'compress_level': int(codificacao['compress_level'])}
+    if nome == 'jpeg':
+        return 'JPEG', {'quality': int(codificacao['qualidade'])}
+    if nome == 'webp':
+        return 'WEBP', {'quality': int(codificacao['qualidade']), 'method': int(codificacao['metodo'])}
+    return CODIFICADORES[nome]['formato'], {}
+
+def salvar_imagem(img, caminho_saida, codificacao):
+    """
+    Codifica a imagem num arquivo temporário da mesma pasta e troca o arquivo final com os.replace:
+    quem estiver lendo a saída (o Windows, um visualizador) nunca vê um arquivo pela metade.
+    Retorna o tamanho do arquivo em bytes.
+    """
+    formato, opcoes = opcoes_codificacao(codificacao)
+    temporario = f"{caminho_saida}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        img.save(temporario, format=formato, **opcoes)
+        os.replace(temporario, caminho_saida)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+    return os.path.getsize(caminho_saida)
+
+def ler_alvos(dados):
+    """
+    Saídas do wallpaper. Por padrão, uma só ('resolucao' e 'caminho_saida'). Com a lista opcional 'alvos'
+    no progress.json, cada item define 'resolucao', 'caminho_saida', 'escala' (fator de DPI, padrão 1.0)
+    e 'aplicar' (se vira o papel de parede; padrão: só o primeiro). 'formato_saida' (ver ler_codificacao)
+    vale para todas as saídas e pode ser sobrescrito item a item.
+    """
+    configs = dados.get('alvos') or [{'resolucao': dados['resolucao'], 'caminho_saida': dados['caminho_saida']}]
+    alvos = []
+    for i, config in enumerate(configs):
+        largura_str, altura_str = config.get('resolucao', dados['resolucao']).split('x')
+        largura, altura = int(largura_str), int(altura_str)
+        escala = float(config.get('escala', 1.0))
+        caminho_saida = config.get('caminho_saida', dados['caminho_saida'])
+        codificacao = dict(dados.get('formato_saida') or {}, **(config.get('formato_saida') or {}))
+        alvos.append({
+            'largura': largura, 'altura': altura, 'escala': escala,
+            'caminho_saida': caminho_saida,
+            'codificacao': ler_codificacao(codificacao, caminho_saida),
+            'aplicar': config.get('aplicar', i == 0),
+            # Tamanho da tela em unidades de layout: saídas com o mesmo tamanho lógico compartilham o layout
+            'logico': (round(largura / escala), round(altura / escala)),
+        })
+    return alvos
+
+def redirecionar_saidas(alvos, diretorio_saida, nome_base):
+    """
+    Troca o caminho de cada saída por um arquivo em diretorio_saida com o nome do roadmap
+    ("ana.png", ou "ana_0.png", "ana_1.png"... com várias saídas). A extensão é a do formato de saída.
+    """
+    for i, alvo in enumerate(alvos):
+        extensao = CODIFICADORES[alvo['codificacao']['formato']]['extensao']
+        sufixo = f"_{i}" if len(alvos) > 1 else ""
+        alvo['caminho_saida'] = os.path.join(diretorio_saida, f"{nome_base}{sufixo}{extensao}")
+    return alvos
+
+def _rasterizar_alvo(alvo, itens_logicos, dados, caminho_fundo, forcar, incremental=True):
+    """
+    Rasteriza e salva uma saída (roda em paralelo com as outras). Compara a lista de exibição com a do
+    último render da mesma saída (em memória ou, num processo novo, a gravada ao lado do arquivo): se
+    nada mudou, não rasteriza nem salva; se só o conteúdo de algumas linhas mudou, repinta só elas.
+    Com incremental=False, a imagem não fica em memória para o próximo render (render em lote).
+    Retorna o mtime do arquivo salvo.
+    """
+    largura, altura, escala = alvo['largura'], alvo['altura'], alvo['escala']
+    caminho_saida = alvo['caminho_saida']
+    fontes = _carregar_fontes(escala)
+    legibilidade = ler_legibilidade(dados)
+    painel = None
+    if legibilidade['modo'] == 'painel':
+        painel = {'desfoque': legibilidade['desfoque'] * escala, 'escurecer': legibilidade['escurecer']}
+    estilo = {
+        'cor_contorno': tuple(dados['contorno_cor']),
+        'cor_concluido': tuple(dados['texto_cor_concluido']),
+        'largura_contorno': 0 if painel else int(round(dados['contorno_largura'] * escala)),
+        'painel': painel,
+    }
+    itens = _escalar_layout(itens_logicos, escala, fontes, int(round(folga_caixas(dados) * escala)))
+    mtime_saida = _mtime_arquivo(caminho_saida)
+    limite_fundo = limite_memoria_fundo(dados)
+
+    # Tudo o que muda a imagem inteira (ou o arquivo inteiro, como a codificação): se algo disso mudar,
+    # não dá para aproveitar o último render
+    base = (
+        largura, altura, tuple(dados['fundo_cor']), estilo['cor_contorno'], estilo['largura_contorno'],
+        estilo['cor_concluido'], _chave_fundo(caminho_fundo, largura, altura) if caminho_fundo else None,
+        limite_fundo, tuple(sorted(painel.items())) if painel else None,
+        tuple(sorted(alvo['codificacao'].items())),
+    )
+
+    anterior = _ultimo_render.get(caminho_saida) if incremental else None
+    if anterior is None and not forcar:
+        # Sem o render em memória, a lista de exibição gravada pelo último render (de outro processo)
+        with metricas.fase('lista_exibicao', saida=caminho_saida):
+            itens_salvos = _ler_lista_exibicao(caminho_saida, base, mtime_saida)
+        if itens_salvos is not None:
+            anterior = {'base': base, 'itens': itens_salvos, 'imagem': None, 'mtime_saida': mtime_saida}
+    regioes = None
+    if not forcar and anterior and anterior['base'] == base and mtime_saida == anterior['mtime_saida']:
+        regioes = _regioes_sujas(anterior['itens'], itens, largura, altura)
+        if regioes and anterior['imagem'] is None:
+            anterior['imagem'] = _abrir_saida_anterior(caminho_saida, alvo['codificacao'])
+            if anterior['imagem'] is None:
+                regioes = None
+
+    if regioes is not None:
+        img = anterior['imagem']
+        with metricas.fase('fundo', saida=caminho_saida):
+            fundo = _montar_fundo(caminho_fundo, largura, altura, tuple(dados['fundo_cor']), limite_fundo) if regioes else None
+        with metricas.fase('desenhar', saida=caminho_saida):
+            for regiao in regioes:
+                recorte = fundo.crop(regiao)
+                if painel:
+                    _aplicar_paineis(recorte, fundo, itens, painel, regiao)
+                _desenhar_itens(recorte, itens, fontes, estilo, regiao)
+                img.paste(recorte, regiao[:2])
+        metricas.contar('regioes_repintadas', len(regioes))
+    else:
+        with metricas.fase('fundo', saida=caminho_saida):
+            img = _montar_fundo(caminho_fundo, largura, altura, tuple(dados['fundo_cor']), limite_fundo)
+        with metricas.fase('desenhar', saida=caminho_saida):
+            if painel:
+                _aplicar_paineis(img, img, itens, painel, (0, 0, largura, altura))
+            _desenhar_itens(img, itens, fontes, estilo)
+        metricas.contar('renders_completos')
+
+    # Se nenhuma linha mudou de fato, o arquivo em disco já está correto
+    if regioes is None or regioes:
+        with metricas.fase('salvar', saida=caminho_saida):
+            tamanho = salvar_imagem(img, caminho_saida, alvo['codificacao'])
+        metricas.contar('bytes_salvos', tamanho)
+        mtime_saida = _mtime_arquivo(caminho_saida)
+        with metricas.fase('lista_exibicao', saida=caminho_saida):
+            _gravar_lista_exibicao(caminho_saida, base, itens, mtime_saida)
+    else:
+        metricas.contar('rasterizacoes_evitadas')
+    if incremental:
+        _ultimo_render[caminho_saida] = {'base': base, 'itens': itens, 'imagem': img, 'mtime_saida': mtime_saida}
+    return mtime_saida
+
+def gerar_wallpaper(forcar=False, caminho_json="progress.json", aplicar=True, diretorio_saida=None, incremental=True):
+    """
+    Gera a imagem do wallpaper com base nos dados do JSON, desenhando 3 níveis com contorno.
+
+    Antes de desenhar, compara o digest das entradas com o que foi gravado junto da última imagem:
+    se nada mudou, não redesenha nem sobrescreve o arquivo (e só reaplica o wallpaper se a última aplicação
+    falhou). Quando só o conteúdo de algumas linhas mudou (ex.: uma prática concluída) e o layout continua
+    o mesmo, repinta apenas essas linhas e a barra de progresso sobre o último render (o da memória ou,
+    num processo novo, a imagem salva, comparando com a lista de exibição gravada junto dela).
+
+    Com várias saídas (ver ler_alvos), o layout é calculado uma vez por tamanho lógico de tela e as saídas
+    são rasterizadas em paralelo.
+
+    O tempo de cada fase e contadores como linhas desenhadas vão para os ganchos do render_metrics.
+    A aplicação do wallpaper não faz parte do render: ela é agendada no aplicador (wallpaper_apply), roda
+    numa thread própria e tem o tempo reportado à parte; obter_aplicador().aguardar() espera por ela.
+
+    Para o render em lote (batch_render.py): aplicar=False só gera as imagens, diretorio_saida grava as
+    saídas lá com o nome do JSON (ver redirecionar_saidas) e incremental=False não guarda os renders em memória.
+
+    Retorna RESULTADO_RENDERIZADO, RESULTADO_REAPLICADO ou RESULTADO_REUTILIZADO (o "maior" entre as saídas),
+    ou None se o JSON não carregar.
+    """
+    with metricas.render(caminho_json=caminho_json) as resumo:
+        resultado = _gerar_wallpaper(forcar, caminho_json, aplicar, diretorio_saida, incremental)
+        resumo['resultado'] = resultado
+    return resultado
+
+def _gerar_wallpaper(forcar, caminho_json, aplicar, diretorio_saida, incremental):
+    """Corpo do gerar_wallpaper(), com as fases marcadas para o render_metrics."""
+    with metricas.fase('carregar_json'):
+        roadmap = carregar_roadmap(caminho_json)
     
-    draw.text((text_x, text_y), texto_progresso, fill=(0, 0, 0), font=fonte_modulo)
+    if roadmap is None:
+        return None
+
+    # O roadmap é compartilhado com a GUI: tudo o que lê a árvore roda sob a trava, e o resto usa cópias
+    with roadmap.trava:
+        dados = dict(roadmap.dados)
+
+        # 1. Configuração das saídas
+        alvos = ler_alvos(dados)
+        if diretorio_saida is not None:
+            nome_base = os.path.splitext(os.path.basename(caminho_json))[0]
+            redirecionar_saidas(alvos, diretorio_saida, nome_base)
+        caminho_fundo = _resolver_caminho_fundo(dados, os.path.dirname(os.path.abspath(caminho_json)))
+        with metricas.fase('fontes'):
+            fontes = _carregar_fontes()
+        velocidade = resumo_velocidade(roadmap, dados)
+
+        # 2. Memoização: cada imagem em disco já corresponde a estas entradas?
+        for alvo in alvos:
+            with metricas.fase('digest'):
+                alvo['digest'] = calcular_digest(dados, caminho_fundo, fontes, alvo, velocidade)
+            alvo['registro'] = _ler_registro_saida(alvo['caminho_saida'])
+            mtime_saida = _mtime_arquivo(alvo['caminho_saida'])
+            alvo['atualizado'] = (not forcar and alvo['registro'].get('digest') == alvo['digest']
+                                  and mtime_saida is not None and alvo['registro'].get('mtime_saida') == mtime_saida)
+            alvo['mtime_saida'] = mtime_saida
+
+        # 3. Layout em unidades lógicas, uma vez por tamanho de tela
+        layouts = {}
+        for alvo in alvos:
+            if not alvo['atualizado'] and alvo['logico'] not in layouts:
+                with metricas.fase('layout'):
+                    layouts[alvo['logico']] = _montar_layout(dados, alvo['logico'][0], alvo['logico'][1], fontes,
+                                                             velocidade)
+
+    # 4. Rasterização das saídas desatualizadas, em paralelo
+    pendentes = [a for a in alvos if not a['atualizado']]
+    if len(pendentes) == 1:
+        alvo = pendentes[0]
+        alvo['mtime_saida'] = _rasterizar_alvo(alvo, layouts[alvo['logico']], dados, caminho_fundo, forcar,
+                                               incremental)
+    elif pendentes:
+        with ThreadPoolExecutor(max_workers=min(len(pendentes), MAX_TRABALHADORES_RENDER)) as executor:
+            futuros = [(alvo, executor.submit(_rasterizar_alvo, alvo, layouts[alvo['logico']], dados,
+                                              caminho_fundo, forcar, incremental))
+                       for alvo in pendentes]
+            for alvo, futuro in futuros:
+                alvo['mtime_saida'] = futuro.result()
+
+    # 5. Registrar cada saída e agendar a aplicação (roda depois, na thread do aplicador)
+    config_aplicacao = ler_config_aplicacao(dados) if aplicar else None
+    resultados = []
+    for alvo in alvos:
+        caminho_saida, registro = alvo['caminho_saida'], alvo['registro']
+        mudou = not alvo['atualizado'] and alvo['mtime_saida'] != registro.get('mtime_saida')
+        aplicar_alvo = aplicar and alvo['aplicar']
+        ja_aplicado = not aplicar_alvo or (registro.get('aplicado') and registro.get('aplicacao') == config_aplicacao)
+
+        if not mudou and ja_aplicado:
+            resultados.append(RESULTADO_REUTILIZADO)
+            aplicado = registro.get('aplicado', False)
+            agendar = False
+        else:
+            resultados.append(RESULTADO_RENDERIZADO if mudou else RESULTADO_REAPLICADO)
+            aplicado = False
+            agendar = aplicar_alvo
+        novo_registro = {'digest': alvo['digest'], 'mtime_saida': alvo['mtime_saida'], 'aplicado': bool(aplicado),
+                         'aplicacao': config_aplicacao if aplicar_alvo else registro.get('aplicacao')}
+        with _trava_registros:
+            _gravar_registro_saida(caminho_saida, novo_registro)
+        if agendar:
+            obter_aplicador().solicitar(
+                caminho_saida, alvo['mtime_saida'], config_aplicacao,
+                lambda sucesso, c=caminho_saida, r=novo_registro: _confirmar_aplicacao(c, r, sucesso))
+
+    for resultado in (RESULTADO_RENDERIZADO, RESULTADO_REAPLICADO):
+        if resultado in resultados:
+            return resultado
+    print("Wallpaper já está atualizado; nada a fazer.")
+    return RESULTADO_REUTILIZADO
 
-    # 5. Salvar e Aplicar
-    caminho_saida = dados['caminho_saida']
-    img.save(caminho_saida)
-    aplicar_wallpaper(caminho_saida)
+def arquivos_de_entrada(caminho_json="progress.json"):
+    """Arquivos cuja mudança exige um novo wallpaper: o roadmap, o journal dele e a imagem de fundo."""
+    arquivos = [caminho_json, caminho_json + ".journal"]
+    roadmap = carregar_roadmap(caminho_json)
+    if roadmap is not None:
+        with roadmap.trava:
+            caminho_fundo = _resolver_caminho_fundo(roadmap.dados, os.path.dirname(os.path.abspath(caminho_json)))
+        if caminho_fundo:
+            arquivos.append(caminho_fundo)
+    return arquivos
+
+def iniciar_observador(fila_render, caminho_json="progress.json", debounce=0.5, intervalo=1.0):
+    """
+    Observa o progress.json (e o journal e o fundo) e agenda um render na fila quando eles mudam por fora.
+    Retorna o ObservadorArquivos já iniciado; chame parar() para encerrar.
+    """
+    observador = ObservadorArquivos(lambda: arquivos_de_entrada(caminho_json), fila_render.solicitar,
+                                    debounce=debounce, intervalo=intervalo)
+    return observador.iniciar()
+
+def observar(caminho_json="progress.json", debounce=0.5, intervalo=1.0):
+    """Modo de observação: mantém o wallpaper atualizado até Ctrl+C."""
+    fila = FilaRenderizacao(lambda: gerar_wallpaper(caminho_json=caminho_json))
+    fila.solicitar()
+    observador = iniciar_observador(fila, caminho_json, debounce, intervalo)
+    print(f"Observando {caminho_json} ({observador.modo}). Ctrl+C para sair.")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        observador.parar()
+        fila.encerrar()
+        obter_aplicador().aguardar()
 
 if __name__ == "__main__":
-    gerar_wallpaper()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Gera o wallpaper do EvoMetric a partir do progress.json.")
+    parser.add_argument("--json", default="progress.json", help="Caminho do progress.json.")
+    parser.add_argument("--forcar", action="store_true", help="Renderiza mesmo que nada tenha mudado.")
+    parser.add_argument("--observar", action="store_true",
+                        help="Fica observando o roadmap e o fundo e regenera o wallpaper quando mudarem.")
+    parser.add_argument("--debounce", type=float, default=0.5,
+                        help="Segundos sem novas escritas antes de regenerar (modo --observar).")
+    parser.add_argument("--metricas", default=None,
+                        help="Acrescenta o tempo de cada fase e os contadores de cada render neste arquivo JSON-lines.")
+    parser.add_argument("--log-metricas", action="store_true", help="Mostra o resumo de cada render no log.")
+    parser.add_argument("--profile", action="store_true",
+                        help="Executa sob o cProfile e mostra as funções mais custosas ao final.")
+    parser.add_argument("--profile-top", type=int, default=25, help="Quantas funções mostrar com --profile.")
+    args = parser.parse_args()
+
+    if args.metricas:
+        metricas.adicionar_gancho(metricas.GanchoJsonLinhas(args.metricas))
+    if args.log_metricas:
+        logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s: %(message)s")
+        metricas.adicionar_gancho(metricas.GanchoLog())
+
+    perfil = cProfile.Profile() if args.profile else None
+    if perfil:
+        perfil.enable()
+    try:
+        if args.observar:
+            observar(args.json, debounce=args.debounce)
+        else:
+            gerar_wallpaper(forcar=args.forcar, caminho_json=args.json)
+            obter_aplicador().aguardar()
+    finally:
+        if perfil:
+            perfil.disable()
+            pstats.Stats(perfil).strip_dirs().sort_stats(pstats.SortKey.CUMULATIVE).print_stats(args.profile_top)